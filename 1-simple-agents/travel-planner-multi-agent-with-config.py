@@ -1,83 +1,34 @@
 import argparse
 import os
-import yaml
+import sys
 
-from crewai import Agent, Task, Crew, Process
+# The agents, configs, tools and caches are the planning engine's, imported as a package from app/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+from travel_planner import get_runtime
 
 DEFAULT_CITY = "Isfahan"
-DEFAULT_COUNT = 8
 
 
 def parse_args() -> argparse.Namespace:
     p = argparse.ArgumentParser("Simple multi-agent travel planner")
-    p.add_argument("-c", "--city", default=DEFAULT_CITY, help="City to suggest attractions for")
-    p.add_argument("-n", "--count", type=int, default=DEFAULT_COUNT, help="Number of attractions")
-    p.add_argument("-q", "--quiet", action="store_true", help="Disable verbose crew output")
+    p.add_argument("-c", "--city", default=DEFAULT_CITY, help="City to plan the trip for")
+    p.add_argument("-d", "--days", type=int, default=2, help="Days of the trip")
+    p.add_argument("-a", "--attractions-per-day", type=int, default=2, help="Attractions per day")
     return p.parse_args()
 
 def main() -> None:
     args = parse_args()
+    runtime = get_runtime()
 
-    # Determine the base directory of the current file
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-
-    # Construct the path to the agents configuration file
-    agents_config_path = os.path.join(base_dir, "config", "agents.yaml")
-
-    # Construct the path to the tasks configuration file
-    tasks_config_path = os.path.join(base_dir, "config", "tasks.yaml")
-
-    # Open and load the agents configuration file
-    with open(agents_config_path, 'r') as file:
-        agents_data = yaml.safe_load(file)
-
-    # Open and load the tasks configuration file
-    with open(tasks_config_path, 'r') as file:
-        tasks_data = yaml.safe_load(file)
-
-    # Create agents using the loaded configurations
-    researcher = Agent(
-        config=agents_data["researcher"]
-    )
-
-    planner = Agent(
-        config=agents_data["planner"]
-    )
-
-    # Create tasks using the loaded configurations
-    research_task = Task(
-        config=tasks_data["research_task"],
-        agent=researcher
-    )
-
-    planning_task = Task(
-        config=tasks_data["planning_task"],
-        agent=planner,
-        context=[research_task]
-    )
-    
-    crew = Crew(
-        agents=[researcher, planner],
-        tasks=[research_task, planning_task],
-        process=Process.sequential
-    )
-
-    days = 2
-    attractions_per_day = 2
-    total_attractions = days * attractions_per_day
-
-    # Build the dictionary using the variables
-    inputs = {
-        "city": args.city,
-        "days": days,
-        "attractions_per_day": attractions_per_day,
-        "total_attractions": total_attractions
-    }
     try:
-        result = crew.kickoff(inputs=inputs)
-        print(result)
+        # The researcher and planner agents of app/travel_planner/configs/ run as the engine's travel crew
+        itinerary = runtime.plan(args.city, args.days, args.attractions_per_day)
+        print(itinerary.model_dump_json(indent=2))
     except Exception as e:
         print("Error running crew:", e)
+    finally:
+        runtime.shutdown()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
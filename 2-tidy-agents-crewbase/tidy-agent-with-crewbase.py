@@ -1,11 +1,14 @@
-from travel_planner_crew import TravelPlannerCrew
+import os
+import sys
 
-def main() -> None:
-    # Create an instance of our CrewBase class
-    travel_planner = TravelPlannerCrew()
+# The CrewBase class, configs, tools and caches are the planning engine's, imported as a package from app/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+from travel_planner import get_runtime
 
-    # Access the crew method we decorated with @crew
-    crew = travel_planner.travel_crew()
+def main() -> None:
+    # A copy of the travel crew of the shared runtime: same configs, tools, caches and limits as the app
+    crew = get_runtime().crews.crew("travel")
 
     # Define the input variables
     city = "Isfahan"
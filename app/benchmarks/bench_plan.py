@@ -0,0 +1,195 @@
+"""Offline benchmark of the travel planner
+
+Runs the crews against FakeLLM and the fixture-backed tools, so no API key or
+network access is needed, and writes the latency percentiles, throughput and
+memory of direct kickoffs and of /api/plan requests as JSON.
+
+    python app/benchmarks/bench_plan.py --label baseline
+    python app/benchmarks/compare_results.py results/baseline.json results/change.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+benchmarks_dir = os.path.dirname(os.path.abspath(__file__))
+app_dir = os.path.dirname(benchmarks_dir)
+sys.path[:0] = [benchmarks_dir, app_dir]
+
+DEFAULT_CITIES = "Isfahan,Paris,Tokyo"
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser("Offline travel planner benchmark")
+    p.add_argument("--mode", choices=["direct", "api", "both"], default="both", help="What to measure")
+    p.add_argument("-n", "--requests", type=int, default=12, help="Plans per concurrency level")
+    p.add_argument("--concurrency", default="1,4", help="Comma-separated concurrency levels")
+    p.add_argument("--cities", default=DEFAULT_CITIES, help="Comma-separated cities to plan")
+    p.add_argument("--days", type=int, default=2, help="Days per trip")
+    p.add_argument("--attractions-per-day", type=int, default=2, help="Attractions per day")
+    p.add_argument("--llm-latency", type=float, default=0.2, help="Seconds per fake LLM call")
+    p.add_argument("--llm-tokens-per-second", type=float, default=None, help="Fake generation speed")
+    p.add_argument("--llm-filler-tokens", type=int, default=0, help="Extra words in free-text answers")
+    p.add_argument("--tool-calls", type=int, default=2, help="Tool calls per research turn")
+    p.add_argument("--search-latency", type=float, default=0.05, help="Seconds per fake search")
+    p.add_argument("--scrape-latency", type=float, default=0.1, help="Seconds per fake page download")
+    p.add_argument("--cache", action="store_true", help="Keep the itinerary cache enabled in api mode")
+    p.add_argument("--trace-memory", action="store_true", help="Measure Python allocations (slower)")
+    p.add_argument("--label", default=None, help="Name of this run")
+    p.add_argument("-o", "--output", default=None, help="Result file (default results/<label>.json)")
+    return p.parse_args()
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def summarize(latencies, errors, wall, concurrency):
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "wall_seconds": round(wall, 4),
+        "throughput_rps": round(len(latencies) / wall, 4) if wall else None,
+        "mean": round(statistics.mean(latencies), 4) if latencies else None,
+        "p50": percentile(latencies, 0.50),
+        "p90": percentile(latencies, 0.90),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "max": max(latencies) if latencies else None,
+    }
+
+
+def measure(fn, trips, concurrency, trace_memory):
+    """Runs fn for every trip with the given concurrency and summarizes the latencies"""
+    latencies = []
+    errors = []
+
+    def timed(trip):
+        start = time.perf_counter()
+        try:
+            fn(*trip)
+        except Exception as e:
+            errors.append(e)
+            print(f"  error for {trip}: {e}", file=sys.stderr)
+            return
+        latencies.append(time.perf_counter() - start)
+
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(timed, trips))
+    wall = time.perf_counter() - start
+
+    summary = summarize(latencies, len(errors), wall, concurrency)
+    if trace_memory:
+        summary["peak_traced_mb"] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 2)
+        tracemalloc.stop()
+    summary["max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 2)
+    return summary
+
+
+def make_trips(args, count):
+    """Builds distinct trips so neither the cache nor the coalescing hides the crew cost"""
+    cities = [city.strip() for city in args.cities.split(",") if city.strip()]
+    return [
+        (cities[i % len(cities)], args.days + (i // len(cities)) % 3, args.attractions_per_day)
+        for i in range(count)
+    ]
+
+
+def main() -> None:
+    args = parse_args()
+    label = args.label or time.strftime("run-%Y%m%d-%H%M%S")
+
+    # Disk caches go to a throwaway directory so runs do not warm each other up
+    os.environ["TRAVEL_PLANNER_CACHE_DIR"] = tempfile.mkdtemp(prefix="travel-planner-bench-")
+    if not args.cache:
+        os.environ["ITINERARY_CACHE_ENABLED"] = "0"
+        os.environ["SEARCH_CACHE_DISK"] = "0"
+        os.environ["SCRAPE_CACHE_DISK"] = "0"
+
+    from travel_planner import get_runtime, planning
+    from fake_llm import FakeLLM
+    from fake_tools import FixtureScrapeTool, FixtureSearchTool
+
+    llm = FakeLLM(
+        latency=args.llm_latency,
+        tokens_per_second=args.llm_tokens_per_second,
+        filler_tokens=args.llm_filler_tokens,
+        tool_calls=args.tool_calls,
+    )
+    factory = get_runtime().configure(
+        search_tool=FixtureSearchTool(latency=args.search_latency),
+        scrape_tool=FixtureScrapeTool(latency=args.scrape_latency),
+        llm=llm,
+    )
+
+    # Setup cost of the first crew, paid once per process
+    start = time.perf_counter()
+    factory.crew()
+    setup_seconds = time.perf_counter() - start
+
+    levels = [int(level) for level in args.concurrency.split(",")]
+    results = {"direct": {}, "api": {}}
+
+    if args.mode in ("direct", "both"):
+        for level in levels:
+            print(f"direct kickoff, concurrency {level}")
+            results["direct"][str(level)] = measure(
+                planning.run_crew, make_trips(args, args.requests), level, args.trace_memory
+            )
+
+    if args.mode in ("api", "both"):
+        import main as web
+        client = web.create_app().test_client()
+
+        def post(city, days, attractions_per_day):
+            response = client.post('/api/plan', data={
+                "city": city, "days": days, "attractions_per_day": attractions_per_day
+            })
+            if response.status_code != 200:
+                raise RuntimeError(f"HTTP {response.status_code}: {response.get_data(as_text=True)[:200]}")
+
+        for level in levels:
+            print(f"/api/plan, concurrency {level}")
+            results["api"][str(level)] = measure(post, make_trips(args, args.requests), level, args.trace_memory)
+
+    report = {
+        "label": label,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": vars(args),
+        "setup_seconds": round(setup_seconds, 4),
+        "llm": llm.stats(),
+        "tools": factory.tool_stats(),
+        "results": results,
+    }
+
+    output = args.output or os.path.join(benchmarks_dir, "results", f"{label}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(report, file, indent=2)
+
+    for mode, levels_results in results.items():
+        for level, summary in levels_results.items():
+            print(f"{mode:>6} c={level:<3} p50={summary['p50']}s p95={summary['p95']}s "
+                  f"rps={summary['throughput_rps']} errors={summary['errors']}")
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
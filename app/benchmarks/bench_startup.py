@@ -0,0 +1,140 @@
+"""Startup benchmark of the travel planner web app
+
+Imports main.py in fresh interpreters and measures how long the import, the
+app creation, the first / and /healthz requests and (optionally) the agent stack preload take,
+and which heavy modules were imported before the first plan.
+
+    python app/benchmarks/bench_startup.py --label baseline
+    python app/benchmarks/bench_startup.py --max-import-seconds 1.0 --importtime
+
+Exits with status 1 when crewai, crewai_tools or langchain are imported at
+startup, or when the median import time is over --max-import-seconds.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+benchmarks_dir = os.path.dirname(os.path.abspath(__file__))
+app_dir = os.path.dirname(benchmarks_dir)
+
+# Modules that must not be imported before the first plan
+HEAVY_MODULES = ("crewai", "crewai_tools", "langchain", "langchain_community")
+
+# Runs in a fresh interpreter and prints its measurements as JSON
+PROBE = """
+import json, sys, time
+sys.path[:0] = [{app_dir!r}]
+start = time.perf_counter()
+import main
+result = {{"import_seconds": time.perf_counter() - start}}
+start = time.perf_counter()
+app = main.create_app()
+result["create_app_seconds"] = time.perf_counter() - start
+client = app.test_client()
+for name, path in (("index_seconds", "/"), ("healthz_seconds", "/healthz")):
+    start = time.perf_counter()
+    status = client.get(path).status_code
+    result[name] = time.perf_counter() - start
+    result[name.replace("seconds", "status")] = status
+result["heavy_modules"] = [name for name in {heavy!r} if name in sys.modules]
+if {preload!r}:
+    from travel_planner.crew_factory import preload
+    start = time.perf_counter()
+    preload()
+    result["preload_seconds"] = time.perf_counter() - start
+print(json.dumps(result))
+"""
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser("Travel planner startup benchmark")
+    p.add_argument("-n", "--runs", type=int, default=5, help="Fresh interpreters to measure")
+    p.add_argument("--preload", action="store_true", help="Also measure loading the agent stack")
+    p.add_argument("--importtime", action="store_true", help="Print the slowest imports (python -X importtime)")
+    p.add_argument("--max-import-seconds", type=float, default=None, help="Fail above this median import time")
+    p.add_argument("--label", default=None, help="Name of this run")
+    p.add_argument("-o", "--output", default=None, help="Result file (default results/startup-<label>.json)")
+    return p.parse_args()
+
+
+def probe(preload: bool, importtime: bool):
+    """Measures one startup in a new interpreter; returns its results and the -X importtime report"""
+    code = PROBE.format(app_dir=app_dir, heavy=HEAVY_MODULES, preload=preload)
+    env = dict(
+        os.environ,
+        TRAVEL_PLANNER_CACHE_DIR=tempfile.mkdtemp(prefix="travel-planner-startup-"),
+        PRELOAD_AGENT_STACK="off",
+        WARMUP_ENABLED="0",
+    )
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    completed = subprocess.run(command, capture_output=True, text=True, env=env, cwd=app_dir)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr[-2000:])
+    return json.loads(completed.stdout.strip().splitlines()[-1]), completed.stderr
+
+
+def slowest_imports(report: str, count: int = 15):
+    """Returns the imports with the largest cumulative time from an -X importtime report"""
+    rows = []
+    for line in report.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        rows.append((int(cumulative), name))
+    return [{"module": name, "cumulative_ms": round(us / 1000, 1)} for us, name in sorted(rows, reverse=True)[:count]]
+
+
+def main() -> None:
+    args = parse_args()
+    label = args.label or time.strftime("run-%Y%m%d-%H%M%S")
+
+    runs = [probe(args.preload, False)[0] for _ in range(args.runs)]
+    summary = {}
+    for key in ("import_seconds", "create_app_seconds", "index_seconds", "healthz_seconds", "preload_seconds"):
+        values = [run[key] for run in runs if key in run]
+        if values:
+            summary[key] = {"median": round(statistics.median(values), 4), "max": round(max(values), 4)}
+    heavy = sorted({name for run in runs for name in run["heavy_modules"]})
+
+    report = {
+        "label": label,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": vars(args),
+        "startup": summary,
+        "heavy_modules_at_startup": heavy,
+    }
+    if args.importtime:
+        report["slowest_imports"] = slowest_imports(probe(False, True)[1])
+
+    output = args.output or os.path.join(benchmarks_dir, "results", f"startup-{label}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(report, file, indent=2)
+
+    for key, values in summary.items():
+        print(f"{key:<16} median={values['median']}s max={values['max']}s")
+    for row in report.get("slowest_imports", []):
+        print(f"  {row['cumulative_ms']:>8} ms  {row['module']}")
+    print(f"Results written to {output}")
+
+    failures = []
+    if heavy:
+        failures.append(f"imported at startup: {', '.join(heavy)}")
+    limit = args.max_import_seconds
+    if limit is not None and summary["import_seconds"]["median"] > limit:
+        failures.append(f"median import time {summary['import_seconds']['median']}s is over {limit}s")
+    if failures:
+        print("STARTUP REGRESSION: " + "; ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Compares two benchmark result files written by bench_plan.py
+
+    python app/benchmarks/compare_results.py results/baseline.json results/change.json
+
+Exits with status 1 when a p50/p95 latency grew, or the throughput dropped, by
+more than --threshold (relative).
+"""
+import argparse
+import json
+import sys
+
+METRICS = [
+    # (name, True when a larger value is worse)
+    ("p50", True),
+    ("p95", True),
+    ("p99", True),
+    ("throughput_rps", False),
+    ("max_rss_mb", True),
+]
+GATED = ("p50", "p95", "throughput_rps")
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser("Compare two travel planner benchmark runs")
+    p.add_argument("baseline", help="Result file of the reference run")
+    p.add_argument("candidate", help="Result file of the run to check")
+    p.add_argument("--threshold", type=float, default=0.10, help="Allowed relative regression")
+    return p.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    with open(args.candidate) as file:
+        candidate = json.load(file)
+
+    regressions = []
+    print(f"{'mode':<7}{'c':>4}  {'metric':<15}{baseline['label']:>14}{candidate['label']:>14}{'change':>10}")
+    for mode, levels in baseline["results"].items():
+        for level, before in levels.items():
+            after = candidate["results"].get(mode, {}).get(level)
+            if after is None:
+                continue
+            for metric, larger_is_worse in METRICS:
+                old, new = before.get(metric), after.get(metric)
+                if old is None or new is None:
+                    continue
+                change = (new - old) / old if old else 0.0
+                print(f"{mode:<7}{level:>4}  {metric:<15}{old:>14.4f}{new:>14.4f}{change:>+10.1%}")
+                worse = change > args.threshold if larger_is_worse else change < -args.threshold
+                if worse and metric in GATED:
+                    regressions.append(f"{mode} c={level} {metric} {change:+.1%}")
+
+    if regressions:
+        print("\nRegressions above the threshold:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import json
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Union
+
+from crewai import BaseLLM
+
+from fixture_data import attractions_for, find_attraction, find_city, load_city
+
+FILLER = "This sentence stands in for the extra detail a real model would write."
+
+
+class FakeLLM(BaseLLM):
+    """A scripted, deterministic LLM that answers the travel planner prompts from fixtures
+
+    It recognizes the task configs of app/travel_planner/configs, makes tool_calls
+    tool calls during research turns and sleeps to simulate the model latency.
+    """
+
+    def __init__(self, latency: float = 0.2, tokens_per_second: Optional[float] = None,
+                 filler_tokens: int = 0, tool_calls: int = 1, jitter: float = 0.0, seed: int = 42):
+        super().__init__(model="fake-llm", temperature=0)
+        # Seconds every call takes before the first token
+        self.latency = latency
+        # Generation speed; None means the answer appears at once
+        self.tokens_per_second = tokens_per_second
+        # Extra words appended to free-text answers to simulate verbose models
+        self.filler_tokens = filler_tokens
+        # Tool calls the researcher makes before answering
+        self.tool_calls = tool_calls
+        # Relative random variation of the latency (deterministic through the seed)
+        self.jitter = jitter
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.output_tokens = 0
+
+    def supports_function_calling(self) -> bool:
+        return False
+
+    def supports_stop_words(self) -> bool:
+        return True
+
+    def get_context_window_size(self) -> int:
+        return 128000
+
+    def call(self, messages: Union[str, List[Dict[str, str]]], tools=None, callbacks=None,
+             available_functions=None, **kwargs) -> Any:
+        if isinstance(messages, str):
+            prompt = messages
+        else:
+            prompt = "\n".join(str(message.get("content", "")) for message in messages)
+
+        answer = self.answer(prompt)
+        tokens = len(answer.split())
+
+        with self._lock:
+            self.calls += 1
+            self.output_tokens += tokens
+            variation = 1 + self._random.uniform(-self.jitter, self.jitter) if self.jitter else 1
+
+        delay = self.latency
+        if self.tokens_per_second:
+            delay += tokens / self.tokens_per_second
+        time.sleep(max(0.0, delay * variation))
+        return answer
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"calls": self.calls, "output_tokens": self.output_tokens}
+
+    # Scripted answers
+
+    def filler(self) -> str:
+        words = (FILLER + " ") * (self.filler_tokens // len(FILLER.split()) + 1)
+        return " ".join(words.split()[:self.filler_tokens])
+
+    @staticmethod
+    def final(content: str) -> str:
+        return f"Thought: I now know the final answer\nFinal Answer: {content}"
+
+    def tool_step(self, prompt: str, city: str) -> Optional[str]:
+        """Returns the next tool call of a research turn, or None when it is time to answer"""
+        done = prompt.count("Observation:")
+        if done >= self.tool_calls:
+            return None
+        if done % 2 == 0:
+            return (
+                "Thought: I should search the web first\n"
+                "Action: DuckDuckGo Search Tool\n"
+                f"Action Input: {json.dumps({'query': f'top attractions in {city}'})}"
+            )
+        attraction = attractions_for(city, 1, offset=done)[0]
+        url = "https://fixtures.local/" + "-".join(re.findall(r"\w+", attraction["name"].casefold()))
+        return (
+            "Thought: I should read an official page\n"
+            "Action: Read website content\n"
+            f"Action Input: {json.dumps({'website_url': url})}"
+        )
+
+    def answer(self, prompt: str) -> str:
+        city = find_city(prompt) or "Isfahan"
+
+        day = re.search(r"plan for day (\d+) of a (\d+)-day trip", prompt)
+        if day:
+            names = re.findall(r"^\s*- (.+?) \(", prompt.split("attraction(s):", 1)[-1], re.MULTILINE)
+            plan = {
+                "day_number": int(day.group(1)),
+                "attractions": [find_attraction(city, name) for name in names],
+                "meal_suggestions": [f"Lunch near {names[0]}" if names else "Lunch in the old town"],
+            }
+            return self.final(json.dumps(plan))
+
+        itinerary = re.search(r"Create a (\d+)-day itinerary", prompt)
+        if itinerary:
+            days = int(itinerary.group(1))
+            per_day = re.search(r"exactly (\d+) attractions per day", prompt)
+            per_day = int(per_day.group(1)) if per_day else 2
+            attractions = attractions_for(city, days * per_day)
+            plan = {
+                "city": city,
+                "days": days,
+                "daily_plans": [
+                    {
+                        "day_number": number + 1,
+                        "attractions": attractions[number * per_day:(number + 1) * per_day],
+                        "meal_suggestions": [f"Dinner near {attractions[number * per_day]['name']}"],
+                    }
+                    for number in range(days)
+                ],
+                "overall_tips": " ".join(filter(None, [load_city(city)["cultural_notes"], self.filler()])),
+            }
+            return self.final(json.dumps(plan))
+
+        batch = re.search(r"Research (\d+) attraction\(s\) in .+? for part (\d+) of", prompt)
+        if batch:
+            step = self.tool_step(prompt, city)
+            if step:
+                return step
+            size, number = int(batch.group(1)), int(batch.group(2))
+            exclude = re.search(r"already covered: (.+?)\.\n", prompt)
+            excluded = exclude.group(1).split(", ") if exclude and exclude.group(1) != "none" else []
+            findings = {
+                "attractions": attractions_for(city, size, offset=(number - 1) * size, exclude=excluded),
+                "cultural_notes": load_city(city)["cultural_notes"],
+            }
+            return self.final(json.dumps(findings))
+
+        research = re.search(r"Research the top (\d+) attraction", prompt)
+        if research:
+            step = self.tool_step(prompt, city)
+            if step:
+                return step
+            lines = [
+                f"{i}. {a['name']} ({a['category']}, {a['estimated_duration']}) - {a['address']}: {a['description']}"
+                for i, a in enumerate(attractions_for(city, int(research.group(1))), start=1)
+            ]
+            lines.append(f"Local customs: {load_city(city)['cultural_notes']} {self.filler()}")
+            return self.final("\n".join(lines))
+
+        return self.final("Done.")
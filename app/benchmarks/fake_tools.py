@@ -0,0 +1,44 @@
+import time
+
+from travel_planner.custom_search_tool import CustomSearchTool
+from travel_planner.scrape_tool import CachedScrapeTool
+
+from fixture_data import attractions_for, find_city, load_city, slug
+
+
+class FixtureSearchTool(CustomSearchTool):
+    """CustomSearchTool answering from local fixtures instead of DuckDuckGo"""
+
+    # Seconds a simulated search takes
+    latency: float = 0.05
+
+    def search(self, query: str) -> str:
+        with self._metrics.measure():
+            time.sleep(self.latency)
+            city = find_city(query) or "Isfahan"
+            # Same shape as the DuckDuckGoSearchResults output
+            return ", ".join(
+                f"snippet: {a['description']}, title: {a['name']} - {city}, link: https://fixtures.local/{slug(a['name'])}"
+                for a in attractions_for(city, 4)
+            )
+
+
+class FixtureScrapeTool(CachedScrapeTool):
+    """CachedScrapeTool reading pages from local fixtures instead of the web"""
+
+    # Seconds a simulated page download takes
+    latency: float = 0.1
+
+    def _download(self, url: str, cached):
+        time.sleep(self.latency)
+        page_slug = url.rstrip("/").rsplit("/", 1)[-1]
+        for fixture in (load_city(city) for city in ("Isfahan", "Paris", "Tokyo")):
+            for attraction in fixture["attractions"]:
+                if slug(attraction["name"]) == page_slug:
+                    text = (
+                        f"{attraction['name']}\n{attraction['description']}\n"
+                        f"Address: {attraction['address']}\nOpening hours: 9:00-18:00\n"
+                        f"Visitor tips: {fixture['cultural_notes']}"
+                    )
+                    return {"text": text, "etag": None, "last_modified": None, "fetched_at": time.time()}
+        return {"text": f"Page {url}", "etag": None, "last_modified": None, "fetched_at": time.time()}
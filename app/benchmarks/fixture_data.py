@@ -0,0 +1,65 @@
+import json
+import os
+import re
+from typing import Dict, List
+
+fixtures_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+with open(os.path.join(fixtures_dir, "attractions.json"), "r", encoding="utf-8") as file:
+    CITIES: Dict[str, dict] = json.load(file)
+
+
+def slug(text: str) -> str:
+    return "-".join(re.findall(r"\w+", text.casefold()))
+
+
+def load_city(city: str) -> dict:
+    """Returns the fixture of a city, or a synthetic one for cities without fixture"""
+    fixture = CITIES.get(" ".join(city.split()).casefold())
+    if fixture is not None:
+        return fixture
+    return {
+        "city": city,
+        "cultural_notes": f"Respect local customs in {city}.",
+        "attractions": [
+            {
+                "name": f"{city} Attraction {number}",
+                "description": f"A well-known sight of {city}.",
+                "category": "Landmark",
+                "estimated_duration": "1 hour",
+                "address": f"Main Street {number}, {city}",
+            }
+            for number in range(1, 31)
+        ],
+    }
+
+
+def find_city(text: str) -> str:
+    """Returns the fixture city mentioned in a query or prompt"""
+    lowered = text.casefold()
+    for key, fixture in CITIES.items():
+        if key in lowered:
+            return fixture["city"]
+    return ""
+
+
+def attractions_for(city: str, count: int, offset: int = 0, exclude: List[str] = ()) -> List[dict]:
+    """Returns count attractions of a city, cycling through the fixture when it is too short"""
+    excluded = {name.casefold() for name in exclude}
+    pool = [a for a in load_city(city)["attractions"] if a["name"].casefold() not in excluded]
+    if not pool:
+        pool = load_city(city)["attractions"]
+    return [pool[(offset + i) % len(pool)] for i in range(count)]
+
+
+def find_attraction(city: str, name: str) -> dict:
+    for attraction in load_city(city)["attractions"]:
+        if attraction["name"].casefold() == name.casefold():
+            return attraction
+    return {
+        "name": name,
+        "description": f"A sight of {city}.",
+        "category": "Landmark",
+        "estimated_duration": "1 hour",
+        "address": None,
+    }
@@ -0,0 +1,31 @@
+"""gunicorn settings used by load_test.py
+
+The production settings of gunicorn_config.py, with every worker planning
+through FakeLLM and the fixture-backed tools instead of the real services.
+"""
+import os
+import sys
+
+benchmarks_dir = os.path.dirname(os.path.abspath(__file__))
+app_dir = os.path.dirname(benchmarks_dir)
+sys.path[:0] = [app_dir]
+
+from gunicorn_config import *  # noqa: E402,F401,F403
+
+accesslog = None
+
+
+def post_fork(server, worker):
+    sys.path[:0] = [benchmarks_dir]
+    from travel_planner import get_runtime
+    from fake_llm import FakeLLM
+    from fake_tools import FixtureScrapeTool, FixtureSearchTool
+
+    get_runtime().configure(
+        search_tool=FixtureSearchTool(latency=float(os.environ.get("BENCH_SEARCH_LATENCY", 0.05))),
+        scrape_tool=FixtureScrapeTool(latency=float(os.environ.get("BENCH_SCRAPE_LATENCY", 0.1))),
+        llm=FakeLLM(
+            latency=float(os.environ.get("BENCH_LLM_LATENCY", 0.2)),
+            tool_calls=int(os.environ.get("BENCH_TOOL_CALLS", 2)),
+        ),
+    )
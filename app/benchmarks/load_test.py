@@ -0,0 +1,141 @@
+"""Load test of the production server
+
+Starts gunicorn (gunicorn_bench_config.py: FakeLLM and fixture tools, so no
+API key or network access is needed) with each number of worker processes in
+turn and sends the same /api/plan load to it, to show how throughput scales
+with workers. Writes the results in the format of bench_plan.py, so they can
+be compared with compare_results.py.
+
+    python app/benchmarks/load_test.py --workers 1,2,4 --concurrency 16 -n 64
+"""
+import argparse
+import json
+import os
+import platform
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+benchmarks_dir = os.path.dirname(os.path.abspath(__file__))
+app_dir = os.path.dirname(benchmarks_dir)
+
+from bench_plan import DEFAULT_CITIES, make_trips, measure  # noqa: E402
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser("Travel planner load test")
+    p.add_argument("--workers", default="1,2,4", help="Comma-separated gunicorn worker counts")
+    p.add_argument("--threads", type=int, default=8, help="Threads per worker")
+    p.add_argument("--job-workers", type=int, default=4, help="Concurrent plans per worker (JOB_WORKERS)")
+    p.add_argument("-n", "--requests", type=int, default=48, help="Plans per worker count")
+    p.add_argument("--concurrency", type=int, default=16, help="Requests sent at the same time")
+    p.add_argument("--cities", default=DEFAULT_CITIES, help="Comma-separated cities to plan")
+    p.add_argument("--days", type=int, default=2, help="Days per trip")
+    p.add_argument("--attractions-per-day", type=int, default=2, help="Attractions per day")
+    p.add_argument("--llm-latency", type=float, default=0.2, help="Seconds per fake LLM call")
+    p.add_argument("--port", type=int, default=3100, help="Port the server listens on")
+    p.add_argument("--label", default=None, help="Name of this run")
+    p.add_argument("-o", "--output", default=None, help="Result file (default results/load-<label>.json)")
+    return p.parse_args()
+
+
+def start_server(args, workers: int) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        WEB_WORKERS=str(workers),
+        WEB_THREADS=str(args.threads),
+        WEB_BIND=f"127.0.0.1:{args.port}",
+        JOB_WORKERS=str(args.job_workers),
+        JOB_QUEUE_SIZE=str(args.requests),
+        BENCH_LLM_LATENCY=str(args.llm_latency),
+        # Every request has to run its crew
+        ITINERARY_CACHE_ENABLED="0",
+        SEARCH_CACHE_DISK="0",
+        SCRAPE_CACHE_DISK="0",
+        WARMUP_ENABLED="0",
+        TRAVEL_PLANNER_CACHE_DIR=tempfile.mkdtemp(prefix="travel-planner-load-"),
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", os.path.join(benchmarks_dir, "gunicorn_bench_config.py")],
+        cwd=app_dir, env=env
+    )
+    wait_until_ready(args.port, server)
+    return server
+
+
+def wait_until_ready(port: int, server: subprocess.Popen, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with status {server.returncode}")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/readyz", timeout=2) as response:
+                if response.status == 200:
+                    return
+        except (urllib.error.URLError, ConnectionError):
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("gunicorn did not become ready")
+
+
+def stop_server(server: subprocess.Popen) -> float:
+    """Stops the server gracefully and returns how long the drain took"""
+    start = time.perf_counter()
+    server.send_signal(signal.SIGTERM)
+    server.wait(timeout=180)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    args = parse_args()
+    label = args.label or time.strftime("run-%Y%m%d-%H%M%S")
+
+    def post(city, days, attractions_per_day):
+        data = urllib.parse.urlencode({
+            "city": city, "days": days, "attractions_per_day": attractions_per_day
+        }).encode()
+        request = urllib.request.Request(f"http://127.0.0.1:{args.port}/api/plan", data=data)
+        with urllib.request.urlopen(request, timeout=600) as response:
+            response.read()
+
+    results = {"gunicorn": {}}
+    for workers in [int(count) for count in args.workers.split(",")]:
+        print(f"gunicorn with {workers} worker(s)")
+        server = start_server(args, workers)
+        try:
+            summary = measure(post, make_trips(args, args.requests), args.concurrency, False)
+        finally:
+            shutdown_seconds = stop_server(server)
+        summary["shutdown_seconds"] = round(shutdown_seconds, 3)
+        results["gunicorn"][str(workers)] = summary
+
+    report = {
+        "label": label,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": vars(args),
+        "results": results,
+    }
+    output = args.output or os.path.join(benchmarks_dir, "results", f"load-{label}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(report, file, indent=2)
+
+    baseline = None
+    for workers, summary in results["gunicorn"].items():
+        throughput = summary["throughput_rps"] or 0
+        baseline = baseline or throughput
+        scaling = f"x{throughput / baseline:.2f}" if baseline else "-"
+        print(f"workers={workers:<3} rps={throughput} ({scaling}) p50={summary['p50']}s "
+              f"p95={summary['p95']}s errors={summary['errors']}")
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
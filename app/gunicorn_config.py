@@ -0,0 +1,51 @@
+"""Production server settings
+
+    cd app && gunicorn -c gunicorn_config.py
+
+Every worker process creates its own app through main:create_app() and loads
+the agent stack on its first plan (or at startup with PRELOAD_AGENT_STACK).
+Plans mostly wait on the LLM and the web, so each worker serves several
+requests at once on its threads.
+"""
+import multiprocessing
+import os
+import signal
+
+app_dir = os.path.dirname(os.path.abspath(__file__))
+
+wsgi_app = "main:create_app()"
+chdir = app_dir
+# The planning engine is imported as the travel_planner package from app/
+pythonpath = app_dir
+
+bind = os.environ.get("WEB_BIND", f"0.0.0.0:{os.environ.get('PORT', '3000')}")
+workers = int(os.environ.get("WEB_WORKERS", min(8, multiprocessing.cpu_count() * 2)))
+worker_class = "gthread"
+threads = int(os.environ.get("WEB_THREADS", 8))
+# Seconds without a heartbeat before the master restarts a worker (not a request timeout:
+# /api/plan gives up after PLAN_TIMEOUT and cancels its crew itself)
+timeout = int(os.environ.get("WEB_WORKER_TIMEOUT", 60))
+# Seconds a stopping worker gets to finish its requests and plan jobs before it is killed
+graceful_timeout = int(os.environ.get("WEB_GRACEFUL_TIMEOUT", 120))
+keepalive = 5
+accesslog = os.environ.get("WEB_ACCESS_LOG", "-")
+
+
+def post_worker_init(worker):
+    # On SIGTERM, stop taking plan jobs right away (/readyz turns 503) before gunicorn drains the requests
+    handle_exit = signal.getsignal(signal.SIGTERM)
+
+    def handle_term(signum, frame):
+        from travel_planner import get_runtime
+        get_runtime().stop_accepting()
+        if callable(handle_exit):
+            handle_exit(signum, frame)
+
+    signal.signal(signal.SIGTERM, handle_term)
+
+
+def worker_exit(server, worker):
+    # Plan jobs outlive the requests that queued them (/api/plan/jobs): let them finish, or cancel them
+    from travel_planner import get_runtime
+    if not get_runtime().shutdown(timeout=max(1, graceful_timeout // 2)):
+        worker.log.warning("Cancelled plan jobs that did not finish before the shutdown")
@@ -1,64 +1,338 @@
-from flask import Flask, request, jsonify, render_template
-from travel_planner.travel_planner_crew import TravelPlannerCrew
+import json
 
-# Initialize Flask application
-app = Flask(__name__)
+from flask import Blueprint, Flask, Response, request, jsonify, render_template, stream_with_context, url_for
+
+# Plans go through the process-wide runtime of the planning engine, shared with the CLIs and batch jobs
+from travel_planner import NoItineraryError, PlanCancelled, QueueFullError, ShuttingDownError, get_runtime
+from travel_planner import settings, telemetry
+from travel_planner.batch import parse_trip, read_trips
+from travel_planner.jobs import FAILED, SUCCEEDED
+from travel_planner.serialization import (
+    available_encodings, compress, encode_record, etag_matches, extend, parse_exclude, serialize
+)
+
+# The routes of the planner; create_app() mounts them on a Flask application
+planner = Blueprint('planner', __name__)
+
+
+def create_app() -> Flask:
+    """Creates the Flask application (the production server calls this in every worker)"""
+    app = Flask(__name__)
+    app.register_blueprint(planner)
+    # Preloads the agent stack and starts the refresh scheduler, when the settings ask for them
+    get_runtime().start()
+    return app
+
+
+def cache_requested() -> bool:
+    """Returns False when the client asked to bypass the itinerary cache"""
+    if request.values.get('cache', '').strip().lower() in ('0', 'false', 'no', 'off'):
+        return False
+    return 'no-cache' not in request.headers.get('Cache-Control', '')
+
+
+def timings_requested() -> bool:
+    """Returns True when the client asked for the per-stage timing breakdown"""
+    return request.values.get('timings', '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def read_trip_form():
+    """Reads the trip parameters from the submitted form (or the query string of a GET)"""
+    values = request.form if request.method == 'POST' else request.args
+    city = values.get('city')
+    days = int(values.get('days'))
+    attractions_per_day = int(values.get('attractions_per_day'))
+    return city, days, attractions_per_day
+
+
+def itinerary_response(itinerary, extra=None):
+    """Sends an itinerary from its precompiled JSON, compressed and with an ETag
+
+    ?exclude= leaves fields out (e.g. exclude=description,address). Bodies with
+    extra fields (the timings) are built per request and get no ETag.
+    """
+    try:
+        exclude = parse_exclude(request.args.get('exclude'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    encoding = request.accept_encodings.best_match(available_encodings()) or 'identity'
+    serialized = serialize(itinerary)
+    headers = {'Vary': 'Accept-Encoding', 'Cache-Control': 'no-cache'}
+
+    if extra:
+        body, _, _ = serialized.variant(exclude)
+        body = extend(body, extra)
+        if len(body) < settings.RESPONSE_COMPRESS_MIN_BYTES:
+            encoding = 'identity'
+        body = compress(body, encoding)
+    else:
+        body, etag, encoding = serialized.variant(exclude, encoding)
+        headers['ETag'] = f'"{etag}"' if encoding == 'identity' else f'"{etag}-{encoding}"'
+        if request.method in ('GET', 'HEAD') and etag_matches(request.headers.get('If-None-Match'), etag):
+            # The client already has this itinerary
+            return Response(status=304, headers=headers)
+
+    if encoding != 'identity':
+        headers['Content-Encoding'] = encoding
+    return Response(body, mimetype='application/json', headers=headers)
+
+
+def queue_full_response(error: QueueFullError):
+    """Tells the client to come back later instead of letting it wait on a full queue"""
+    response = jsonify({"error": str(error)})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+
+def shutting_down_response(error: ShuttingDownError):
+    """Sends clients to another worker while this one drains"""
+    response = jsonify({"error": str(error)})
+    response.status_code = 503
+    response.headers['Retry-After'] = '1'
+    return response
+
+
+def job_result_response(job, timings: bool = False):
+    """Turns a finished job into the response /api/plan has always returned"""
+    if job.status == SUCCEEDED:
+        # Return the pydantic output in JSON format, from the bytes built when it was first served
+        if timings and job.trace is not None:
+            return itinerary_response(job.result, {"timings": job.trace.summary()})
+        return itinerary_response(job.result)
+
+    if isinstance(job.error, NoItineraryError):
+        # Return an error message if no itinerary is generated
+        return jsonify({"error": "No travel itinerary generated"}), 404
+
+    if isinstance(job.error, PlanCancelled):
+        # The client (or a shutdown) cancelled the plan
+        return jsonify({"error": str(job.error)}), 409
+
+    if isinstance(job.error, TimeoutError):
+        # The shared crew run did not finish within the plan timeout
+        return jsonify({"error": f"Error generating travel plan: {str(job.error)}"}), 504
+
+    # Return an error message if there is an exception during crew execution
+    return jsonify({"error": f"Error generating travel plan: {str(job.error)}"}), 500
 
 
 # Route for the home page
-@app.route('/')
+@planner.route('/')
 def index():
     # Render the HTML template
     return render_template('index-beautiful.html')
 
 
-@app.route('/api/plan', methods=['POST'])
+@planner.route('/healthz', methods=['GET'])
+def healthz():
+    # Liveness: answered at once, whether or not the agent stack has been loaded yet
+    return jsonify({"status": "ok", "agent_stack_loaded": get_runtime().agent_stack_loaded})
+
+
+@planner.route('/readyz', methods=['GET'])
+def readyz():
+    # Readiness: a load balancer only sends plans to workers that can take one now
+    runtime = get_runtime()
+    jobs = runtime.jobs.stats()
+    checks = {
+        "draining": jobs["draining"],
+        "queue_full": jobs["running"] + jobs["queued"] >= jobs["workers"] + jobs["queue_size"],
+        # With a preload configured, a worker is only ready once it finished
+        "agent_stack_loading": settings.PRELOAD_AGENT_STACK != "off" and not runtime.agent_stack_loaded,
+    }
+    ready = not any(checks.values())
+    return jsonify({"status": "ready" if ready else "not ready", "checks": checks}), 200 if ready else 503
+
+
+@planner.route('/api/plan', methods=['GET'])
+def cached_plan():
+    # GETs are safe: they only serve itineraries that are already cached, never start a crew run
+    try:
+        city, days, attractions_per_day = read_trip_form()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    itinerary = None
+    if settings.ITINERARY_CACHE_ENABLED:
+        itinerary = get_runtime().itinerary_cache.get(city, days, attractions_per_day)
+    if itinerary is None:
+        return jsonify({"error": "No cached itinerary for this trip: POST to /api/plan to plan it"}), 404
+    return itinerary_response(itinerary)
+
+
+@planner.route('/api/plan', methods=['POST'])
 def plan_trip():
     try:
         # Get form data
-        city = request.form.get('city')
-        days = int(request.form.get('days'))
-        attractions_per_day = int(request.form.get('attractions_per_day'))
-
-        # Calculate total attractions needed
-        total_attractions = days * attractions_per_day
-
-        try:
-            # Initialize the TravelPlannerCrew instance
-            travel_planner = TravelPlannerCrew()
-            
-            # Run the crew
-            result = travel_planner.travel_crew().kickoff(inputs={
-                "city": city,
-                "days": days,
-                "attractions_per_day": attractions_per_day,
-                "total_attractions": total_attractions
-            })
-
-            if result.pydantic:
-                # Return the pydantic output in JSON format
-                return jsonify(result.pydantic.model_dump())
-            
-            # Return an error message if no itinerary is generated
-            return jsonify({"error": "No travel itinerary generated"}), 404
-
-        except Exception as e:
-            # Return an error message if there is an exception during crew execution
-            return jsonify({"error": f"Error generating travel plan: {str(e)}"}), 500
-
-        # Further processing will be done here...
+        city, days, attractions_per_day = read_trip_form()
+    except Exception as e:
+        # Return an error message if there is an exception in the request processing
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        # Run the plan on the worker pool and wait for it, like a job client would
+        job = get_runtime().submit(city, days, attractions_per_day, use_cache=cache_requested())
+    except QueueFullError as e:
+        return queue_full_response(e)
+    except ShuttingDownError as e:
+        return shutting_down_response(e)
+
+    if not job.wait(settings.PLAN_TIMEOUT):
+        # Nobody will read the result: stop the crew instead of letting it run on
+        job.cancel("timed out")
+        return jsonify({"error": "Error generating travel plan: timed out"}), 504
+    return job_result_response(job, timings=timings_requested())
 
+
+@planner.route('/api/plan/batch', methods=['POST'])
+def plan_batch():
+    # Trips come as JSON ({"trips": [...]}) or as JSONL, one trip per line
+    try:
+        if request.is_json:
+            body = request.get_json()
+            trips = []
+            for number, data in enumerate(body.get("trips") or [], start=1):
+                try:
+                    trips.append(parse_trip(data))
+                except (ValueError, TypeError) as e:
+                    trips.append({"id": f"trip-{number}", "error": str(e)})
+            options = body
+        else:
+            trips = list(read_trips(request.get_data(as_text=True).splitlines()))
+            options = request.args
+        concurrency = min(int(options.get("concurrency", settings.BATCH_CONCURRENCY)), settings.BATCH_MAX_CONCURRENCY)
+        rate = float(options.get("rate", settings.BATCH_RATE))
     except Exception as e:
-        return jsonify({"error": str(e)}), 400        
+        return jsonify({"error": str(e)}), 400
+
+    if not trips:
+        return jsonify({"error": "No trips given"}), 400
+    if len(trips) > settings.BATCH_MAX_TRIPS:
+        return jsonify({"error": f"At most {settings.BATCH_MAX_TRIPS} trips per batch"}), 413
+
+    try:
+        # Every trip is a job of the shared pool: refused when it is full, drained at shutdown
+        batch = get_runtime().submit_batch(trips, concurrency, rate, use_cache=cache_requested())
+    except QueueFullError as e:
+        return queue_full_response(e)
+    except ShuttingDownError as e:
+        return shutting_down_response(e)
+
+    def stream():
+        # Every itinerary is sent as soon as it is ready, one JSON object per line
+        for result in batch:
+            yield encode_record(result) + b"\n"
+
+    response = Response(
+        stream_with_context(stream()),
+        mimetype='application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    # A disconnected client drops the trips not planned yet (a no-op once the batch finished)
+    response.call_on_close(lambda: batch.cancel("client disconnected"))
+    return response
+
+
+@planner.route('/api/plan/jobs', methods=['POST'])
+def create_plan_job():
+    try:
+        city, days, attractions_per_day = read_trip_form()
     except Exception as e:
-        # Return an error message if there is an exception in the request processing
         return jsonify({"error": str(e)}), 400
-    
+
+    try:
+        job = get_runtime().submit(city, days, attractions_per_day, use_cache=cache_requested())
+    except QueueFullError as e:
+        return queue_full_response(e)
+    except ShuttingDownError as e:
+        return shutting_down_response(e)
+
+    # Accepted: the client polls the status URL until the job finished
+    data = job.to_dict()
+    data["status_url"] = url_for('.plan_job_status', job_id=job.id)
+    data["result_url"] = url_for('.plan_job_result', job_id=job.id)
+    data["events_url"] = url_for('.plan_job_events', job_id=job.id)
+    return jsonify(data), 202, {'Location': data["status_url"]}
+
+
+@planner.route('/api/plan/jobs/<job_id>', methods=['GET'])
+def plan_job_status(job_id):
+    job = get_runtime().jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(job.to_dict())
+
+
+@planner.route('/api/plan/jobs/<job_id>', methods=['DELETE'])
+def cancel_plan_job(job_id):
+    job = get_runtime().jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+
+    # The crew stops at its next step; the job then fails with a cancellation error
+    job.cancel("cancelled by the client")
+    return jsonify(job.to_dict()), 202
+
+
+@planner.route('/api/plan/jobs/<job_id>/result', methods=['GET'])
+def plan_job_result(job_id):
+    job = get_runtime().jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+
+    if job.status not in (SUCCEEDED, FAILED):
+        # Not done yet: same body as the status endpoint
+        return jsonify(job.to_dict()), 202
+    return job_result_response(job, timings=timings_requested())
+
+
+@planner.route('/api/plan/jobs/<job_id>/events', methods=['GET'])
+def plan_job_events(job_id):
+    job = get_runtime().jobs.get(job_id)
+    if job is None or job.events is None:
+        return jsonify({"error": "Unknown job"}), 404
+
+    # EventSource sends the id of the last event it saw when it reconnects
+    try:
+        start = int(request.headers.get('Last-Event-ID', -1)) + 1
+    except ValueError:
+        start = 0
+
+    def stream():
+        for item in job.events.follow(start):
+            if item is None:
+                # Comment line that keeps proxies from closing an idle stream
+                yield ": keep-alive\n\n"
+                continue
+            index, event, data = item
+            yield f"id: {index}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+
+    return Response(
+        stream_with_context(stream()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@planner.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    # Hit/miss counters of the itinerary cache, the request coalescing, the job pool and the tools
+    return jsonify(get_runtime().stats())
+
+
+@planner.route('/metrics', methods=['GET'])
+def metrics():
+    # Stage, tool, token and retry metrics in the Prometheus text format
+    return Response(telemetry.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
 
 if __name__ == '__main__':
-    # Only run the app when this file is executed directly
-    app.run(
+    # Only run the development server when this file is executed directly;
+    # production uses gunicorn with gunicorn_config.py
+    create_app().run(
         host='0.0.0.0',  # Listen on all network interfaces
         port=3000,       # Run on port 3000
         debug=True       # Enable debug mode for development
-    )
\ No newline at end of file
+    )
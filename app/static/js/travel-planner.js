@@ -1,6 +1,184 @@
+// Builds the markup of a single day of the itinerary
+function renderDay(day) {
+    return `
+        <div class="day-plan mb-4" data-day="${day.day_number}">
+            <h6>Day ${day.day_number}</h6>
+            <ul class="list-group">
+                ${day.attractions.map(attraction => `
+                    <li class="list-group-item">
+                        <strong>${attraction.name}</strong><br>
+                        <small class="text-muted">${attraction.category} • ${attraction.estimated_duration}</small><br>
+                        ${attraction.address ? `<small class="text-muted">${attraction.address}</small><br>` : ''}
+                        ${attraction.description}
+                    </li>
+                `).join('')}
+            </ul>
+            ${day.meal_suggestions ? `
+                <div class="mt-2">
+                    <small class="text-muted">Meal Suggestions:</small>
+                    <ul class="list-unstyled">
+                        ${day.meal_suggestions.map(suggestion => `
+                            <li>• ${suggestion}</li>
+                        `).join('')}
+                    </ul>
+                </div>
+            ` : ''}
+        </div>
+    `;
+}
+
+// Builds the markup of the overall tips
+function renderTips(tips) {
+    return `
+        <div class="overall-tips mt-4">
+            <h6>Overall Tips</h6>
+            <div class="alert alert-info">
+                ${tips}
+            </div>
+        </div>
+    `;
+}
+
+// Builds the markup of a complete itinerary
+function renderItinerary(data) {
+    let html = '<div class="itinerary">';
+    if (data.daily_plans && Array.isArray(data.daily_plans)) {
+        data.daily_plans.forEach((day) => {
+            html += renderDay(day);
+        });
+
+        // Add overall tips if available
+        if (data.overall_tips) {
+            html += renderTips(data.overall_tips);
+        }
+    } else {
+        html += '<div class="alert alert-warning">No itinerary data available</div>';
+    }
+    html += '</div>';
+    return html;
+}
+
+function showError(message) {
+    document.getElementById('resultsContent').innerHTML = `
+        <div class="alert alert-danger">
+            ${message || 'An error occurred while planning your trip.'}
+        </div>
+    `;
+}
+
+function hideSpinner() {
+    document.getElementById('loadingSpinner').style.display = 'none';
+}
+
+// Inserts a day at its position so days that arrive out of order still render in order
+function insertDay(container, day) {
+    if (container.querySelector(`[data-day="${day.day_number}"]`)) {
+        return;
+    }
+    const wrapper = document.createElement('div');
+    wrapper.innerHTML = renderDay(day).trim();
+    const element = wrapper.firstChild;
+    const next = Array.from(container.children).find(child => Number(child.dataset.day) > day.day_number);
+    container.insertBefore(element, next || null);
+}
+
+// Describes a progress event in the status line
+function describeProgress(type, data) {
+    switch (type) {
+        case 'cache_hit':
+            return 'Found a recently planned itinerary.';
+        case 'task_started':
+            return data.task.startsWith('research') ? 'Researching attractions…' : 'Planning your days…';
+        case 'tool_call':
+            return `Using ${data.tool}…`;
+        case 'research':
+            return 'Research finished, planning your days…';
+        default:
+            return null;
+    }
+}
+
+// Synchronous API, used when the browser cannot stream events
+async function planWithoutStreaming(formData) {
+    const response = await fetch('/api/plan', {
+        method: 'POST',
+        body: formData
+    });
+
+    const data = await response.json();
+    console.log('Response data:', data);
+
+    if (response.ok && data) {
+        document.getElementById('resultsContent').innerHTML = renderItinerary(data);
+    } else {
+        showError(data.error);
+    }
+    hideSpinner();
+}
+
+// Job API: the days are rendered as soon as the server validates them
+async function planWithStreaming(formData) {
+    const response = await fetch('/api/plan/jobs', {
+        method: 'POST',
+        body: formData
+    });
+    const job = await response.json();
+
+    if (!response.ok) {
+        // A full queue (429) already says in its error when to retry
+        showError(job.error);
+        hideSpinner();
+        return;
+    }
+
+    document.getElementById('resultsContent').innerHTML = `
+        <div id="planStatus" class="text-muted small mb-3">Waiting for a free planner…</div>
+        <div class="itinerary" id="itineraryDays"></div>
+    `;
+    const status = document.getElementById('planStatus');
+    const days = document.getElementById('itineraryDays');
+
+    const source = new EventSource(job.events_url);
+    const listen = (type, handler) => source.addEventListener(type, (event) => handler(JSON.parse(event.data)));
+
+    ['cache_hit', 'task_started', 'tool_call', 'research'].forEach((type) => {
+        listen(type, (data) => {
+            const message = describeProgress(type, data);
+            if (message) {
+                status.textContent = message;
+            }
+        });
+    });
+
+    listen('day', (day) => {
+        insertDay(days, day);
+    });
+
+    listen('completed', (data) => {
+        source.close();
+        // The final itinerary also carries the overall tips
+        document.getElementById('resultsContent').innerHTML = renderItinerary(data.itinerary);
+        hideSpinner();
+    });
+
+    listen('failed', (data) => {
+        source.close();
+        showError(`Error generating travel plan: ${data.error}`);
+        hideSpinner();
+    });
+
+    source.onerror = () => {
+        // EventSource reconnects on its own; give up only once it is closed for good
+        if (source.readyState === EventSource.CLOSED) {
+            showError();
+            hideSpinner();
+        }
+    };
+}
+
 document.getElementById('tripForm').addEventListener('submit', async function(e) {
     e.preventDefault();
-    
+
     // Show loading spinner and results card
     document.getElementById('loadingSpinner').style.display = 'block';
     document.getElementById('resultsCard').style.display = 'block';
@@ -9,79 +187,14 @@ document.getElementById('tripForm').addEventListener('submit', async function(e)
     const formData = new FormData(this);
 
     try {
-        const response = await fetch('/plan', {
-            method: 'POST',
-            body: formData
-        });
-
-        const data = await response.json();
-        console.log('Response data:', data);
-        
-        if (response.ok && data) {
-            // Display the itinerary
-            let html = '<div class="itinerary">';
-            if (data.daily_plans && Array.isArray(data.daily_plans)) {
-                data.daily_plans.forEach((day) => {
-                    html += `
-                        <div class="day-plan mb-4">
-                            <h6>Day ${day.day_number}</h6>
-                            <ul class="list-group">
-                                ${day.attractions.map(attraction => `
-                                    <li class="list-group-item">
-                                        <strong>${attraction.name}</strong><br>
-                                        <small class="text-muted">${attraction.category} • ${attraction.estimated_duration}</small><br>
-                                        ${attraction.address ? `<small class="text-muted">${attraction.address}</small><br>` : ''}
-                                        ${attraction.description}
-                                    </li>
-                                `).join('')}
-                            </ul>
-                            ${day.meal_suggestions ? `
-                                <div class="mt-2">
-                                    <small class="text-muted">Meal Suggestions:</small>
-                                    <ul class="list-unstyled">
-                                        ${day.meal_suggestions.map(suggestion => `
-                                            <li>• ${suggestion}</li>
-                                        `).join('')}
-                                    </ul>
-                                </div>
-                            ` : ''}
-                        </div>
-                    `;
-                });
-                
-                // Add overall tips if available
-                if (data.overall_tips) {
-                    html += `
-                        <div class="overall-tips mt-4">
-                            <h6>Overall Tips</h6>
-                            <div class="alert alert-info">
-                                ${data.overall_tips}
-                            </div>
-                        </div>
-                    `;
-                }
-            } else {
-                html += '<div class="alert alert-warning">No itinerary data available</div>';
-            }
-            html += '</div>';
-            document.getElementById('resultsContent').innerHTML = html;
+        if (window.EventSource) {
+            await planWithStreaming(formData);
         } else {
-            // Display error message
-            document.getElementById('resultsContent').innerHTML = `
-                <div class="alert alert-danger">
-                    ${data.error || 'An error occurred while planning your trip.'}
-                </div>
-            `;
+            await planWithoutStreaming(formData);
         }
     } catch (error) {
         console.error('Error:', error);
-        document.getElementById('resultsContent').innerHTML = `
-            <div class="alert alert-danger">
-                An error occurred while planning your trip. Please try again.
-            </div>
-        `;
-    } finally {
-        // Hide loading spinner
-        document.getElementById('loadingSpinner').style.display = 'none';
+        showError('An error occurred while planning your trip. Please try again.');
+        hideSpinner();
     }
-}); 
\ No newline at end of file
+});
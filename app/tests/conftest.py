@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The planning engine is imported as a package from app/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,61 @@
+import threading
+import time
+
+import pytest
+
+from travel_planner import cancellation
+from travel_planner.singleflight import SingleFlight
+
+
+def test_caller_after_abandon_starts_new_execution():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def abandoned():
+        # Keeps the cancelled execution running while the next caller arrives
+        release.wait(5)
+        cancellation.check()
+        return "stale"
+
+    with pytest.raises(TimeoutError):
+        flight.do("paris", abandoned, timeout=0.1)
+
+    try:
+        assert flight.do("paris", lambda: "fresh", timeout=5) == "fresh"
+    finally:
+        release.set()
+    assert flight.stats()["executions"] == 2
+
+
+def test_abandoned_execution_does_not_forget_newer_one():
+    flight = SingleFlight()
+    release_old = threading.Event()
+    release_new = threading.Event()
+    started_new = threading.Event()
+
+    def old():
+        release_old.wait(5)
+        return "old"
+
+    def new():
+        started_new.set()
+        release_new.wait(5)
+        return "new"
+
+    with pytest.raises(TimeoutError):
+        flight.do("paris", old, timeout=0.1)
+
+    results = []
+    caller = threading.Thread(target=lambda: results.append(flight.do("paris", new, timeout=5)))
+    caller.start()
+    assert started_new.wait(5)
+
+    # The abandoned execution finishing must leave the running one joinable
+    release_old.set()
+    time.sleep(0.2)
+    assert flight.in_flight() == 1
+
+    release_new.set()
+    caller.join(5)
+    assert results == ["new"]
+    assert flight.in_flight() == 0
@@ -0,0 +1,16 @@
+"""Travel planning engine
+
+The web app, the CLIs and batch jobs all plan through the process-wide runtime:
+
+    from travel_planner import get_runtime
+
+    itinerary = get_runtime().plan("Paris", days=2, attractions_per_day=3)
+
+Importing the package is cheap: the agent stack (crewai, crewai_tools,
+langchain) is only loaded for the first plan.
+"""
+from .cancellation import PlanCancelled
+from .jobs import QueueFullError, ShuttingDownError
+from .models import Attraction, DailyPlan, ResearchFindings, TravelItinerary
+from .planning import NoItineraryError
+from .runtime import Runtime, get_runtime
@@ -0,0 +1,48 @@
+"""Plans one trip and prints its itinerary as JSON
+
+    cd app && python -m travel_planner Paris --days 2 --attractions-per-day 3
+
+Many trips at once: python -m travel_planner.batch (see batch.py).
+"""
+import argparse
+import json
+import sys
+from typing import List, Optional
+
+from . import telemetry
+from .runtime import get_runtime
+from .serialization import serialize
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    p = argparse.ArgumentParser("Plan one trip and print its itinerary")
+    p.add_argument("city", help="City to visit")
+    p.add_argument("--days", type=int, default=2, help="Days of the trip")
+    p.add_argument("--attractions-per-day", type=int, default=2, help="Attractions per day")
+    p.add_argument("--no-cache", action="store_true", help="Plan again even when the itinerary is cached")
+    p.add_argument("--timings", action="store_true", help="Print the time per stage to stderr")
+    return p.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    runtime = get_runtime()
+    trace = telemetry.Trace()
+    try:
+        with trace.attach():
+            itinerary = runtime.plan(args.city, args.days, args.attractions_per_day, use_cache=not args.no_cache)
+    except Exception as e:
+        print(f"Error generating travel plan: {e}", file=sys.stderr)
+        return 1
+    finally:
+        trace.finish()
+        runtime.shutdown()
+
+    sys.stdout.write(serialize(itinerary).body.decode("utf-8") + "\n")
+    if args.timings:
+        print(json.dumps(trace.summary(), indent=2), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
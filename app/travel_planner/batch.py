@@ -0,0 +1,324 @@
+"""Plans many trips in one run
+
+Reads one trip per line as JSON ({"city": ..., "days": ..., "attractions_per_day": ...,
+optional "id"}) and writes one result per line as soon as it is ready:
+
+    cd app && python -m travel_planner.batch trips.jsonl -o itineraries.jsonl --concurrency 8 --rate 2
+
+Finished trips are skipped when the same output file is used again, so an
+interrupted batch resumes where it stopped.
+"""
+import argparse
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+from . import cancellation, settings
+from .itinerary_cache import itinerary_key
+from .jobs import SUCCEEDED, Job, QueueFullError, ShuttingDownError
+from .planning import get_job_manager, plan_itinerary
+from .serialization import encode_record
+
+
+class RateLimiter:
+    """Spaces out calls so that at most rate of them start per second"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def acquire(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def parse_trip(data: Any) -> Dict[str, Any]:
+    """Validates one batch entry and returns it with its id"""
+    if not isinstance(data, dict):
+        raise ValueError("A trip must be a JSON object")
+    city = str(data.get("city") or "").strip()
+    if not city:
+        raise ValueError("A trip needs a city")
+    days = int(data.get("days"))
+    attractions_per_day = int(data.get("attractions_per_day"))
+    if days < 1 or attractions_per_day < 1:
+        raise ValueError("days and attractions_per_day must be positive")
+    return {
+        "id": str(data.get("id") or itinerary_key(city, days, attractions_per_day)),
+        "city": city,
+        "days": days,
+        "attractions_per_day": attractions_per_day,
+    }
+
+
+def read_trips(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """Parses JSONL input; invalid lines become trips with an error instead of stopping the batch"""
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield parse_trip(json.loads(line))
+        except (ValueError, TypeError) as e:
+            yield {"id": f"line-{number}", "error": str(e)}
+
+
+def completed_ids(path: str) -> Set[str]:
+    """Returns the ids of the trips an earlier run already planned into path"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, 'r', encoding='utf-8') as file:
+        for line in file:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                # The last line of an interrupted run may be cut off
+                continue
+            if result.get("status") == "succeeded":
+                done.add(result.get("id"))
+    return done
+
+
+def plan_trip(trip: Dict[str, Any], limiter: RateLimiter, use_cache: bool) -> Dict[str, Any]:
+    """Plans one trip and returns its result record"""
+    result = {key: trip.get(key) for key in ("id", "city", "days", "attractions_per_day")}
+    if "error" in trip:
+        result.update(status="failed", error=trip["error"])
+        return result
+
+    limiter.acquire()
+    start = time.perf_counter()
+    try:
+        itinerary = plan_itinerary(trip["city"], trip["days"], trip["attractions_per_day"], use_cache=use_cache)
+    except Exception as e:
+        result.update(status="failed", error=str(e))
+    else:
+        # Kept as the model: encode_record() sends its precompiled JSON
+        result.update(status="succeeded", itinerary=itinerary)
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def _plan_cancellable(token: cancellation.CancelToken, trip: Dict[str, Any], limiter: RateLimiter,
+                      use_cache: bool) -> Dict[str, Any]:
+    with token.attach():
+        return plan_trip(trip, limiter, use_cache)
+
+
+def run_batch(trips: Iterable[Dict[str, Any]], concurrency: int = settings.BATCH_CONCURRENCY,
+              rate: float = settings.BATCH_RATE, use_cache: bool = True,
+              skip: Optional[Set[str]] = None) -> Iterator[Dict[str, Any]]:
+    """Plans the trips concurrently in this process and yields their results in completion order
+
+    The plans share the process-wide caches, tools and request coalescing with
+    the web app, but not its worker pool (see submit_batch). Only a few trips
+    more than concurrency are read ahead, so the input can be long.
+    """
+    limiter = RateLimiter(rate)
+    skip = skip or set()
+    # future -> the cancellation token of its plan
+    pending: Dict[Future, cancellation.CancelToken] = {}
+    trips = iter(trips)
+    exhausted = False
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="plan-batch") as pool:
+        try:
+            while pending or not exhausted:
+                while not exhausted and len(pending) < 2 * concurrency:
+                    trip = next(trips, None)
+                    if trip is None:
+                        exhausted = True
+                    elif trip["id"] not in skip:
+                        token = cancellation.CancelToken()
+                        future = pool.submit(
+                            contextvars.copy_context().run, _plan_cancellable, token, trip, limiter, use_cache
+                        )
+                        pending[future] = token
+                if not pending:
+                    break
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    del pending[future]
+                    yield future.result()
+        finally:
+            # A closed generator (interrupted CLI, disconnected client) drops the trips not started yet
+            # and stops the running ones, so that leaving the pool does not wait for whole crew runs
+            for future, token in pending.items():
+                future.cancel()
+                token.cancel("stopped with the batch")
+
+
+class BatchJobs:
+    """The trips of a batch, planned as jobs of the shared worker pool (see submit_batch)
+
+    Iterating yields the results in completion order. At most concurrency
+    trips are queued or running at a time; when the pool is full, the next
+    trip waits for one of them.
+    """
+
+    def __init__(self, trips: Iterable[Dict[str, Any]], concurrency: int, rate: float, use_cache: bool):
+        self.trips = iter(trips)
+        self.concurrency = max(1, concurrency)
+        self.limiter = RateLimiter(rate)
+        self.use_cache = use_cache
+        self.jobs = get_job_manager()
+        # job -> its trip, for the jobs queued or running
+        self.pending: Dict[Job, Dict[str, Any]] = {}
+        # Results known without a job (invalid trips)
+        self.ready: deque = deque()
+        # A trip the full pool refused, submitted again once a job of the batch finished
+        self.deferred: Optional[Dict[str, Any]] = None
+        self.exhausted = False
+        self._lock = threading.Lock()
+
+    def _submit(self, trip: Dict[str, Any]) -> Job:
+        # No-op limiter: the rate was applied before the job was queued, not on a worker
+        job = self.jobs.submit(
+            lambda: plan_trip(trip, RateLimiter(0), self.use_cache),
+            params={"city": trip["city"], "days": trip["days"], "attractions_per_day": trip["attractions_per_day"]}
+        )
+        with self._lock:
+            self.pending[job] = trip
+        return job
+
+    def fill(self) -> None:
+        """Queues trips until concurrency of them are pending or the pool is full
+
+        Raises QueueFullError when the pool is full and none of the batch's own
+        jobs is pending to wait for, and ShuttingDownError while it drains.
+        """
+        while not self.exhausted and len(self.pending) < self.concurrency:
+            trip, self.deferred = self.deferred or next(self.trips, None), None
+            if trip is None:
+                self.exhausted = True
+            elif "error" in trip:
+                self.ready.append(plan_trip(trip, self.limiter, self.use_cache))
+            else:
+                self.limiter.acquire()
+                try:
+                    self._submit(trip)
+                except QueueFullError:
+                    self.deferred = trip
+                    if not self.pending:
+                        raise
+                    return
+
+    def _finished(self) -> List[Job]:
+        while True:
+            with self._lock:
+                jobs = list(self.pending)
+            finished = [job for job in jobs if job.done.is_set()]
+            if finished:
+                return finished
+            jobs[0].done.wait(0.1)
+
+    def _result(self, job: Job) -> Dict[str, Any]:
+        with self._lock:
+            trip = self.pending.pop(job)
+        if job.status == SUCCEEDED:
+            return job.result
+        # Cancelled before it started (shutdown, disconnected client)
+        result = {key: trip.get(key) for key in ("id", "city", "days", "attractions_per_day")}
+        result.update(status="failed", error=str(job.error))
+        return result
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        while self.ready or self.pending or self.deferred or not self.exhausted:
+            while self.ready:
+                yield self.ready.popleft()
+            try:
+                self.fill()
+            except QueueFullError as e:
+                # Busy with other plans: try again once a slot may be free
+                time.sleep(e.retry_after)
+                continue
+            except ShuttingDownError as e:
+                # The trips not queued yet are reported as failed; the queued ones still finish
+                for trip in filter(None, [self.deferred] + list(self.trips)):
+                    result = {key: trip.get(key) for key in ("id", "city", "days", "attractions_per_day")}
+                    result.update(status="failed", error=trip.get("error") or str(e))
+                    self.ready.append(result)
+                self.deferred = None
+                self.exhausted = True
+                continue
+            if self.pending:
+                for job in self._finished():
+                    yield self._result(job)
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        """Drops the trips not queued yet and cancels the queued and running ones"""
+        self.exhausted = True
+        self.deferred = None
+        with self._lock:
+            jobs = list(self.pending)
+        for job in jobs:
+            job.cancel(reason)
+
+
+def submit_batch(trips: Iterable[Dict[str, Any]], concurrency: int = settings.BATCH_CONCURRENCY,
+                 rate: float = settings.BATCH_RATE, use_cache: bool = True) -> BatchJobs:
+    """Queues the first trips of a batch on the shared worker pool and returns the batch to iterate
+
+    Every trip is a job of its own, so batches count against JOB_WORKERS, the
+    queue bound, the readiness checks and the shutdown drain like single plans.
+    Raises QueueFullError or ShuttingDownError when not even one trip can be queued.
+    """
+    batch = BatchJobs(trips, concurrency, rate, use_cache)
+    batch.fill()
+    return batch
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    p = argparse.ArgumentParser("Plan many trips from a JSONL file")
+    p.add_argument("input", help="JSONL file with one trip per line ('-' for stdin)")
+    p.add_argument("-o", "--output", required=True, help="JSONL file the results are appended to")
+    p.add_argument("--concurrency", type=int, default=settings.BATCH_CONCURRENCY, help="Plans run at the same time")
+    p.add_argument("--rate", type=float, default=settings.BATCH_RATE, help="Plans started per second (0: no limit)")
+    p.add_argument("--no-cache", action="store_true", help="Plan again even when the itinerary is cached")
+    p.add_argument("--restart", action="store_true", help="Plan every trip again instead of resuming")
+    return p.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    skip = set() if args.restart else completed_ids(args.output)
+    if skip:
+        print(f"Resuming: {len(skip)} trip(s) already planned", file=sys.stderr)
+
+    source = sys.stdin if args.input == "-" else open(args.input, 'r', encoding='utf-8')
+    succeeded = failed = 0
+    try:
+        with open(args.output, 'wb' if args.restart else 'ab') as output:
+            for result in run_batch(read_trips(source), args.concurrency, args.rate, not args.no_cache, skip):
+                # One flushed line per trip is the checkpoint a resumed run reads back
+                output.write(encode_record(result) + b"\n")
+                output.flush()
+                if result["status"] == "succeeded":
+                    succeeded += 1
+                else:
+                    failed += 1
+                    print(f"{result['id']}: {result['error']}", file=sys.stderr)
+    except KeyboardInterrupt:
+        print("Interrupted; run the same command again to resume", file=sys.stderr)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    print(f"{succeeded} planned, {failed} failed, {len(skip)} skipped", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
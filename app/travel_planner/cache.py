@@ -0,0 +1,243 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class SQLiteStore:
+    """A small key/value table in SQLite shared by all caches using the same file"""
+
+    _stores: Dict[str, "SQLiteStore"] = {}
+    _stores_lock = threading.Lock()
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self._lock = threading.Lock()
+        # One connection guarded by a lock is enough for the low write rate of the caches
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_cache_entries_expiry ON cache_entries (namespace, expires_at)"
+        )
+        self._conn.commit()
+
+    @classmethod
+    def open(cls, path: str) -> "SQLiteStore":
+        """Returns the shared store for a database file"""
+        path = os.path.abspath(path)
+        with cls._stores_lock:
+            store = cls._stores.get(path)
+            if store is None:
+                store = cls._stores[path] = cls(path)
+            return store
+
+    def get(self, namespace: str, key: str):
+        """Returns (value, created_at, expires_at) or None"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT value, created_at, expires_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            ).fetchone()
+
+    def set(self, namespace: str, key: str, value: str, created_at: float, expires_at: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (namespace, key, value, created_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, value, created_at, expires_at),
+            )
+            self._conn.commit()
+
+    def delete(self, namespace: str, key: Optional[str] = None) -> None:
+        with self._lock:
+            if key is None:
+                self._conn.execute("DELETE FROM cache_entries WHERE namespace = ?", (namespace,))
+            else:
+                self._conn.execute(
+                    "DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (namespace, key)
+                )
+            self._conn.commit()
+
+    def prune(self, namespace: str, max_entries: Optional[int], now: float) -> int:
+        """Drops expired entries and keeps at most max_entries of the newest ones"""
+        with self._lock:
+            removed = self._conn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND expires_at <= ?", (namespace, now)
+            ).rowcount
+            if max_entries is not None:
+                removed += self._conn.execute(
+                    """
+                    DELETE FROM cache_entries WHERE namespace = ? AND key NOT IN (
+                        SELECT key FROM cache_entries WHERE namespace = ?
+                        ORDER BY created_at DESC LIMIT ?
+                    )
+                    """,
+                    (namespace, namespace, max_entries),
+                ).rowcount
+            self._conn.commit()
+            return removed
+
+    def count(self, namespace: str) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM cache_entries WHERE namespace = ?", (namespace,)
+            ).fetchone()[0]
+
+
+class TTLCache:
+    """A thread-safe LRU cache with expiry and an optional SQLite tier behind it"""
+
+    def __init__(
+        self,
+        namespace: str,
+        max_entries: int = 1024,
+        ttl: float = 3600,
+        db_path: Optional[str] = None,
+        max_disk_entries: Optional[int] = None,
+        dumps: Callable[[Any], str] = json.dumps,
+        loads: Callable[[str], Any] = json.loads,
+        fresh_ttl: Optional[float] = None,
+    ):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # Entries older than this are still returned but counted as stale, not as hits
+        self.fresh_ttl = fresh_ttl
+        self.max_disk_entries = max_disk_entries
+        self.dumps = dumps
+        self.loads = loads
+        self.disk = SQLiteStore.open(db_path) if db_path else None
+
+        self._lock = threading.Lock()
+        # key -> (created_at, expires_at, value), ordered from least to most recently used
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._writes_since_prune = 0
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+    def _remember(self, key: str, created_at: float, expires_at: float, value: Any) -> None:
+        """Stores an entry in memory, evicting the least recently used ones (lock held)"""
+        self._entries[key] = (created_at, expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Returns the cached value for key, or default when it is missing or expired"""
+        entry = self.get_entry(key)
+        return default if entry is None else entry[0]
+
+    def _count_hit(self, created_at: float, now: float) -> bool:
+        """Counts a found entry as a hit, or as stale past fresh_ttl; returns True for a hit (lock held)"""
+        if self.fresh_ttl is not None and now - created_at > self.fresh_ttl:
+            self.stale += 1
+            return False
+        self.hits += 1
+        return True
+
+    def get_entry(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Returns (value, created_at) for key, or None when it is missing or expired"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self._count_hit(entry[0], now)
+                    return entry[2], entry[0]
+                del self._entries[key]
+
+        if self.disk is not None:
+            row = self.disk.get(self.namespace, key)
+            if row is not None and row[2] > now:
+                try:
+                    value = self.loads(row[0])
+                except Exception:
+                    # A row written by an older, incompatible version is treated as a miss
+                    self.disk.delete(self.namespace, key)
+                else:
+                    with self._lock:
+                        self._remember(key, row[1], row[2], value)
+                        if self._count_hit(row[1], now):
+                            self.disk_hits += 1
+                    return value, row[1]
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Stores value under key in memory and, when configured, on disk"""
+        created_at = time.time()
+        expires_at = created_at + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._remember(key, created_at, expires_at, value)
+            self._writes_since_prune += 1
+            prune = self._writes_since_prune >= 100
+            if prune:
+                self._writes_since_prune = 0
+
+        if self.disk is not None:
+            self.disk.set(self.namespace, key, self.dumps(value), created_at, expires_at)
+            # Pruning is amortized over many writes to keep set() cheap
+            if prune:
+                self.disk.prune(self.namespace, self.max_disk_entries, created_at)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.disk is not None:
+            self.disk.delete(self.namespace, key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        if self.disk is not None:
+            self.disk.delete(self.namespace)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the counters of the cache"""
+        with self._lock:
+            lookups = self.hits + self.stale + self.misses
+            stats = {
+                "namespace": self.namespace,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+        if self.disk is not None:
+            stats["disk_entries"] = self.disk.count(self.namespace)
+        return stats
@@ -0,0 +1,83 @@
+import contextvars
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+# The cancellation token of the plan running in the current context, if it can be cancelled
+_current = contextvars.ContextVar("travel_planner_cancel_token", default=None)
+
+
+class PlanCancelled(Exception):
+    """Raised inside a plan whose caller gave up on it"""
+
+
+class CancelToken:
+    """Lets a caller stop a plan at the next agent step, task boundary or tool call"""
+
+    def __init__(self):
+        self.reason: Optional[str] = None
+        self._event = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    def check(self) -> None:
+        """Raises PlanCancelled once the token was cancelled"""
+        if self._event.is_set():
+            raise PlanCancelled(f"Plan {self.reason}")
+
+    @contextmanager
+    def attach(self):
+        """Makes this token the one checked in the current context"""
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+
+
+def current() -> Optional[CancelToken]:
+    return _current.get()
+
+
+def check() -> None:
+    """Raises PlanCancelled when the plan running in the current context was cancelled"""
+    token = _current.get()
+    if token is not None:
+        token.check()
+
+
+def watch_crew(crew) -> None:
+    """Makes a crew stop at its next step or task boundary once the current plan is cancelled"""
+    token = _current.get()
+    if token is None:
+        return
+    step_callback = crew.step_callback
+    task_callback = crew.task_callback
+
+    def stop_if_cancelled():
+        if token.cancelled:
+            # Agents retry a failed task; a cancelled plan must not
+            for agent in crew.agents:
+                if hasattr(agent, "max_retry_limit"):
+                    agent.max_retry_limit = 0
+            token.check()
+
+    def on_step(step):
+        stop_if_cancelled()
+        if step_callback is not None:
+            step_callback(step)
+
+    def on_task(output):
+        stop_if_cancelled()
+        if task_callback is not None:
+            task_callback(output)
+
+    crew.step_callback = on_step
+    crew.task_callback = on_task
@@ -0,0 +1,150 @@
+import re
+import time
+from typing import List, Optional, Tuple
+
+from . import progress, settings, telemetry
+from .fanout import render_research_notes
+from .models import ResearchFindings
+
+# (words per description, words of notes) tried in order until the research fits the budget
+LEVELS = [(None, None), (40, 150), (25, 80), (15, 40), (8, 20), (0, 0)]
+
+TOKENS_SAVED = telemetry.REGISTRY.counter(
+    "travel_planner_compaction_tokens_saved_total", "Research tokens kept out of planner prompts"
+)
+
+_URL = re.compile(r"\(?https?://\S+\)?")
+_ITEM = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+")
+_MARKUP = re.compile(r"[*_`#>]+")
+_SPACES = re.compile(r"\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimates the tokens of a text (about four characters per token for English)"""
+    return (len(text) + 3) // 4
+
+
+def shorten(text: Optional[str], words: Optional[int]) -> Optional[str]:
+    """Keeps the first words of a text; None keeps all of it"""
+    if not text or words is None:
+        return text
+    parts = text.split()
+    if len(parts) <= words:
+        return text
+    return " ".join(parts[:words]) + "…" if words else ""
+
+
+def report(stage: str, start: float, before: int, after: int, budget: int) -> None:
+    """Counts the saved tokens and tells the plan's listeners about them"""
+    saved = max(0, before - after)
+    TOKENS_SAVED.inc(saved)
+    telemetry.record_span(
+        "compaction", start, time.perf_counter() - start,
+        stage=stage, tokens_before=before, tokens_after=after
+    )
+    progress.emit("compaction", {
+        "stage": stage, "tokens_before": before, "tokens_after": after, "tokens_saved": saved, "budget": budget
+    })
+
+
+def compact_findings(findings: ResearchFindings, budget: int = settings.RESEARCH_TOKEN_BUDGET) -> ResearchFindings:
+    """Shortens descriptions and notes of structured research until it renders within budget tokens"""
+    candidate = findings
+    for description_words, notes_words in LEVELS:
+        candidate = ResearchFindings(
+            attractions=[
+                attraction.model_copy(update={"description": shorten(attraction.description, description_words)})
+                for attraction in findings.attractions
+            ],
+            cultural_notes=shorten(findings.cultural_notes, notes_words) or None
+        )
+        if estimate_tokens(render_research_notes(candidate)) <= budget:
+            break
+    return candidate
+
+
+def parse_research_text(raw: str) -> Tuple[List[str], str]:
+    """Splits free-text research into one cleaned line per attraction and the remaining notes"""
+    items = []
+    notes = []
+    seen = set()
+    for line in raw.splitlines():
+        is_item = bool(_ITEM.match(line))
+        # Links and markdown only cost tokens; the planner cannot follow them
+        line = _SPACES.sub(" ", _MARKUP.sub("", _URL.sub("", _ITEM.sub("", line)))).strip()
+        # Headings like "Here is what I found:" introduce the list and carry nothing
+        if not is_item and line.endswith(":"):
+            continue
+        line = line.strip(" -:")
+        if not line or line.casefold() in seen:
+            continue
+        seen.add(line.casefold())
+        (items if is_item else notes).append(line)
+    return items, " ".join(notes)
+
+
+def render_compact_text(items: List[str], notes: str, description_words: Optional[int],
+                        notes_words: Optional[int]) -> str:
+    lines = []
+    for item in items:
+        # "Name (details): description" keeps the name and details whole
+        head, separator, description = item.partition(": ")
+        if separator and description_words is not None:
+            item = f"{head}: {shorten(description, description_words)}" if description_words else head
+        lines.append(f"- {item}")
+    notes = shorten(notes, notes_words)
+    if notes:
+        lines.append(f"Cultural notes: {notes}")
+    return "\n".join(lines)
+
+
+def compact_research_text(raw: str, budget: int = settings.RESEARCH_TOKEN_BUDGET) -> str:
+    """Reduces the free-text research of research_task to one short line per attraction"""
+    items, notes = parse_research_text(raw)
+    if not items:
+        # Nothing looked like a list of attractions: only the cleanup and the budget apply
+        return shorten(notes, budget * 3 // 4) or raw
+
+    text = raw
+    for description_words, notes_words in LEVELS:
+        text = render_compact_text(items, notes, description_words, notes_words)
+        if estimate_tokens(text) <= budget:
+            break
+    return text
+
+
+def research_notes(findings: ResearchFindings, budget: int = settings.RESEARCH_TOKEN_BUDGET) -> str:
+    """Renders structured research as planner input, compacted when enabled"""
+    if not settings.RESEARCH_COMPACTION:
+        return render_research_notes(findings)
+
+    start = time.perf_counter()
+    before = estimate_tokens(render_research_notes(findings))
+    notes = render_research_notes(compact_findings(findings, budget))
+    report("planning", start, before, estimate_tokens(notes), budget)
+    return notes
+
+
+def watch_crew(crew, task_name: str = "research_task", budget: int = settings.RESEARCH_TOKEN_BUDGET) -> None:
+    """Compacts the output of task_name before the tasks that use it as context see it"""
+    if not settings.RESEARCH_COMPACTION:
+        return
+    names = [getattr(task, "name", None) for task in crew.tasks]
+    if task_name not in names:
+        return
+    task_callback = crew.task_callback
+    finished = [0]
+
+    def on_task(output):
+        index = finished[0]
+        finished[0] += 1
+        if index < len(names) and names[index] == task_name:
+            start = time.perf_counter()
+            raw = output.raw or ""
+            # Later tasks read this very output object as their context
+            output.raw = compact_research_text(raw, budget)
+            report(task_name, start, estimate_tokens(raw), estimate_tokens(output.raw), budget)
+        if task_callback is not None:
+            task_callback(output)
+
+    crew.task_callback = on_task
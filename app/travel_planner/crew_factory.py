@@ -0,0 +1,182 @@
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+import yaml
+
+from . import settings, telemetry
+
+# crewai, crewai_tools and langchain take seconds to import, so they are only
+# loaded when the first CrewFactory is created (see preload())
+if TYPE_CHECKING:
+    from crewai import Crew
+
+
+class CrewFactory:
+    """Builds travel crews from configurations and tools that are loaded only once"""
+
+    def __init__(self, agents_config_path=None, tasks_config_path=None, check_interval=2.0,
+                 search_tool=None, scrape_tool=None, llm=None):
+        with telemetry.span("agent_stack_import"):
+            from .travel_planner_crew import TravelPlannerCrew
+            from .custom_search_tool import CustomSearchTool
+            from .llm_cache import wrap_llm
+            from .scrape_tool import CachedScrapeTool
+
+        self.agents_config_path = agents_config_path or TravelPlannerCrew.agents_config_path
+        self.tasks_config_path = tasks_config_path or TravelPlannerCrew.tasks_config_path
+        # Minimum number of seconds between two checks of the config files on disk
+        self.check_interval = check_interval
+
+        self._lock = threading.Lock()
+        # Template crews by kind: "travel", "research_batch", "planning" and "day_planning"
+        self._templates = None
+        self._mtimes = None
+        self._last_check = 0.0
+
+        # The tools only hold caches and pooled connections, so every crew can share them
+        self.search_tool = search_tool or CustomSearchTool()
+        self.scrape_tool = scrape_tool or CachedScrapeTool()
+        # Optional LLM for every agent (used by the offline benchmarks)
+        # Wrapped once here so it is shared by every config reload
+        self.llm = wrap_llm(llm)
+        # Without one, the agents and tasks use the models their configs route them to
+        self.route_models = llm is None
+
+    def _config_mtimes(self):
+        """Returns the modification times of the config files"""
+        return tuple(
+            os.stat(path).st_mtime_ns
+            for path in (self.agents_config_path, self.tasks_config_path)
+        )
+
+    def _load_templates(self, mtimes):
+        """Parses the configs and builds the crews that every request is copied from"""
+        with telemetry.span("config_load"):
+            self._build_templates(mtimes)
+
+    def _build_templates(self, mtimes):
+        from .travel_planner_crew import TravelPlannerCrew
+
+        with open(self.agents_config_path, 'r') as file:
+            agents_data = yaml.safe_load(file)
+
+        with open(self.tasks_config_path, 'r') as file:
+            tasks_data = yaml.safe_load(file)
+
+        planner = TravelPlannerCrew(
+            agents_data=agents_data,
+            tasks_data=tasks_data,
+            search_tool=self.search_tool,
+            scrape_tool=self.scrape_tool,
+            llm=self.llm,
+            route_models=self.route_models
+        )
+        self._templates = {
+            "travel": planner.travel_crew(),
+            "research_batch": planner.research_batch_crew(),
+            "planning": planner.planning_crew(),
+            "day_planning": planner.day_planning_crew(),
+        }
+        self._mtimes = mtimes
+
+    def _get_templates(self):
+        """Returns the template crews, reloading them when the config files changed"""
+        now = time.monotonic()
+        if self._templates is not None and now - self._last_check < self.check_interval:
+            return self._templates
+
+        with self._lock:
+            # Another thread may have refreshed the templates while we waited for the lock
+            if self._templates is None or now - self._last_check >= self.check_interval:
+                mtimes = self._config_mtimes()
+                if mtimes != self._mtimes:
+                    self._load_templates(mtimes)
+                self._last_check = now
+            return self._templates
+
+    def crew(self, kind: str = "travel") -> "Crew":
+        """Returns a new crew of the given kind for a single request"""
+        # Copying gives each request its own agents and tasks (and task outputs)
+        # while the parsed configs and the tool instances stay shared
+        return self._get_templates()[kind].copy()
+
+    def tool_stats(self):
+        """Returns the cache and latency counters of the shared tools"""
+        return [self.search_tool.stats(), self.scrape_tool.stats()]
+
+    def llm_stats(self) -> Optional[Dict[str, Any]]:
+        """Returns the counters of the LLM call cache, when it is enabled"""
+        if not settings.LLM_CACHE:
+            return None
+        from .llm_cache import stats
+
+        # The counters are shared by the default LLM, the routed models and every per-request copy
+        return stats()
+
+    def model_stats(self) -> List[Dict[str, Any]]:
+        """Returns the calls, latency and cost per model of every model route"""
+        from .model_routing import stats
+
+        return stats() if self.route_models else []
+
+    def reload(self) -> None:
+        """Forces the configs to be read again on the next request"""
+        with self._lock:
+            self._mtimes = None
+            self._last_check = 0.0
+
+
+_factory = None
+_factory_lock = threading.Lock()
+
+
+def get_crew_factory() -> CrewFactory:
+    """Returns the process-wide crew factory"""
+    global _factory
+    if _factory is None:
+        with _factory_lock:
+            if _factory is None:
+                _factory = CrewFactory()
+    return _factory
+
+
+def crew_factory_loaded() -> bool:
+    """Returns True once the agent stack has been imported and the factory exists"""
+    return _factory is not None
+
+
+def tool_stats() -> List[Dict[str, Any]]:
+    """Returns the tool counters without loading the agent stack just for them"""
+    return _factory.tool_stats() if _factory is not None else []
+
+
+def llm_stats() -> Optional[Dict[str, Any]]:
+    """Returns the LLM call cache counters without loading the agent stack just for them"""
+    return _factory.llm_stats() if _factory is not None else None
+
+
+def model_stats() -> List[Dict[str, Any]]:
+    """Returns the model routing counters without loading the agent stack just for them"""
+    return _factory.model_stats() if _factory is not None else []
+
+
+def preload(background: bool = False) -> Optional[threading.Thread]:
+    """Imports the agent stack and builds the template crews ahead of the first plan"""
+    def load():
+        get_crew_factory()._get_templates()
+
+    if not background:
+        load()
+        return None
+    thread = threading.Thread(target=load, name="agent-stack-preload", daemon=True)
+    thread.start()
+    return thread
+
+
+def set_crew_factory(factory: CrewFactory) -> None:
+    """Replaces the process-wide crew factory, e.g. with one using stand-in tools"""
+    global _factory
+    with _factory_lock:
+        _factory = factory
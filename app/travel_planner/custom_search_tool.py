@@ -1,5 +1,23 @@
+import re
+import unicodedata
+
 from crewai.tools import BaseTool
 from langchain_community.tools import DuckDuckGoSearchResults
+from pydantic import PrivateAttr
+
+from . import cancellation, settings
+from .cache import TTLCache
+from .rate_limits import provider_slot
+from .singleflight import SingleFlight
+from .tool_metrics import ToolMetrics
+
+
+def normalize_query(query: str) -> str:
+    """Maps queries that only differ in case, spacing or punctuation ('Top attractions,  Isfahan?' /
+    'top attractions isfahan') to one key; the word order is kept, since it changes the meaning"""
+    query = unicodedata.normalize("NFKC", query or "").casefold()
+    return " ".join(re.findall(r"\w+", query))
+
 
 # Create a custom tool by subclassing BaseTool
 class CustomSearchTool(BaseTool):
@@ -8,12 +26,55 @@ class CustomSearchTool(BaseTool):
     # Provide a description that helps the agent understand when to use this tool
     description: str = "Search the web using DuckDuckGo (free)."
 
+    # One search client, result cache and set of counters per tool instance
+    _client = PrivateAttr(default=None)
+    _cache = PrivateAttr(default=None)
+    _in_flight = PrivateAttr(default_factory=SingleFlight)
+    _metrics = PrivateAttr(default=None)
+
+    def model_post_init(self, __context) -> None:
+        super().model_post_init(__context)
+        self._cache = TTLCache(
+            namespace="search",
+            max_entries=settings.SEARCH_CACHE_MAX_ENTRIES,
+            ttl=settings.SEARCH_CACHE_TTL,
+            db_path=settings.TRAVEL_PLANNER_CACHE_DB if settings.SEARCH_CACHE_DISK else None,
+            max_disk_entries=settings.SEARCH_CACHE_MAX_DISK_ENTRIES,
+            dumps=str,
+            loads=str,
+        )
+        self._metrics = ToolMetrics(self.name)
+
+    def search(self, query: str) -> str:
+        """Sends the query to DuckDuckGo"""
+        if self._client is None:
+            # Instantiate the underlying LangChain tool once and reuse it
+            self._client = DuckDuckGoSearchResults()
+        with self._metrics.measure():
+            return self._client.invoke(query)
+
     def _run(self, query: str) -> str:
-        # Instantiate the underlying LangChain tool
-        ddg_tool = DuckDuckGoSearchResults()
-        # Use the tool to perform the search
-        response = ddg_tool.invoke(query)
+        # A cancelled plan makes no more requests
+        cancellation.check()
+        key = normalize_query(query)
+        response = self._cache.get(key)
+        if response is not None:
+            self._metrics.hit()
+            return response
+
+        def fetch() -> str:
+            # Use the tool to perform the search, within DuckDuckGo's limits shared by every crew
+            with provider_slot("search"):
+                response = self.search(query)
+            self._cache.set(key, response)
+            return response
+
+        # The same query issued twice at once goes to the network only once
         # Return the search results from DuckDuckGo to the agent
-        return response
+        return self._in_flight.do(key, fetch, timeout=settings.SEARCH_TIMEOUT)
 
-    
\ No newline at end of file
+    def stats(self):
+        """Returns the hit rate and latency of the tool and the state of its cache"""
+        stats = self._metrics.snapshot()
+        stats["cache"] = self._cache.stats()
+        return stats
@@ -0,0 +1,160 @@
+import contextvars
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Set
+
+from . import cancellation, progress, settings, telemetry
+from .fanout import attraction_key, escape_braces, render_attractions, split_evenly
+from .models import Attraction, DailyPlan, ResearchFindings, TravelItinerary
+
+
+def assign_days(attractions: List[Attraction], days: int) -> List[List[Attraction]]:
+    """Deals the researched attractions out to the days, in research order"""
+    groups = []
+    start = 0
+    for size in split_evenly(len(attractions), days):
+        groups.append(attractions[start:start + size])
+        start += size
+    return groups
+
+
+def attraction_words(name: str) -> List[str]:
+    """The words of attraction_key, with apostrophes dropped so that "St. Mark's" and "St Marks" match"""
+    return attraction_key(re.sub(r"['\u2019]", "", name or "")).split()
+
+
+def match_assigned(words: List[str], assigned: List[List[str]], matched: Set[int]) -> Optional[int]:
+    """Returns the index of the assigned attraction a planned name refers to, if it is clear"""
+    for index, candidate in enumerate(assigned):
+        if index not in matched and candidate == words:
+            return index
+    # "Imam Mosque" for "Imam Mosque of Isfahan": one name's words contain the other's, for one attraction only
+    candidates = [
+        index for index, candidate in enumerate(assigned)
+        if index not in matched and words and candidate
+        and (set(words) <= set(candidate) or set(candidate) <= set(words))
+    ]
+    return candidates[0] if len(candidates) == 1 else None
+
+
+def check_day(day: DailyPlan, day_number: int, assigned: List[Attraction]) -> DailyPlan:
+    """Validates a planned day against the attractions it was given
+
+    Names are compared like cache keys (case, punctuation and a leading "the"
+    do not matter), so small rewordings by the planner do not fail the day.
+    """
+    assigned_words = [attraction_words(attraction.name) for attraction in assigned]
+    attractions = []
+    matched: Set[int] = set()
+    for attraction in day.attractions:
+        index = match_assigned(attraction_words(attraction.name), assigned_words, matched)
+        if index is not None:
+            matched.add(index)
+            # Keeps the researched name, which the repair and the knowledge base key attractions by
+            attractions.append(attraction.model_copy(update={"name": assigned[index].name}))
+
+    if len(attractions) != len(assigned):
+        raise ValueError(
+            f"Day {day_number} covers {len(attractions)} of its {len(assigned)} attraction(s)"
+        )
+    return DailyPlan(day_number=day_number, attractions=attractions, meal_suggestions=day.meal_suggestions)
+
+
+def plan_day(factory, city: str, days: int, day_number: int, assigned: List[Attraction],
+             cultural_notes: str) -> DailyPlan:
+    """Plans and validates a single day"""
+    crew = factory.crew("day_planning")
+    sink = progress.current()
+    if sink is not None:
+        progress.watch_crew(crew, sink)
+    cancellation.watch_crew(crew)
+
+    result = telemetry.kickoff(crew, {
+        "city": city,
+        "days": days,
+        "day_number": day_number,
+        "day_size": len(assigned),
+        "day_attractions": render_attractions(assigned),
+        "cultural_notes": escape_braces(cultural_notes or "none"),
+    })
+    if not result.pydantic:
+        raise ValueError(f"Day {day_number} did not validate as a DailyPlan")
+    with telemetry.span("validate_day", day_number=day_number):
+        return check_day(result.pydantic, day_number, assigned)
+
+
+def plan_selected_days(factory, city: str, days: int, groups: Dict[int, List[Attraction]], cultural_notes: str,
+                       parallelism: int = settings.PER_DAY_PARALLELISM,
+                       max_retries: int = settings.PER_DAY_MAX_RETRIES,
+                       stage: str = "day_planning") -> Dict[int, DailyPlan]:
+    """Plans the given days concurrently, retrying only the days that failed
+
+    Returns the days that validated; the ones that kept failing are left out.
+    """
+    planned: Dict[int, DailyPlan] = {}
+    pending = sorted(number for number, assigned in groups.items() if assigned)
+    if not pending:
+        return planned
+
+    with ThreadPoolExecutor(max_workers=max(1, min(parallelism, len(pending)))) as pool:
+        for attempt in range(max_retries + 1):
+            if not pending:
+                break
+            # A cancelled plan stops here instead of spending LLM calls on more attempts
+            cancellation.check()
+            if attempt:
+                progress.emit("days_retry", {"days": pending, "attempt": attempt})
+                telemetry.record_retry(stage, len(pending))
+
+            futures = {
+                pool.submit(
+                    contextvars.copy_context().run, plan_day,
+                    factory, city, days, number, groups[number], cultural_notes
+                ): number
+                for number in pending
+            }
+            failed = []
+            for future in as_completed(futures):
+                number = futures[future]
+                try:
+                    planned[number] = future.result()
+                except cancellation.PlanCancelled:
+                    for other in futures:
+                        other.cancel()
+                    raise
+                except Exception:
+                    failed.append(number)
+                else:
+                    # Each day reaches the client as soon as it validated
+                    progress.emit_day(planned[number])
+            pending = sorted(failed)
+    return planned
+
+
+def plan_days(factory, city: str, days: int, findings: ResearchFindings,
+              parallelism: int = settings.PER_DAY_PARALLELISM,
+              max_retries: int = settings.PER_DAY_MAX_RETRIES) -> TravelItinerary:
+    """Plans every day on its own and concurrently, retrying only the days that failed"""
+    groups = assign_days(findings.attractions, days)
+    planned = plan_selected_days(
+        factory, city, days, {number: groups[number - 1] for number in range(1, days + 1)},
+        findings.cultural_notes, parallelism, max_retries
+    )
+
+    # Days that kept failing (or got no attractions) still list their attractions
+    fallbacks = []
+    for number in range(1, days + 1):
+        if number not in planned:
+            planned[number] = DailyPlan(day_number=number, attractions=groups[number - 1])
+            fallbacks.append(number)
+            progress.emit("day_fallback", {"day_number": number})
+            progress.emit_day(planned[number])
+
+    itinerary = TravelItinerary(
+        city=city,
+        days=days,
+        daily_plans=[planned[number] for number in range(1, days + 1)],
+        overall_tips=findings.cultural_notes
+    )
+    itinerary.mark_fallback_days(fallbacks)
+    return itinerary
@@ -0,0 +1,190 @@
+import contextvars
+import re
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from . import cancellation, progress, settings, telemetry
+from .models import Attraction, ResearchFindings
+
+
+def attraction_key(name: str) -> str:
+    """Normalizes an attraction name so that 'The Imam Mosque' and 'imam mosque' are one attraction"""
+    name = unicodedata.normalize("NFKC", name or "").casefold()
+    words = re.findall(r"\w+", name)
+    if words and words[0] == "the":
+        words = words[1:]
+    return " ".join(words)
+
+
+def split_evenly(total: int, parts: int) -> List[int]:
+    """Splits total into parts sizes that differ by at most one"""
+    return [total // parts + (1 if i < total % parts else 0) for i in range(parts)]
+
+
+def plan_batches(days: int, attractions_per_day: int, mode: str = settings.RESEARCH_FANOUT_MODE,
+                 max_batches: int = settings.RESEARCH_MAX_BATCHES,
+                 categories: Optional[List[str]] = None) -> List[Dict]:
+    """Splits the research of a trip into batches that can run at the same time"""
+    total = days * attractions_per_day
+    categories = categories or settings.RESEARCH_CATEGORIES
+
+    if mode == "day":
+        # Every batch takes its own slice of the popularity ranking, so the batches rarely overlap
+        count = max(1, min(days, max_batches, total))
+        batches = []
+        start = 1
+        for size in split_evenly(total, count):
+            end = start + size - 1
+            batches.append({
+                "batch_size": size,
+                "focus": f"the attractions ranked {start} to {end} among the most popular in the city",
+            })
+            start = end + 1
+    else:
+        # Every batch takes its own categories, dealt out round-robin
+        count = max(1, min(len(categories), max_batches, total))
+        batches = [
+            {"batch_size": size, "focus": ", ".join(categories[i::count])}
+            for i, size in enumerate(split_evenly(total, count))
+        ]
+
+    for number, batch in enumerate(batches, start=1):
+        batch["batch_number"] = number
+        batch["batch_count"] = len(batches)
+        batch["exclude"] = "none"
+    return batches
+
+
+def merge_findings(findings: List[ResearchFindings], limit: Optional[int] = None) -> ResearchFindings:
+    """Merges research batches, dropping attractions found by more than one batch"""
+    attractions: List[Attraction] = []
+    seen = set()
+    notes = []
+    for finding in findings:
+        for attraction in finding.attractions:
+            key = attraction_key(attraction.name)
+            if key and key not in seen:
+                seen.add(key)
+                attractions.append(attraction)
+        if finding.cultural_notes and finding.cultural_notes not in notes:
+            notes.append(finding.cultural_notes)
+
+    if limit is not None:
+        attractions = attractions[:limit]
+    return ResearchFindings(attractions=attractions, cultural_notes="\n".join(notes) or None)
+
+
+def run_research_batch(factory, city: str, batch: Dict) -> ResearchFindings:
+    """Runs one research batch and returns its structured findings"""
+    crew = factory.crew("research_batch")
+    sink = progress.current()
+    if sink is not None:
+        progress.watch_crew(crew, sink)
+    cancellation.watch_crew(crew)
+
+    result = telemetry.kickoff(crew, dict(batch, city=city))
+    if not result.pydantic:
+        raise ValueError(f"Research batch {batch['batch_number']} returned no structured findings")
+    return result.pydantic
+
+
+def research_in_one_batch(factory, city: str, days: int, attractions_per_day: int) -> ResearchFindings:
+    """Researches all attractions of a trip in a single structured batch"""
+    findings = run_research_batch(factory, city, {
+        "batch_size": days * attractions_per_day,
+        "focus": "the most popular attractions of the city",
+        "batch_number": 1,
+        "batch_count": 1,
+        "exclude": "none",
+    })
+    progress.emit("research", {"attractions": [attraction.name for attraction in findings.attractions]})
+    return findings
+
+
+def research_top_up(factory, city: str, count: int, known: List[Attraction],
+                    batch_number: int = 1) -> ResearchFindings:
+    """Researches count more attractions that are not among the known ones"""
+    return run_research_batch(factory, city, {
+        "batch_size": count,
+        "focus": "any other notable attractions",
+        "batch_number": batch_number,
+        "batch_count": batch_number,
+        "exclude": escape_braces(", ".join(attraction.name for attraction in known)) or "none",
+    })
+
+
+def research_in_parallel(factory, city: str, days: int, attractions_per_day: int,
+                         parallelism: int = settings.RESEARCH_PARALLELISM) -> ResearchFindings:
+    """Researches the attractions of a trip in concurrent batches"""
+    total = days * attractions_per_day
+    batches = plan_batches(days, attractions_per_day)
+
+    results = []
+    errors = []
+    with ThreadPoolExecutor(max_workers=max(1, min(parallelism, len(batches)))) as pool:
+        # Each batch gets its own copy of the context so it reports to the same progress log
+        futures = [
+            pool.submit(contextvars.copy_context().run, run_research_batch, factory, city, batch)
+            for batch in batches
+        ]
+        for future in futures:
+            try:
+                results.append(future.result())
+            except cancellation.PlanCancelled:
+                # A cancelled plan starts no top-up crew; the other batches stop at their next step
+                for other in futures:
+                    other.cancel()
+                raise
+            except Exception as e:
+                errors.append(e)
+
+    if not results:
+        raise errors[0]
+
+    merged = merge_findings(results)
+    missing = total - len(merged.attractions)
+    if missing > 0:
+        # Duplicates or failed batches left a gap: one more batch tops it up
+        cancellation.check()
+        telemetry.record_retry("research_top_up")
+        try:
+            top_up = research_top_up(factory, city, missing, merged.attractions, batch_number=len(batches) + 1)
+            merged = merge_findings([merged, top_up])
+        except cancellation.PlanCancelled:
+            raise
+        except Exception as e:
+            # The planner can still work with fewer attractions than asked for
+            errors.append(e)
+
+    merged = merge_findings([merged], limit=total)
+    progress.emit("research", {
+        "attractions": [attraction.name for attraction in merged.attractions],
+        "batches": len(batches),
+        "failed_batches": len(errors),
+    })
+    return merged
+
+
+def escape_braces(text: str) -> str:
+    """Braces would be taken for input placeholders when a task is interpolated"""
+    return text.replace("{", "(").replace("}", ")")
+
+
+def render_attractions(attractions: List[Attraction]) -> str:
+    """Renders attractions as one compact line each"""
+    lines = []
+    for attraction in attractions:
+        details = f"{attraction.category}, {attraction.estimated_duration}"
+        if attraction.address:
+            details += f"; {attraction.address}"
+        lines.append(f"- {attraction.name} ({details}): {attraction.description}")
+    return escape_braces("\n".join(lines))
+
+
+def render_research_notes(findings: ResearchFindings) -> str:
+    """Renders findings as the compact text the planner receives as input"""
+    notes = render_attractions(findings.attractions)
+    if findings.cultural_notes:
+        notes += "\nCultural notes: " + escape_braces(findings.cultural_notes)
+    return notes
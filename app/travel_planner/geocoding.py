@@ -0,0 +1,122 @@
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+
+from . import cancellation, settings, telemetry
+from .cache import TTLCache
+from .itinerary_cache import normalize_city
+from .rate_limits import provider_slot
+
+GEOCODES = telemetry.REGISTRY.counter(
+    "travel_planner_geocodes_total", "Address lookups, by cache result", ["result"]
+)
+
+
+class Geocoder:
+    """Resolves addresses to coordinates once, through a local cache in front of a Nominatim API"""
+
+    def __init__(self, url: str = settings.GEOCODER_URL, timeout: float = settings.GEOCODER_TIMEOUT,
+                 min_interval: float = settings.GEOCODER_MIN_INTERVAL):
+        self.url = url
+        self.timeout = timeout
+        # Public Nominatim servers allow one request per second
+        self.min_interval = min_interval
+        self.session = requests.Session()
+        self.session.headers.update({"User-Agent": settings.GEOCODER_USER_AGENT})
+        # Coordinates barely change: they are kept for months, failed lookups for a day
+        self.cache = TTLCache(
+            namespace="geocode",
+            max_entries=settings.GEOCODE_CACHE_MAX_ENTRIES,
+            ttl=settings.GEOCODE_CACHE_TTL,
+            db_path=settings.TRAVEL_PLANNER_CACHE_DB,
+            max_disk_entries=settings.GEOCODE_CACHE_MAX_DISK_ENTRIES,
+        )
+        self._throttle = threading.Lock()
+        self._last_request = 0.0
+
+    @staticmethod
+    def query(place: str, city: str) -> str:
+        """The text looked up for a place: its address (or name), qualified by the city"""
+        if normalize_city(city) not in normalize_city(place):
+            place = f"{place}, {city}"
+        return " ".join(place.split())
+
+    def _get(self, query: str):
+        response = self.session.get(self.url, params={"q": query, "format": "json", "limit": 1}, timeout=self.timeout)
+        # Raised inside the slot, so that a 429 slows down every process sharing the limiter
+        response.raise_for_status()
+        return response
+
+    def _fetch(self, query: str) -> Optional[Tuple[float, float]]:
+        if settings.PROVIDER_LIMITS:
+            # The "nominatim" limiter holds the one request per second across gunicorn workers too
+            with provider_slot("nominatim"):
+                response = self._get(query)
+        else:
+            with self._throttle:
+                wait = self._last_request + self.min_interval - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+                self._last_request = time.monotonic()
+                response = self._get(query)
+        results = response.json()
+        if not results:
+            return None
+        return float(results[0]["lat"]), float(results[0]["lon"])
+
+    def cached(self, place: str, city: str) -> Optional[Tuple[float, float]]:
+        """Returns the coordinates of a place when they are cached, without asking the API"""
+        value = self.cache.get(normalize_city(self.query(place, city)))
+        return tuple(value) if value else None
+
+    def lookup(self, place: str, city: str) -> Optional[Tuple[float, float]]:
+        """Returns (latitude, longitude) of a place, or None when it cannot be found"""
+        query = self.query(place, city)
+        key = normalize_city(query)
+        value = self.cache.get(key)
+        if value is not None:
+            GEOCODES.inc(result="hit")
+            # An empty list remembers that the place was not found
+            return tuple(value) if value else None
+
+        cancellation.check()
+        try:
+            with telemetry.span("geocode"):
+                coordinates = self._fetch(query)
+        except Exception:
+            # Network errors are not cached: the next plan tries again
+            GEOCODES.inc(result="failed")
+            return None
+
+        GEOCODES.inc(result="miss")
+        if coordinates is None:
+            self.cache.set(key, [], ttl=settings.GEOCODE_CACHE_NEGATIVE_TTL)
+        else:
+            self.cache.set(key, list(coordinates))
+        return coordinates
+
+    def stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
+
+
+_geocoder = None
+_geocoder_lock = threading.Lock()
+
+
+def get_geocoder() -> Geocoder:
+    """Returns the process-wide geocoder"""
+    global _geocoder
+    if _geocoder is None:
+        with _geocoder_lock:
+            if _geocoder is None:
+                _geocoder = Geocoder()
+    return _geocoder
+
+
+def set_geocoder(geocoder) -> None:
+    """Replaces the process-wide geocoder, e.g. with one answering from fixtures"""
+    global _geocoder
+    with _geocoder_lock:
+        _geocoder = geocoder
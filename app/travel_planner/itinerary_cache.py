@@ -0,0 +1,67 @@
+import time
+import unicodedata
+from typing import Optional, Tuple
+
+from . import settings
+from .cache import TTLCache
+from .models import TravelItinerary
+from .serialization import load_itinerary, serialize
+
+
+def normalize_city(city: str) -> str:
+    """Normalizes a city name so that ' isfahan', 'Isfahan' and 'ISFAHAN ' share a key"""
+    city = unicodedata.normalize("NFKC", city or "")
+    return " ".join(city.split()).casefold()
+
+
+def itinerary_key(city: str, days: int, attractions_per_day: int) -> str:
+    """Builds the cache key of a trip"""
+    return f"{normalize_city(city)}|{int(days)}|{int(attractions_per_day)}"
+
+
+class ItineraryCache:
+    """Caches validated itineraries per (city, days, attractions_per_day)"""
+
+    def __init__(
+        self,
+        max_entries: int = settings.ITINERARY_CACHE_MAX_ENTRIES,
+        ttl: float = settings.ITINERARY_CACHE_TTL,
+        stale_ttl: float = settings.ITINERARY_CACHE_STALE_TTL,
+        db_path: Optional[str] = settings.TRAVEL_PLANNER_CACHE_DB,
+        max_disk_entries: Optional[int] = settings.ITINERARY_CACHE_MAX_DISK_ENTRIES,
+    ):
+        # Itineraries are fresh for ttl seconds, then stale (but still stored) for stale_ttl seconds
+        self.ttl = ttl
+        # Memory keeps the model objects; the disk tier keeps their JSON, which is also the
+        # response body the itinerary is served with (see serialization.py)
+        self.cache = TTLCache(
+            namespace="itinerary",
+            max_entries=max_entries,
+            ttl=ttl + stale_ttl,
+            db_path=db_path,
+            max_disk_entries=max_disk_entries,
+            dumps=lambda itinerary: serialize(itinerary).body.decode("utf-8"),
+            loads=load_itinerary,
+            # Stale itineraries are served while they are replanned, but they are not hits
+            fresh_ttl=ttl,
+        )
+
+    def get(self, city: str, days: int, attractions_per_day: int) -> Optional[TravelItinerary]:
+        """Returns the cached itinerary while it is fresh"""
+        entry = self.lookup(city, days, attractions_per_day)
+        if entry is None or entry[1] > self.ttl:
+            return None
+        return entry[0]
+
+    def lookup(self, city: str, days: int, attractions_per_day: int) -> Optional[Tuple[TravelItinerary, float]]:
+        """Returns the cached itinerary and its age in seconds, stale or not"""
+        entry = self.cache.get_entry(itinerary_key(city, days, attractions_per_day))
+        if entry is None:
+            return None
+        return entry[0], time.time() - entry[1]
+
+    def set(self, city: str, days: int, attractions_per_day: int, itinerary: TravelItinerary) -> None:
+        self.cache.set(itinerary_key(city, days, attractions_per_day), itinerary)
+
+    def stats(self):
+        return self.cache.stats()
@@ -0,0 +1,193 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from . import settings
+from .cancellation import CancelToken
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue cannot accept more work"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Too many plans in progress, retry in {retry_after} seconds")
+        self.retry_after = retry_after
+
+
+class ShuttingDownError(Exception):
+    """Raised when a job is submitted while the JobManager drains for shutdown"""
+
+
+class Job:
+    """A unit of work submitted to the JobManager"""
+
+    def __init__(self, fn: Callable[[], Any], params: Dict[str, Any], events=None, trace=None):
+        self.id = uuid.uuid4().hex
+        self.fn = fn
+        self.params = params
+        # Optional progress.ProgressEvents the job reports to while it runs
+        self.events = events
+        # Optional telemetry.Trace with the timing breakdown of the job
+        self.trace = trace
+        self.status = QUEUED
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.done = threading.Event()
+        # Checked by the crews of the job, see cancel()
+        self.cancel_token = CancelToken()
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        """Asks the job to stop; a running crew stops at its next step, task boundary or tool call"""
+        self.cancel_token.cancel(reason)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until the job finished; returns False on timeout"""
+        return self.done.wait(timeout)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Returns the public status of the job"""
+        data = {
+            "job_id": self.id,
+            "status": self.status,
+            "params": self.params,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.error is not None:
+            data["error"] = str(self.error)
+        return data
+
+
+class JobManager:
+    """Runs jobs on a bounded pool of worker threads"""
+
+    def __init__(self, workers: int = settings.JOB_WORKERS, queue_size: int = settings.JOB_QUEUE_SIZE,
+                 result_ttl: float = settings.JOB_RESULT_TTL):
+        self.workers = workers
+        # Jobs waiting for a free worker, on top of the ones being executed
+        self.queue_size = queue_size
+        # Seconds a finished job is kept around for polling
+        self.result_ttl = result_ttl
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="plan-job")
+        self._lock = threading.Lock()
+        # Signalled whenever the last pending job finished
+        self._idle = threading.Condition(self._lock)
+        self._jobs: Dict[str, Job] = {}
+        self._pending = 0
+        self._draining = False
+        # Moving average of the job duration, used for the Retry-After hint
+        self._avg_duration = 30.0
+
+    def _run(self, job: Job) -> None:
+        job.status = RUNNING
+        job.started_at = time.time()
+        try:
+            # A job cancelled while it was queued does not start at all
+            job.cancel_token.check()
+            with job.cancel_token.attach():
+                job.result = job.fn()
+            job.status = SUCCEEDED
+        except BaseException as e:
+            job.error = e
+            job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+            if job.events is not None:
+                # Also when the job was cancelled before it started, so followers stop waiting
+                if job.error is not None:
+                    job.events.emit("failed", {"error": str(job.error)})
+                job.events.close()
+            with self._lock:
+                self._pending -= 1
+                self._avg_duration = 0.8 * self._avg_duration + 0.2 * (job.finished_at - job.started_at)
+                if self._pending == 0:
+                    self._idle.notify_all()
+            job.done.set()
+
+    def _purge(self, now: float) -> None:
+        """Forgets finished jobs older than result_ttl (lock held)"""
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None and now - job.finished_at > self.result_ttl
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def _retry_after(self) -> int:
+        """Estimates how many seconds it takes until a queue slot frees up (lock held)"""
+        return max(1, int(self._avg_duration / self.workers))
+
+    def submit(self, fn: Callable[[], Any], params: Optional[Dict[str, Any]] = None, events=None,
+               trace=None) -> Job:
+        """Queues fn for execution, raising QueueFullError when the queue is full"""
+        job = Job(fn, params or {}, events, trace)
+        with self._lock:
+            if self._draining:
+                raise ShuttingDownError("The planner is shutting down")
+            self._purge(job.created_at)
+            if self._pending >= self.workers + self.queue_size:
+                raise QueueFullError(self._retry_after())
+            self._pending += 1
+            self._jobs[job.id] = job
+
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            running = sum(1 for job in self._jobs.values() if job.status == RUNNING)
+            return {
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "running": running,
+                "queued": self._pending - running,
+                "tracked_jobs": len(self._jobs),
+                "avg_duration": round(self._avg_duration, 3),
+                "draining": self._draining,
+            }
+
+    @property
+    def draining(self) -> bool:
+        return self._draining
+
+    def close(self) -> None:
+        """Stops accepting jobs; the pending ones keep running"""
+        with self._lock:
+            self._draining = True
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """Stops accepting jobs and waits for the pending ones; returns False when some are still running
+
+        Jobs still running when the timeout passes are cancelled.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            self._draining = True
+            while self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._idle.wait(remaining)
+            unfinished = [job for job in self._jobs.values() if job.finished_at is None]
+        for job in unfinished:
+            job.cancel("stopped by shutdown")
+        return not unfinished
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
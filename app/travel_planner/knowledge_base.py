@@ -0,0 +1,135 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from . import settings
+from .fanout import attraction_key
+from .itinerary_cache import normalize_city
+from .models import Attraction, ResearchFindings
+
+
+class KnowledgeBase:
+    """A local store of researched attractions and cultural notes per city"""
+
+    def __init__(self, path: str = settings.KNOWLEDGE_BASE_DB, max_age: float = settings.KNOWLEDGE_BASE_MAX_AGE):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        # Records researched longer ago than max_age seconds are not used any more
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS attractions (
+                city_key TEXT NOT NULL,
+                name_key TEXT NOT NULL,
+                name TEXT NOT NULL,
+                description TEXT NOT NULL,
+                category TEXT NOT NULL,
+                category_key TEXT NOT NULL,
+                estimated_duration TEXT NOT NULL,
+                address TEXT,
+                rank INTEGER NOT NULL,
+                researched_at REAL NOT NULL,
+                PRIMARY KEY (city_key, name_key)
+            );
+            CREATE INDEX IF NOT EXISTS idx_attractions_city_rank ON attractions (city_key, researched_at, rank);
+            CREATE INDEX IF NOT EXISTS idx_attractions_city_category ON attractions (city_key, category_key);
+            CREATE TABLE IF NOT EXISTS city_notes (
+                city_key TEXT PRIMARY KEY,
+                cultural_notes TEXT NOT NULL,
+                researched_at REAL NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _to_attraction(row) -> Attraction:
+        return Attraction(
+            name=row[0], description=row[1], category=row[2], estimated_duration=row[3], address=row[4]
+        )
+
+    def store(self, city: str, findings: ResearchFindings) -> None:
+        """Adds (or refreshes) the attractions and notes of a research step"""
+        city_key = normalize_city(city)
+        now = time.time()
+        with self._lock:
+            # New attractions rank after the ones already known for the city
+            next_rank = self._conn.execute(
+                "SELECT COALESCE(MAX(rank), -1) + 1 FROM attractions WHERE city_key = ?", (city_key,)
+            ).fetchone()[0]
+            for offset, attraction in enumerate(findings.attractions):
+                self._conn.execute(
+                    """
+                    INSERT INTO attractions (city_key, name_key, name, description, category, category_key,
+                                             estimated_duration, address, rank, researched_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (city_key, name_key) DO UPDATE SET
+                        name = excluded.name,
+                        description = excluded.description,
+                        category = excluded.category,
+                        category_key = excluded.category_key,
+                        estimated_duration = excluded.estimated_duration,
+                        address = COALESCE(excluded.address, attractions.address),
+                        researched_at = excluded.researched_at
+                    """,
+                    (
+                        city_key, attraction_key(attraction.name), attraction.name, attraction.description,
+                        attraction.category, attraction.category.strip().casefold(),
+                        attraction.estimated_duration, attraction.address, next_rank + offset, now,
+                    ),
+                )
+            if findings.cultural_notes:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO city_notes (city_key, cultural_notes, researched_at) VALUES (?, ?, ?)",
+                    (city_key, findings.cultural_notes, now),
+                )
+            self._conn.commit()
+
+    def fresh_findings(self, city: str, limit: Optional[int] = None) -> ResearchFindings:
+        """Returns the fresh attractions of a city in research order, with its cultural notes"""
+        city_key = normalize_city(city)
+        oldest = time.time() - self.max_age
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT name, description, category, estimated_duration, address FROM attractions
+                WHERE city_key = ? AND researched_at > ? ORDER BY rank LIMIT ?
+                """,
+                (city_key, oldest, -1 if limit is None else limit),
+            ).fetchall()
+            notes = self._conn.execute(
+                "SELECT cultural_notes FROM city_notes WHERE city_key = ? AND researched_at > ?",
+                (city_key, oldest),
+            ).fetchone()
+
+        return ResearchFindings(
+            attractions=[self._to_attraction(row) for row in rows],
+            cultural_notes=notes[0] if notes else None
+        )
+
+    def by_category(self, city: str, category: str) -> List[Attraction]:
+        """Returns the fresh attractions of a city in one category"""
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT name, description, category, estimated_duration, address FROM attractions
+                WHERE city_key = ? AND category_key = ? AND researched_at > ? ORDER BY rank
+                """,
+                (normalize_city(city), category.strip().casefold(), time.time() - self.max_age),
+            ).fetchall()
+        return [self._to_attraction(row) for row in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            attractions, cities = self._conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT city_key) FROM attractions"
+            ).fetchone()
+        return {"cities": cities, "attractions": attractions}
@@ -0,0 +1,207 @@
+import hashlib
+import json
+import re
+import threading
+import unicodedata
+from typing import Any, Dict, List, Optional, Union
+
+from crewai import LLM, BaseLLM
+
+from . import settings, telemetry
+from .cache import TTLCache
+from .rate_limits import provider_slot
+from .singleflight import SingleFlight
+
+LLM_CACHE_LOOKUPS = telemetry.REGISTRY.counter(
+    "travel_planner_llm_cache_total", "LLM calls answered from the cache or by the model", ["result"]
+)
+
+_UUID = re.compile(r"\b[0-9a-f]{8}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{12}\b")
+_TIMESTAMP = re.compile(r"\b\d{4}-\d{2}-\d{2}[t ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?(z|[+-]\d{2}:?\d{2})?\b")
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+class CacheCounters:
+    """Lookups of the LLM cache, counted once for every CachedLLM and every copy of one
+
+    Crews are copied for each request and the copies share their LLM's
+    attributes, so the counts live here rather than as ints on the wrapper.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.uncacheable = 0
+
+    def add(self, result: str) -> None:
+        with self._lock:
+            setattr(self, result, getattr(self, result) + 1)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "uncacheable": self.uncacheable,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+_counters = CacheCounters()
+
+
+def get_llm_cache() -> TTLCache:
+    """Returns the process-wide LLM response cache, shared by every crew and config reload"""
+    global _shared_cache
+    if _shared_cache is None:
+        with _shared_cache_lock:
+            if _shared_cache is None:
+                _shared_cache = TTLCache(
+                    namespace="llm",
+                    max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+                    ttl=settings.LLM_CACHE_TTL,
+                    db_path=settings.TRAVEL_PLANNER_CACHE_DB if settings.LLM_CACHE_DISK else None,
+                    max_disk_entries=settings.LLM_CACHE_MAX_DISK_ENTRIES,
+                    dumps=str,
+                    loads=str,
+                )
+    return _shared_cache
+
+
+def normalize_prompt(text: str) -> str:
+    """Maps prompts that only differ in case, whitespace, ids or timestamps to one text"""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = _UUID.sub("<id>", text)
+    text = _TIMESTAMP.sub("<time>", text)
+    return " ".join(text.split())
+
+
+def render_messages(messages: Union[str, List[Dict[str, Any]]]) -> List[List[str]]:
+    if isinstance(messages, str):
+        return [["user", messages]]
+    return [[str(message.get("role", "")), str(message.get("content", ""))] for message in messages]
+
+
+class WrappedLLM(BaseLLM):
+    """An LLM that hands its calls to another one, adding something around them"""
+
+    def __init__(self, llm):
+        super().__init__(model=llm.model, temperature=getattr(llm, "temperature", None))
+        self.llm = llm
+
+    def __getattr__(self, name):
+        # Everything the wrapper does not define (base_url, api settings, ...) is the wrapped LLM's
+        if name == "llm":
+            raise AttributeError(name)
+        return getattr(self.llm, name)
+
+    def supports_function_calling(self) -> bool:
+        return self.llm.supports_function_calling()
+
+    def supports_stop_words(self) -> bool:
+        return self.llm.supports_stop_words()
+
+    def get_context_window_size(self) -> int:
+        return self.llm.get_context_window_size()
+
+    def _call_model(self, messages, tools, callbacks, available_functions, **kwargs):
+        # The executor sets stop words on the LLM it was given, i.e. on this wrapper
+        if self.stop:
+            self.llm.stop = self.stop
+        return self.llm.call(messages, tools=tools, callbacks=callbacks,
+                             available_functions=available_functions, **kwargs)
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs) -> Any:
+        return self._call_model(messages, tools, callbacks, available_functions, **kwargs)
+
+
+class LimitedLLM(WrappedLLM):
+    """Sends the calls of every crew through the process-wide limiter of the LLM provider"""
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs) -> Any:
+        with provider_slot("llm"):
+            return self._call_model(messages, tools, callbacks, available_functions, **kwargs)
+
+
+class CachedLLM(WrappedLLM):
+    """Wraps an LLM and answers repeated calls (same model, prompt and parameters) from a cache"""
+
+    def __init__(self, llm, mode: str = settings.LLM_CACHE_MODE, cache: Optional[TTLCache] = None):
+        super().__init__(llm)
+        # "exact" or "normalized", see normalize_prompt()
+        self.mode = mode
+        self.cache = cache or get_llm_cache()
+        self._in_flight = SingleFlight()
+        self.counters = _counters
+
+    def cache_key(self, messages, tools=None) -> str:
+        """Hashes everything that changes the answer: model, parameters, tools and the rendered prompt"""
+        rendered = render_messages(messages)
+        if self.mode == "normalized":
+            rendered = [[role, normalize_prompt(content)] for role, content in rendered]
+        payload = {
+            "model": self.llm.model,
+            "temperature": getattr(self.llm, "temperature", None),
+            "stop": sorted(self.stop or []),
+            "tools": sorted(
+                str(tool.get("function", {}).get("name", tool)) if isinstance(tool, dict) else str(tool)
+                for tool in tools or []
+            ),
+            "messages": rendered,
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs) -> Any:
+        if available_functions:
+            # Native function calling runs the tools inside the call: nothing that could be replayed
+            self.counters.add("uncacheable")
+            return self._call_model(messages, tools, callbacks, available_functions, **kwargs)
+
+        key = self.cache_key(messages, tools)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.counters.add("hits")
+            LLM_CACHE_LOOKUPS.inc(result="hit")
+            return cached
+
+        self.counters.add("misses")
+        LLM_CACHE_LOOKUPS.inc(result="miss")
+
+        def call_and_store():
+            response = self._call_model(messages, tools, callbacks, None, **kwargs)
+            if isinstance(response, str) and response.strip():
+                self.cache.set(key, response)
+            return response
+
+        # Identical calls made at the same time (e.g. by coalesced batches) reach the model once
+        return self._in_flight.do(key, call_and_store, timeout=settings.PLAN_TIMEOUT)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the counters of the cache shared by every model, with this wrapper's settings"""
+        stats = {"model": self.llm.model, "mode": self.mode}
+        stats.update(self.counters.stats())
+        return stats
+
+
+def wrap_llm(llm=None):
+    """Puts the configured limiter and cache around an LLM (the default model when None)"""
+    if isinstance(llm, WrappedLLM) or not (settings.LLM_CACHE or settings.PROVIDER_LIMITS):
+        return llm
+    llm = llm or LLM(model=settings.LLM_MODEL)
+    if settings.PROVIDER_LIMITS:
+        llm = LimitedLLM(llm)
+    if settings.LLM_CACHE:
+        # Outermost, so that cache hits never wait for the provider
+        llm = CachedLLM(llm)
+    return llm
+
+
+def stats() -> Dict[str, Any]:
+    """Returns the counters of the LLM cache, summed over every model and route"""
+    stats = {"mode": settings.LLM_CACHE_MODE}
+    stats.update(_counters.stats())
+    return stats
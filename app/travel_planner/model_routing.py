@@ -0,0 +1,256 @@
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from crewai import LLM
+
+from . import progress, settings, telemetry
+from .compaction import estimate_tokens
+from .llm_cache import WrappedLLM, render_messages, wrap_llm
+from .rate_limits import ProviderQueueTimeout
+
+MODEL_CALLS = telemetry.REGISTRY.counter(
+    "travel_planner_model_calls_total", "LLM calls, by route, model and why the model was chosen",
+    ["route", "model", "reason"]
+)
+MODEL_CALL_SECONDS = telemetry.REGISTRY.histogram(
+    "travel_planner_model_call_seconds", "Time of LLM calls, by model", ["model"]
+)
+MODEL_TOKENS = telemetry.REGISTRY.counter(
+    "travel_planner_model_tokens_total", "Estimated LLM tokens, by model and kind", ["model", "kind"]
+)
+MODEL_COST = telemetry.REGISTRY.counter(
+    "travel_planner_model_cost_usd_total", "Estimated LLM cost in USD, by route and model", ["route", "model"]
+)
+
+# Weight of the newest call in the running latency estimate of a model
+LATENCY_WEIGHT = 0.2
+
+
+def is_timeout_error(error: BaseException) -> bool:
+    """Recognizes timeouts of the model call itself (litellm, openai, requests)
+
+    A wait for the provider limiter that timed out is not one: the fallback
+    model queues at the same saturated limiter, so it would only time out too.
+    """
+    if isinstance(error, ProviderQueueTimeout):
+        return False
+    return isinstance(error, TimeoutError) or "Timeout" in type(error).__name__
+
+
+def parse_prices(text: str) -> Dict[str, Tuple[float, float]]:
+    """Reads MODEL_PRICES: "model=prompt:completion,..." in USD per million tokens"""
+    prices = {}
+    for entry in text.split(","):
+        model, _, price = entry.partition("=")
+        if not model.strip() or not price.strip():
+            continue
+        prompt, _, completion = price.partition(":")
+        prices[model.strip()] = (float(prompt), float(completion or prompt))
+    return prices
+
+
+PRICES = parse_prices(settings.MODEL_PRICES)
+
+
+def cost_of(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    # Provider prefixes ("openai/gpt-4o") are priced like the bare model
+    prompt, completion = PRICES.get(model) or PRICES.get(model.split("/")[-1]) or (0.0, 0.0)
+    return (prompt_tokens * prompt + completion_tokens * completion) / 1_000_000
+
+
+class ModelRoute:
+    """The models of an agent or task: the primary one and the faster one it falls back to"""
+
+    def __init__(self, model: str, fallback: Optional[str] = None, timeout: Optional[float] = None):
+        self.model = model
+        self.fallback = fallback if fallback != model else None
+        # Only primaries with a fallback are cut short; the others use the client's own timeout
+        self.timeout = timeout if timeout is not None else (settings.MODEL_TIMEOUT if self.fallback else None)
+
+    @classmethod
+    def parse(cls, spec: Union[str, Dict[str, Any]]) -> "ModelRoute":
+        """Reads the llm entry of an agent or task config: a model name or {model, fallback, timeout}"""
+        if isinstance(spec, str):
+            spec = {"model": spec}
+        if not isinstance(spec, dict) or not isinstance(spec.get("model"), str) or not spec["model"].strip():
+            raise ValueError(f"Invalid llm config {spec!r}: expected a model name or a mapping with a model")
+        timeout = spec.get("timeout")
+        return cls(
+            spec["model"].strip(),
+            (spec.get("fallback") or "").strip() or None,
+            float(timeout) if timeout is not None else None,
+        )
+
+    def key(self) -> Tuple[str, Optional[str], Optional[float]]:
+        return self.model, self.fallback, self.timeout
+
+
+class ModelUsage:
+    """Calls, time, tokens and cost of one model on one route"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "avg_seconds": round(self.seconds / self.calls, 4) if self.calls else 0.0,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cost_usd": round(self.cost, 6),
+        }
+
+
+# model -> running average of its call latency in seconds, shared by every route
+_latencies: Dict[str, float] = {}
+_latencies_lock = threading.Lock()
+
+
+def expected_seconds(model: str) -> float:
+    with _latencies_lock:
+        return _latencies.get(model, 0.0)
+
+
+def observe_latency(model: str, seconds: float) -> None:
+    with _latencies_lock:
+        previous = _latencies.get(model)
+        _latencies[model] = seconds if previous is None else previous + LATENCY_WEIGHT * (seconds - previous)
+
+
+def slo_at_risk(model: str) -> bool:
+    """True when a call to the model would likely end after the current plan's latency SLO"""
+    trace = telemetry.current_trace()
+    if trace is None or settings.PLAN_LATENCY_SLO <= 0:
+        return False
+    remaining = settings.PLAN_LATENCY_SLO - (time.perf_counter() - trace.started)
+    return remaining < expected_seconds(model) * settings.MODEL_FALLBACK_MARGIN
+
+
+class RoutedLLM(WrappedLLM):
+    """Sends the calls of an agent or task to its primary model, or to the fallback model
+    when the plan's latency SLO is at risk or the primary model timed out
+
+    Every call is recorded (model, reason, time and estimated tokens and cost)
+    as a span of the plan, in the metrics and in stats().
+    """
+
+    def __init__(self, name: str, route: ModelRoute):
+        super().__init__(model_llm(route.model, route.timeout))
+        self.route_name = name
+        self.route = route
+        self.fallback = model_llm(route.fallback) if route.fallback else None
+        self._lock = threading.Lock()
+        self.usage: Dict[str, ModelUsage] = {}
+        # reason -> calls that went to the fallback model
+        self.fallbacks: Dict[str, int] = {}
+
+    def _call_leg(self, llm, reason: str, messages, tools, callbacks, available_functions, **kwargs) -> Any:
+        if self.stop:
+            llm.stop = self.stop
+        start = time.perf_counter()
+        try:
+            response = llm.call(messages, tools=tools, callbacks=callbacks,
+                                available_functions=available_functions, **kwargs)
+        except Exception:
+            self.record(llm.model, reason, start, messages, None)
+            raise
+        self.record(llm.model, reason, start, messages, response)
+        return response
+
+    def record(self, model: str, reason: str, start: float, messages, response) -> None:
+        duration = time.perf_counter() - start
+        prompt_tokens = sum(estimate_tokens(content) for _, content in render_messages(messages))
+        completion_tokens = estimate_tokens(response) if isinstance(response, str) else 0
+        cost = cost_of(model, prompt_tokens, completion_tokens)
+
+        MODEL_CALLS.inc(route=self.route_name, model=model, reason=reason)
+        MODEL_CALL_SECONDS.observe(duration, model=model)
+        MODEL_TOKENS.inc(prompt_tokens, model=model, kind="prompt")
+        MODEL_TOKENS.inc(completion_tokens, model=model, kind="completion")
+        MODEL_COST.inc(cost, route=self.route_name, model=model)
+        telemetry.record_span(
+            "llm_call", start, duration, route=self.route_name, model=model, reason=reason, ok=response is not None
+        )
+        if response is not None:
+            # Failed calls say nothing about how long an answer takes
+            observe_latency(model, duration)
+
+        with self._lock:
+            usage = self.usage.setdefault(model, ModelUsage())
+            usage.calls += 1
+            usage.errors += response is None
+            usage.seconds += duration
+            usage.prompt_tokens += prompt_tokens
+            usage.completion_tokens += completion_tokens
+            usage.cost += cost
+            if reason != "primary":
+                self.fallbacks[reason] = self.fallbacks.get(reason, 0) + 1
+
+    def _fall_back(self, reason: str, messages, tools, callbacks, available_functions, **kwargs) -> Any:
+        progress.emit("model_fallback", {"route": self.route_name, "model": self.fallback.model, "reason": reason})
+        return self._call_leg(self.fallback, reason, messages, tools, callbacks, available_functions, **kwargs)
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs) -> Any:
+        if self.fallback is not None and slo_at_risk(self.llm.model):
+            return self._fall_back("slo_risk", messages, tools, callbacks, available_functions, **kwargs)
+        try:
+            return self._call_leg(self.llm, "primary", messages, tools, callbacks, available_functions, **kwargs)
+        except Exception as e:
+            if self.fallback is None or not is_timeout_error(e):
+                raise
+        return self._fall_back("timeout", messages, tools, callbacks, available_functions, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "route": self.route_name,
+                "model": self.route.model,
+                "fallback": self.route.fallback,
+                "timeout": self.route.timeout,
+                "fallbacks": dict(self.fallbacks),
+                "models": {model: usage.stats() for model, usage in self.usage.items()},
+            }
+
+
+# (model, timeout) -> the model behind the limiter and the cache; (name, route) -> RoutedLLM.
+# Both outlive config reloads, so their caches and counters do too
+_models: Dict[Tuple[str, Optional[float]], Any] = {}
+_routes: Dict[Tuple[str, Tuple], RoutedLLM] = {}
+_lock = threading.Lock()
+
+
+def model_llm(model: str, timeout: Optional[float] = None):
+    """Returns the process-wide LLM of a model, wrapped like the default one (see wrap_llm)"""
+    key = (model, timeout)
+    with _lock:
+        llm = _models.get(key)
+        if llm is None:
+            llm = _models[key] = wrap_llm(LLM(model=model, timeout=timeout) if timeout else LLM(model=model))
+    return llm
+
+
+def routed_llm(name: str, spec: Union[str, Dict[str, Any]]) -> RoutedLLM:
+    """Returns the LLM of the agent or task called name, configured by its llm entry"""
+    route = ModelRoute.parse(spec)
+    key = (name, route.key())
+    with _lock:
+        llm = _routes.get(key)
+    if llm is None:
+        llm = RoutedLLM(name, route)
+        with _lock:
+            llm = _routes.setdefault(key, llm)
+    return llm
+
+
+def stats() -> List[Dict[str, Any]]:
+    """Returns the calls per model of every route created so far"""
+    with _lock:
+        routes = list(_routes.values())
+    return [route.stats() for route in routes]
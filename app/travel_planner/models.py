@@ -1,5 +1,5 @@
 from typing import List, Optional
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
 
 class Attraction(BaseModel):
@@ -23,4 +23,19 @@ class TravelItinerary(BaseModel):
     city: str = Field(description="City to visit")
     days: int = Field(description="Number of days in the itinerary")
     daily_plans: List[DailyPlan] = Field(description="Plan for each day")
-    overall_tips: Optional[str] = Field(description="General travel tips for this destination", default=None)
\ No newline at end of file
+    overall_tips: Optional[str] = Field(description="General travel tips for this destination", default=None)
+    # Days that could not be planned and only list their attractions (not part of the JSON)
+    _fallback_days: List[int] = PrivateAttr(default_factory=list)
+
+    @property
+    def fallback_days(self) -> List[int]:
+        return list(self._fallback_days)
+
+    def mark_fallback_days(self, numbers: List[int]) -> None:
+        self._fallback_days = sorted(set(self._fallback_days) | set(numbers))
+
+
+class ResearchFindings(BaseModel):
+    """Model for the structured output of a research step"""
+    attractions: List[Attraction] = Field(description="Researched attractions")
+    cultural_notes: Optional[str] = Field(description="Local customs and cultural insights", default=None)
@@ -0,0 +1,312 @@
+import threading
+import time
+from typing import Optional
+
+from . import cancellation, compaction, progress, settings, telemetry
+from .crew_factory import get_crew_factory
+from .day_planning import plan_days
+from .fanout import merge_findings, research_in_one_batch, research_in_parallel, research_top_up
+from .itinerary_cache import ItineraryCache, itinerary_key
+from .jobs import Job, JobManager
+from .knowledge_base import KnowledgeBase
+from .models import ResearchFindings, TravelItinerary
+from .repair import check_and_repair
+from .singleflight import SingleFlight
+from .warmup import RefreshScheduler, yield_to_live_traffic
+
+
+class NoItineraryError(Exception):
+    """Raised when the crew finished without producing a valid itinerary"""
+
+
+_itinerary_cache = None
+_itinerary_cache_lock = threading.Lock()
+
+_job_manager = None
+_job_manager_lock = threading.Lock()
+
+_knowledge_base = None
+_knowledge_base_lock = threading.Lock()
+
+_refresh_scheduler = None
+_refresh_scheduler_lock = threading.Lock()
+
+# Identical trips requested at the same time share one crew run
+in_flight_plans = SingleFlight()
+
+
+def get_itinerary_cache() -> ItineraryCache:
+    """Returns the process-wide itinerary cache"""
+    global _itinerary_cache
+    if _itinerary_cache is None:
+        with _itinerary_cache_lock:
+            if _itinerary_cache is None:
+                _itinerary_cache = ItineraryCache()
+    return _itinerary_cache
+
+
+def get_job_manager() -> JobManager:
+    """Returns the process-wide pool that executes plan jobs"""
+    global _job_manager
+    if _job_manager is None:
+        with _job_manager_lock:
+            if _job_manager is None:
+                _job_manager = JobManager()
+    return _job_manager
+
+
+def get_knowledge_base() -> KnowledgeBase:
+    """Returns the process-wide city knowledge base"""
+    global _knowledge_base
+    if _knowledge_base is None:
+        with _knowledge_base_lock:
+            if _knowledge_base is None:
+                _knowledge_base = KnowledgeBase()
+    return _knowledge_base
+
+
+def live_traffic_busy() -> bool:
+    """Returns True while live plans need every worker"""
+    stats = get_job_manager().stats()
+    return stats["queued"] > 0 or stats["running"] >= stats["workers"]
+
+
+def get_refresh_scheduler() -> RefreshScheduler:
+    """Returns the process-wide warm-up and refresh scheduler (started separately)"""
+    global _refresh_scheduler
+    if _refresh_scheduler is None:
+        with _refresh_scheduler_lock:
+            if _refresh_scheduler is None:
+                _refresh_scheduler = RefreshScheduler(get_itinerary_cache(), refresh_itinerary, live_traffic_busy)
+    return _refresh_scheduler
+
+
+def kickoff(crew, inputs, findings: Optional[ResearchFindings] = None) -> TravelItinerary:
+    """Runs a planning crew and returns its validated itinerary
+
+    findings is the research the planner worked from; without it the research
+    task of the crew is used when invalid days have to be re-planned.
+    """
+    # Stream task boundaries and tool calls to whoever follows this plan
+    sink = progress.current()
+    if sink is not None:
+        progress.watch_crew(crew, sink)
+    # The planner gets the research as short records instead of the raw research output
+    compaction.watch_crew(crew)
+    cancellation.watch_crew(crew)
+
+    result = telemetry.kickoff(crew, inputs)
+    if settings.PLAN_REPAIR:
+        # Only the days that break the trip's constraints are planned again
+        itinerary = check_and_repair(
+            get_crew_factory(), result, inputs["city"], inputs["days"], inputs["attractions_per_day"], findings
+        )
+    else:
+        itinerary = result.pydantic
+    if not itinerary:
+        raise NoItineraryError("No travel itinerary generated")
+    return itinerary
+
+
+def plan_from_research(city: str, days: int, attractions_per_day: int, findings: ResearchFindings) -> TravelItinerary:
+    """Runs only the planning step, on research done beforehand"""
+    return kickoff(get_crew_factory().crew("planning"), {
+        "city": city,
+        "days": days,
+        "attractions_per_day": attractions_per_day,
+        "total_attractions": days * attractions_per_day,
+        "research_notes": compaction.research_notes(findings)
+    }, findings)
+
+
+def research_from_scratch(city: str, days: int, attractions_per_day: int) -> ResearchFindings:
+    """Researches all attractions of a trip, in parallel batches when enabled"""
+    if settings.RESEARCH_FANOUT:
+        return research_in_parallel(get_crew_factory(), city, days, attractions_per_day)
+    return research_in_one_batch(get_crew_factory(), city, days, attractions_per_day)
+
+
+def research(city: str, days: int, attractions_per_day: int) -> ResearchFindings:
+    """Runs only the research step and returns structured findings"""
+    if not settings.KNOWLEDGE_BASE:
+        return research_from_scratch(city, days, attractions_per_day)
+
+    total = days * attractions_per_day
+    knowledge_base = get_knowledge_base()
+    known = knowledge_base.fresh_findings(city)
+
+    if len(known.attractions) >= total:
+        # Enough fresh research for this trip shape: skip the research step entirely
+        findings = merge_findings([known], limit=total)
+        progress.emit("research", {
+            "attractions": [attraction.name for attraction in findings.attractions],
+            "from_knowledge_base": len(findings.attractions),
+        })
+        return findings
+
+    if known.attractions:
+        # Only research the attractions that are still missing
+        found = research_top_up(get_crew_factory(), city, total - len(known.attractions), known.attractions)
+        findings = merge_findings([known, found], limit=total)
+        progress.emit("research", {
+            "attractions": [attraction.name for attraction in findings.attractions],
+            "from_knowledge_base": len(known.attractions),
+        })
+    else:
+        found = findings = research_from_scratch(city, days, attractions_per_day)
+
+    knowledge_base.store(city, found)
+    return findings
+
+
+def between_stages(city: str, days: int, attractions_per_day: int) -> None:
+    """Lets a background refresh of the trip pause for live traffic, unless a live request waits on it"""
+    key = itinerary_key(city, days, attractions_per_day)
+    # The refresh scheduler itself is the first waiter
+    yield_to_live_traffic(lambda: in_flight_plans.waiters(key) > 1)
+    cancellation.check()
+
+
+def run_crew(city: str, days: int, attractions_per_day: int) -> TravelItinerary:
+    """Runs the travel crew for a trip and returns its validated itinerary"""
+    itinerary = plan_with_crews(city, days, attractions_per_day)
+    if settings.ROUTE_OPTIMIZATION:
+        between_stages(city, days, attractions_per_day)
+        # Which attractions share a day, and in which order, follows the map instead of the planner
+        # (imported here so that numpy is only loaded when the stage is on)
+        from .routing import optimize_itinerary
+        with telemetry.span("route_optimization"):
+            itinerary = optimize_itinerary(itinerary)
+    return itinerary
+
+
+def plan_with_crews(city: str, days: int, attractions_per_day: int) -> TravelItinerary:
+    """Researches and plans a trip with the configured crews"""
+    if settings.PER_DAY_PLANNING and days >= settings.PER_DAY_PLANNING_MIN_DAYS:
+        # Long trips: every day is a small planning step of its own
+        with telemetry.span("research"):
+            findings = research(city, days, attractions_per_day)
+        between_stages(city, days, attractions_per_day)
+        with telemetry.span("planning"):
+            return plan_days(get_crew_factory(), city, days, findings)
+
+    if settings.RESEARCH_FANOUT or settings.KNOWLEDGE_BASE:
+        with telemetry.span("research"):
+            findings = research(city, days, attractions_per_day)
+        between_stages(city, days, attractions_per_day)
+        with telemetry.span("planning"):
+            return plan_from_research(city, days, attractions_per_day, findings)
+
+    with telemetry.span("crew"):
+        return kickoff(get_crew_factory().crew(), {
+            "city": city,
+            "days": days,
+            "attractions_per_day": attractions_per_day,
+            "total_attractions": days * attractions_per_day
+        })
+
+
+def refresh_itinerary(city: str, days: int, attractions_per_day: int,
+                      timeout: Optional[float] = None) -> TravelItinerary:
+    """Plans a trip (sharing a run already in flight) and stores the result in the cache"""
+    cache = get_itinerary_cache() if settings.ITINERARY_CACHE_ENABLED else None
+
+    def run_and_store() -> TravelItinerary:
+        itinerary = run_crew(city, days, attractions_per_day)
+        # A bypassed lookup still refreshes the cached entry; itineraries with fallback days are
+        # served once but not cached, so the next request plans the trip again
+        if cache is not None and not itinerary.fallback_days:
+            cache.set(city, days, attractions_per_day, itinerary)
+        return itinerary
+
+    return in_flight_plans.do(
+        itinerary_key(city, days, attractions_per_day),
+        run_and_store,
+        timeout=settings.PLAN_TIMEOUT if timeout is None else timeout
+    )
+
+
+def plan_itinerary(city: str, days: int, attractions_per_day: int, use_cache: bool = True,
+                   timeout: Optional[float] = None) -> TravelItinerary:
+    """Returns the itinerary of a trip, from the cache or a shared crew run when possible"""
+    cache = get_itinerary_cache() if settings.ITINERARY_CACHE_ENABLED else None
+    scheduler = get_refresh_scheduler() if cache is not None and settings.WARMUP_ENABLED else None
+    start = time.perf_counter()
+
+    if scheduler is not None:
+        scheduler.record(city, days, attractions_per_day)
+
+    if cache is not None and use_cache:
+        entry = cache.lookup(city, days, attractions_per_day)
+        if entry is not None and (entry[1] <= cache.ttl or scheduler is not None):
+            itinerary, age = entry
+            outcome = "cache_hit"
+            if age > cache.ttl:
+                # Stale while revalidate: answer now, replan in the background
+                outcome = "stale_hit"
+                scheduler.schedule(city, days, attractions_per_day)
+            telemetry.PLANS.inc(outcome=outcome)
+            telemetry.PLAN_SECONDS.observe(time.perf_counter() - start, outcome=outcome)
+            progress.emit("cache_hit", {"stale": True} if outcome == "stale_hit" else None)
+            progress.emit_itinerary(itinerary)
+            return itinerary
+
+    outcome = "failed"
+    try:
+        itinerary = refresh_itinerary(city, days, attractions_per_day, timeout)
+        outcome = "planned"
+    finally:
+        telemetry.PLANS.inc(outcome=outcome)
+        telemetry.PLAN_SECONDS.observe(time.perf_counter() - start, outcome=outcome)
+    # Callers that joined someone else's run only see the days at the end
+    progress.emit_itinerary(itinerary)
+    return itinerary
+
+
+def stop_accepting() -> None:
+    """Stops the background refreshes and rejects new plan jobs, e.g. as soon as a shutdown starts"""
+    if _refresh_scheduler is not None:
+        _refresh_scheduler.stop()
+    if _job_manager is not None:
+        _job_manager.close()
+
+
+def shutdown(timeout: Optional[float] = None) -> bool:
+    """Drains the plan jobs; returns False when some had to be cancelled"""
+    stop_accepting()
+    if _job_manager is None:
+        return True
+    return _job_manager.drain(timeout)
+
+
+def submit_plan(city: str, days: int, attractions_per_day: int, use_cache: bool = True) -> Job:
+    """Queues a plan on the worker pool and returns its job right away
+
+    The job's progress events (job.events) can be followed while it runs, and
+    job.trace holds its timing breakdown.
+    """
+    events = progress.ProgressEvents()
+    trace = telemetry.Trace()
+
+    def run() -> TravelItinerary:
+        with events.attach(), trace.attach():
+            # Time spent waiting for a free worker
+            telemetry.record_span("queue_wait", trace.started, time.perf_counter() - trace.started)
+            try:
+                itinerary = plan_itinerary(city, days, attractions_per_day, use_cache=use_cache)
+            except Exception as e:
+                events.emit("failed", {"error": str(e)})
+                raise
+            else:
+                events.emit("completed", {"itinerary": itinerary.model_dump()})
+                return itinerary
+            finally:
+                trace.finish()
+                events.close()
+
+    return get_job_manager().submit(
+        run,
+        params={"city": city, "days": days, "attractions_per_day": attractions_per_day},
+        events=events,
+        trace=trace
+    )
@@ -0,0 +1,140 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+# The event log of the plan running in the current context, if anyone listens
+_current = contextvars.ContextVar("travel_planner_progress", default=None)
+
+
+class ProgressEvents:
+    """An append-only log of progress events that readers can follow while it grows"""
+
+    def __init__(self, max_events: int = 2000):
+        self.max_events = max_events
+        self.events = []
+        self.closed = False
+        self._days = set()
+        self._cond = threading.Condition()
+
+    def emit(self, event: str, data: Optional[Dict[str, Any]] = None) -> None:
+        """Appends an event and wakes up the readers"""
+        with self._cond:
+            if self.closed or len(self.events) >= self.max_events:
+                return
+            self.events.append((event, data or {}, time.time()))
+            self._cond.notify_all()
+
+    def emit_day(self, day) -> None:
+        """Emits a validated DailyPlan once, however many stages report it"""
+        with self._cond:
+            if day.day_number in self._days:
+                return
+            self._days.add(day.day_number)
+        self.emit("day", day.model_dump())
+
+    def close(self) -> None:
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def follow(self, start: int = 0, heartbeat: float = 15.0) -> Iterator[Optional[tuple]]:
+        """Yields (index, event, data) from start on until the log is closed
+
+        None is yielded when nothing happened for heartbeat seconds so that
+        streaming responses can keep the connection alive.
+        """
+        index = start
+        while True:
+            with self._cond:
+                if index >= len(self.events) and not self.closed:
+                    self._cond.wait(heartbeat)
+                pending = self.events[index:]
+                closed = self.closed
+
+            if not pending:
+                if closed:
+                    return
+                yield None
+                continue
+
+            for event, data, _ in pending:
+                yield index, event, data
+                index += 1
+
+    @contextmanager
+    def attach(self):
+        """Makes this log the target of emit() for the current context"""
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+
+
+def current() -> Optional[ProgressEvents]:
+    return _current.get()
+
+
+def emit(event: str, data: Optional[Dict[str, Any]] = None) -> None:
+    """Emits an event to the plan running in the current context, if any"""
+    sink = _current.get()
+    if sink is not None:
+        sink.emit(event, data)
+
+
+def emit_day(day) -> None:
+    """Emits a validated DailyPlan to the plan running in the current context, if any"""
+    sink = _current.get()
+    if sink is not None:
+        sink.emit_day(day)
+
+
+def emit_itinerary(itinerary) -> None:
+    """Emits every day of an itinerary that was not reported yet"""
+    sink = _current.get()
+    if sink is not None:
+        for day in itinerary.daily_plans:
+            sink.emit_day(day)
+
+
+def watch_crew(crew, sink: ProgressEvents) -> None:
+    """Reports task boundaries and tool calls of a crew to sink"""
+    names = [getattr(task, "name", None) or f"task_{i}" for i, task in enumerate(crew.tasks)]
+    finished = [0]
+    # Callbacks set before this one (compaction, cancellation, ...) keep running after it
+    step_callback = crew.step_callback
+    task_callback = crew.task_callback
+
+    def on_step(step):
+        # Steps that used a tool carry its name, input and result
+        tool = getattr(step, "tool", None)
+        if tool:
+            result = getattr(step, "result", None)
+            sink.emit("tool_call", {
+                "task": names[min(finished[0], len(names) - 1)],
+                "tool": tool,
+                "input": str(getattr(step, "tool_input", ""))[:500],
+                "result_chars": len(result) if isinstance(result, str) else None,
+            })
+        if step_callback is not None:
+            step_callback(step)
+
+    def on_task(output):
+        index = finished[0]
+        finished[0] += 1
+        name = names[index] if index < len(names) else f"task_{index}"
+        sink.emit("task_finished", {"task": name})
+        if name == "research_task":
+            # The research is free text; the planner sees exactly this
+            sink.emit("research", {"summary": getattr(output, "raw", str(output))})
+        if finished[0] < len(names):
+            sink.emit("task_started", {"task": names[finished[0]]})
+        if task_callback is not None:
+            task_callback(output)
+
+    crew.step_callback = on_step
+    crew.task_callback = on_task
+    if names:
+        sink.emit("task_started", {"task": names[0]})
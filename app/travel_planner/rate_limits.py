@@ -0,0 +1,381 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from . import cancellation, progress, settings, telemetry
+
+PROVIDER_WAIT_SECONDS = telemetry.REGISTRY.histogram(
+    "travel_planner_provider_wait_seconds", "Time calls waited for their provider's limiter", ["provider"]
+)
+PROVIDER_QUEUE = telemetry.REGISTRY.gauge(
+    "travel_planner_provider_queue_depth", "Calls waiting for their provider's limiter", ["provider"]
+)
+PROVIDER_THROTTLED = telemetry.REGISTRY.counter(
+    "travel_planner_provider_throttled_total", "Rate limit responses (429) from external providers", ["provider"]
+)
+
+
+# Messages of clients that only report the status line; a bare "429" also appears in ids, prices and URLs
+RATE_LIMIT_MESSAGE = re.compile(r"\brate[ _-]?limit|\b429\W+too many requests\b", re.IGNORECASE)
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """Recognizes 429s of requests, litellm and the DuckDuckGo client by status, type or message"""
+    response = getattr(error, "response", None)
+    if getattr(error, "status_code", None) == 429 or getattr(response, "status_code", None) == 429:
+        return True
+    if type(error).__name__ in ("RateLimitError", "RatelimitException"):
+        return True
+    return RATE_LIMIT_MESSAGE.search(str(error)) is not None
+
+
+class ProviderQueueTimeout(TimeoutError):
+    """Raised when a call waited too long for its turn at a provider, before it was even sent"""
+
+
+class LocalBucket:
+    """Token bucket and backoff state of a provider, for this process only"""
+
+    def __init__(self, name: str, rate: float, burst: float):
+        self.name = name
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.updated_at = time.time()
+        # Adaptive share of the configured rate, halved by every 429 and slowly raised again
+        self.factor = 1.0
+        self.blocked_until = 0.0
+        self.strikes = 0
+        self._lock = threading.Lock()
+
+    def _take(self, now: float) -> float:
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.rate <= 0:
+            return 0.0
+        rate = self.rate * self.factor
+        self.tokens = min(self.burst, self.tokens + max(0.0, now - self.updated_at) * rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / rate
+
+    def _throttled(self, now: float, retry_after: Optional[float]) -> float:
+        self.strikes += 1
+        self.factor = max(settings.PROVIDER_MIN_RATE_FACTOR, self.factor / 2)
+        self.tokens = 0.0
+        pause = retry_after or min(
+            settings.PROVIDER_BACKOFF_MAX, settings.PROVIDER_BACKOFF_MIN * 2 ** (self.strikes - 1)
+        )
+        self.blocked_until = max(self.blocked_until, now + pause)
+        return pause
+
+    def _succeeded(self) -> None:
+        self.strikes = 0
+        self.factor = min(1.0, self.factor + settings.PROVIDER_RATE_RECOVERY)
+
+    def take(self, now: float) -> float:
+        """Takes a token; returns 0 when it did, or the seconds until one is available"""
+        with self._lock:
+            return self._take(now)
+
+    def throttled(self, now: float, retry_after: Optional[float]) -> float:
+        """Lowers the rate and pauses the provider; returns the pause in seconds"""
+        with self._lock:
+            return self._throttled(now, retry_after)
+
+    def succeeded(self) -> None:
+        with self._lock:
+            self._succeeded()
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            "rate": round(self.rate * self.factor, 4),
+            "paused_seconds": round(max(0.0, self.blocked_until - time.time()), 3),
+        }
+
+
+# path -> the connection every bucket stored in that file uses, and the lock its transactions take
+_connections: Dict[str, Tuple[sqlite3.Connection, threading.Lock]] = {}
+_connections_lock = threading.Lock()
+
+
+def shared_connection(path: str) -> Tuple[sqlite3.Connection, threading.Lock]:
+    """Opens the bucket database once per process, however many hosts get a limiter"""
+    with _connections_lock:
+        if path not in _connections:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Autocommit mode: the transactions are opened explicitly with BEGIN IMMEDIATE
+            conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS provider_buckets (
+                    provider TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    factor REAL NOT NULL,
+                    blocked_until REAL NOT NULL,
+                    strikes INTEGER NOT NULL
+                )
+                """
+            )
+            _connections[path] = (conn, threading.Lock())
+        return _connections[path]
+
+
+class SQLiteBucket(LocalBucket):
+    """Token bucket and backoff state shared by every process using the same SQLite file"""
+
+    def __init__(self, name: str, rate: float, burst: float, path: str):
+        super().__init__(name, rate, burst)
+        # The connection is shared by all buckets, so its lock serializes their transactions
+        self._conn, self._lock = shared_connection(path)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO provider_buckets VALUES (?, ?, ?, 1.0, 0.0, 0)", (name, self.burst, time.time())
+            )
+
+    @contextmanager
+    def _shared(self):
+        """Loads the shared state, lets the caller change it and writes it back, in one locked transaction"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.tokens, self.updated_at, self.factor, self.blocked_until, self.strikes = self._conn.execute(
+                    "SELECT tokens, updated_at, factor, blocked_until, strikes FROM provider_buckets "
+                    "WHERE provider = ?", (self.name,)
+                ).fetchone()
+                yield
+                self._conn.execute(
+                    "UPDATE provider_buckets SET tokens = ?, updated_at = ?, factor = ?, blocked_until = ?, "
+                    "strikes = ? WHERE provider = ?",
+                    (self.tokens, self.updated_at, self.factor, self.blocked_until, self.strikes, self.name),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def take(self, now: float) -> float:
+        with self._shared():
+            return self._take(now)
+
+    def throttled(self, now: float, retry_after: Optional[float]) -> float:
+        with self._shared():
+            return self._throttled(now, retry_after)
+
+    def succeeded(self) -> None:
+        with self._shared():
+            self._succeeded()
+
+
+class ProviderLimiter:
+    """Rate, concurrency and 429 backoff of one external provider, shared by every crew
+
+    Waiting calls are served round-robin per plan, so one plan with many
+    calls cannot starve the others. With a shared database the rate and the
+    backoff hold across processes; the concurrency limit is per process.
+    """
+
+    def __init__(self, name: str, rate: float, burst: float, concurrency: int,
+                 queue_timeout: float = settings.PROVIDER_QUEUE_TIMEOUT, shared_db: Optional[str] = None):
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.queue_timeout = queue_timeout
+        self.bucket = SQLiteBucket(name, rate, burst, shared_db) if shared_db else LocalBucket(name, rate, burst)
+        self._cond = threading.Condition()
+        # plan -> its waiting calls; the plan served last moves to the end
+        self._queues: "OrderedDict[Any, deque]" = OrderedDict()
+        self._waiting = 0
+        self.active = 0
+        self.calls = 0
+        self.throttles = 0
+        self.wait_seconds = 0.0
+
+    @staticmethod
+    def _flow():
+        # Calls of one plan share its trace (or progress log); anything else queues per thread
+        owner = telemetry.current_trace() or progress.current()
+        return id(owner) if owner is not None else threading.get_ident()
+
+    def _head(self):
+        for queue in self._queues.values():
+            return queue[0]
+        return None
+
+    def _leave(self, flow, ticket) -> None:
+        queue = self._queues[flow]
+        queue.remove(ticket)
+        if queue:
+            # Everybody else gets a turn before this plan's next call
+            self._queues.move_to_end(flow)
+        else:
+            del self._queues[flow]
+        self._waiting -= 1
+        PROVIDER_QUEUE.set(self._waiting, provider=self.name)
+
+    def acquire(self) -> None:
+        """Waits for a free slot and a token; raises TimeoutError or PlanCancelled instead of waiting forever"""
+        flow = self._flow()
+        ticket = object()
+        start = time.monotonic()
+        deadline = start + self.queue_timeout
+        with self._cond:
+            self._queues.setdefault(flow, deque()).append(ticket)
+            self._waiting += 1
+            PROVIDER_QUEUE.set(self._waiting, provider=self.name)
+            try:
+                while True:
+                    cancellation.check()
+                    wait = 0.5
+                    if self._head() is ticket and self.active < self.concurrency:
+                        wait = self.bucket.take(time.time())
+                        if wait <= 0:
+                            break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise ProviderQueueTimeout(f"Waited {self.queue_timeout:.0f}s for {self.name}")
+                    # Woken early by releases; cancellation is noticed within half a second
+                    self._cond.wait(min(wait, remaining, 0.5))
+            except BaseException:
+                self._leave(flow, ticket)
+                self._cond.notify_all()
+                raise
+            self._leave(flow, ticket)
+            self.active += 1
+            self.calls += 1
+            waited = time.monotonic() - start
+            self.wait_seconds += waited
+            self._cond.notify_all()
+        PROVIDER_WAIT_SECONDS.observe(waited, provider=self.name)
+
+    def release(self) -> None:
+        with self._cond:
+            self.active -= 1
+            self._cond.notify_all()
+
+    def idle(self) -> bool:
+        """True when no call holds or waits for a slot"""
+        with self._cond:
+            return self.active == 0 and self._waiting == 0
+
+    def throttled(self, retry_after: Optional[float] = None) -> None:
+        """Reports a 429: the provider is paused and its rate lowered until calls succeed again"""
+        PROVIDER_THROTTLED.inc(provider=self.name)
+        self.bucket.throttled(time.time(), retry_after)
+        with self._cond:
+            self.throttles += 1
+
+    @contextmanager
+    def slot(self):
+        """Holds a slot of the provider for one call, recording 429s and successes"""
+        self.acquire()
+        try:
+            yield
+        except Exception as e:
+            if is_rate_limit_error(e):
+                self.throttled(retry_after_of(e))
+            raise
+        else:
+            self.bucket.succeeded()
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            stats = {
+                "provider": self.name,
+                "concurrency": self.concurrency,
+                "active": self.active,
+                "waiting": self._waiting,
+                "calls": self.calls,
+                "throttled": self.throttles,
+                "avg_wait_seconds": round(self.wait_seconds / self.calls, 4) if self.calls else 0.0,
+            }
+        stats.update(self.bucket.state())
+        return stats
+
+
+def retry_after_of(error: BaseException) -> Optional[float]:
+    """Reads the Retry-After header (in seconds) of a failed HTTP call, when there is one"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+# provider -> (rate, burst, concurrency) for the providers that are not configured one by one
+_LIMITS = {
+    "search": lambda: (settings.SEARCH_RATE, settings.SEARCH_BURST, settings.SEARCH_CONCURRENCY),
+    "llm": lambda: (settings.LLM_RATE, settings.LLM_BURST, settings.LLM_CONCURRENCY),
+    "scrape": lambda: (settings.SCRAPE_HOST_RATE, settings.SCRAPE_HOST_BURST, settings.SCRAPE_HOST_CONCURRENCY),
+    # Public Nominatim servers allow one request per second, whatever the number of workers
+    "nominatim": lambda: (
+        1.0 / settings.GEOCODER_MIN_INTERVAL if settings.GEOCODER_MIN_INTERVAL > 0 else 0.0, 1, 1
+    ),
+}
+
+# Least recently used first, so that the limiters of hosts scraped long ago can be forgotten
+_limiters: "OrderedDict[str, ProviderLimiter]" = OrderedDict()
+_limiters_lock = threading.Lock()
+
+
+def _forget_idle_hosts() -> None:
+    """Drops the least recently used idle per-host limiters beyond PROVIDER_MAX_HOSTS (lock held)"""
+    excess = sum(1 for name in _limiters if ":" in name) - settings.PROVIDER_MAX_HOSTS
+    for name in list(_limiters):
+        if excess <= 0:
+            break
+        if ":" in name and _limiters[name].idle():
+            del _limiters[name]
+            excess -= 1
+
+
+def get_limiter(provider: str) -> ProviderLimiter:
+    """Returns the process-wide limiter of a provider ("search", "llm", "nominatim" or "scrape:<host>")"""
+    with _limiters_lock:
+        limiter = _limiters.get(provider)
+        if limiter is not None:
+            _limiters.move_to_end(provider)
+            return limiter
+        rate, burst, concurrency = _LIMITS[provider.split(":", 1)[0]]()
+        limiter = _limiters[provider] = ProviderLimiter(
+            provider, rate, burst, concurrency,
+            shared_db=settings.PROVIDER_LIMITS_DB if settings.PROVIDER_LIMITS_SHARED else None
+        )
+        _forget_idle_hosts()
+    return limiter
+
+
+def site(url: str) -> str:
+    """The provider name of a scraped site: every host is limited on its own"""
+    return f"scrape:{urlsplit(url).hostname or 'unknown'}"
+
+
+@contextmanager
+def provider_slot(provider: str):
+    """Runs the enclosed call under the provider's limits, when they are enabled"""
+    if not settings.PROVIDER_LIMITS:
+        yield
+        return
+    with get_limiter(provider).slot():
+        yield
+
+
+def stats() -> List[Dict[str, Any]]:
+    """Returns the state of every limiter created so far"""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return [limiter.stats() for limiter in limiters]
@@ -0,0 +1,258 @@
+import json
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+from pydantic import ValidationError
+
+from . import cancellation, compaction, progress, settings, telemetry
+from .day_planning import plan_selected_days
+from .fanout import attraction_key
+from .models import Attraction, DailyPlan, ResearchFindings, TravelItinerary
+
+PLAN_CHECKS = telemetry.REGISTRY.counter(
+    "travel_planner_plan_checks_total", "Planner outputs checked, by outcome", ["outcome"]
+)
+REPAIRED_DAYS = telemetry.REGISTRY.counter(
+    "travel_planner_repaired_days_total", "Invalid planner days, by how they were fixed", ["result"]
+)
+
+_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+_DETAILS = re.compile(r"(.+?)\s*\(([^)]*)\)")
+_DASH = re.compile(r"\s+[-–]\s+")
+
+
+def extract_json(raw: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Finds the JSON object in a planner answer that did not convert to a TravelItinerary"""
+    if not raw:
+        return None
+    text = raw.split("Final Answer:", 1)[-1].strip()
+    text = _FENCE.sub("", text)
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end < start:
+        return None
+    try:
+        data = json.loads(text[start:end + 1])
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def stub_attraction(item: Any) -> Optional[Attraction]:
+    """Keeps the name of an attraction with missing fields, so the repair prompt can complete it"""
+    if not isinstance(item, dict) or not isinstance(item.get("name"), str) or not item["name"].strip():
+        return None
+    fields = {
+        name: item[name] if isinstance(item.get(name), str) and item[name].strip() else "unknown"
+        for name in ("description", "category", "estimated_duration")
+    }
+    address = item.get("address") if isinstance(item.get("address"), str) else None
+    return Attraction(name=item["name"].strip(), address=address, **fields)
+
+
+def attraction_from_line(line: str) -> Optional[Attraction]:
+    """Reads "Name (category, duration; address): description" lines of free-text research"""
+    head, _, description = line.partition(": ")
+    match = _DETAILS.match(head)
+    if match:
+        name, details = match.group(1), match.group(2)
+        rest = head[match.end():].strip(" -–")
+    else:
+        parts = _DASH.split(head, 1)
+        name, details, rest = parts[0], "", parts[1] if len(parts) > 1 else ""
+    name = name.strip()
+    if not name:
+        return None
+    category, _, duration = details.partition(", ")
+    duration, _, address = duration.partition("; ")
+    return Attraction(
+        name=name,
+        description=description.strip() or name,
+        category=category.strip() or "unknown",
+        estimated_duration=duration.strip() or "unknown",
+        address=address.strip() or rest or None,
+    )
+
+
+def research_from_output(result) -> ResearchFindings:
+    """Recovers the attractions of the research task of a full crew run"""
+    for output in getattr(result, "tasks_output", None) or []:
+        if getattr(output, "name", None) == "research_task":
+            items, notes = compaction.parse_research_text(output.raw or "")
+            attractions = [attraction for attraction in map(attraction_from_line, items) if attraction]
+            return ResearchFindings(attractions=attractions, cultural_notes=notes or None)
+    return ResearchFindings(attractions=[])
+
+
+class ItineraryCheck:
+    """The valid parts of a planner answer and what is wrong with the rest, per day"""
+
+    def __init__(self, days: int, attractions_per_day: int):
+        self.days = days
+        self.attractions_per_day = attractions_per_day
+        self.city: Optional[str] = None
+        self.tips: Optional[str] = None
+        self.daily_plans: Dict[int, DailyPlan] = {}
+        # Named attractions with missing fields, per day
+        self.stubs: Dict[int, List[Attraction]] = {}
+        # Valid attractions beyond attractions_per_day, free to fill other days
+        self.spare: List[Attraction] = []
+        self.problems: Dict[int, str] = {}
+        # Invalid days the repair could not plan again
+        self.fallbacks: List[int] = []
+        self.used = set()
+
+    def check_day(self, number: int, entry: Dict[str, Any]) -> None:
+        items = entry.get("attractions")
+        valid, stubs, invalid, duplicates = [], [], 0, 0
+        for item in items if isinstance(items, list) else []:
+            try:
+                attraction = Attraction.model_validate(item)
+            except ValidationError:
+                invalid += 1
+                attraction = stub_attraction(item)
+                if attraction is not None and attraction_key(attraction.name) not in self.used:
+                    self.used.add(attraction_key(attraction.name))
+                    stubs.append(attraction)
+                continue
+            key = attraction_key(attraction.name)
+            if not key or key in self.used:
+                duplicates += 1
+                continue
+            self.used.add(key)
+            valid.append(attraction)
+
+        limit = self.attractions_per_day
+        self.spare.extend(valid[limit:])
+        valid = valid[:limit]
+
+        meals = entry.get("meal_suggestions")
+        if not isinstance(meals, list) or not all(isinstance(meal, str) for meal in meals):
+            meals = None
+        self.daily_plans[number] = DailyPlan(day_number=number, attractions=valid, meal_suggestions=meals)
+        self.stubs[number] = stubs[:max(0, limit - len(valid))]
+
+        problems = []
+        if invalid:
+            problems.append(f"{invalid} attraction(s) with missing or invalid fields")
+        if duplicates:
+            problems.append(f"{duplicates} attraction(s) already planned on another day")
+        if len(valid) < limit:
+            problems.append(f"covers {len(valid)} of {limit} attraction(s)")
+        if problems:
+            self.problems[number] = "; ".join(problems)
+
+    def check(self, data: Dict[str, Any]) -> "ItineraryCheck":
+        """Validates a planner answer (a TravelItinerary as a dict) day by day"""
+        if isinstance(data.get("city"), str) and data["city"].strip():
+            self.city = data["city"].strip()
+        if isinstance(data.get("overall_tips"), str):
+            self.tips = data["overall_tips"]
+
+        entries = data.get("daily_plans")
+        for position, entry in enumerate(entries if isinstance(entries, list) else []):
+            if not isinstance(entry, dict):
+                continue
+            number = entry.get("day_number")
+            if not isinstance(number, int) or not 1 <= number <= self.days or number in self.daily_plans:
+                # Missing or repeated day numbers: the position in the list decides
+                number = position + 1
+            if number > self.days or number in self.daily_plans:
+                # Days beyond the trip length are dropped
+                continue
+            self.check_day(number, entry)
+
+        for number in range(1, self.days + 1):
+            if number not in self.daily_plans:
+                self.daily_plans[number] = DailyPlan(day_number=number, attractions=[])
+                self.stubs[number] = []
+                self.problems[number] = "missing"
+        return self
+
+    def itinerary(self, city: str) -> TravelItinerary:
+        itinerary = TravelItinerary(
+            city=self.city or city,
+            days=self.days,
+            daily_plans=[self.daily_plans[number] for number in range(1, self.days + 1)],
+            overall_tips=self.tips
+        )
+        itinerary.mark_fallback_days(self.fallbacks)
+        return itinerary
+
+
+def repair_days(factory, check: ItineraryCheck, city: str, findings: ResearchFindings,
+                max_retries: int = settings.PLAN_REPAIR_MAX_RETRIES) -> None:
+    """Re-plans only the invalid days of a check, filling them up with unused research"""
+    spare = list(check.spare) + [
+        attraction for attraction in findings.attractions if attraction_key(attraction.name) not in check.used
+    ]
+    groups: Dict[int, List[Attraction]] = {}
+    fallbacks: Dict[int, List[Attraction]] = {}
+    for number in sorted(check.problems):
+        day = check.daily_plans[number]
+        missing = check.attractions_per_day - len(day.attractions) - len(check.stubs[number])
+        filler, spare = spare[:max(0, missing)], spare[max(0, missing):]
+        if not check.stubs[number] and not filler:
+            # Nothing the day planner could add: the day stays as it is
+            REPAIRED_DAYS.inc(result="unchanged")
+            check.fallbacks.append(number)
+            continue
+        groups[number] = day.attractions + check.stubs[number] + filler
+        fallbacks[number] = day.attractions + filler
+
+    if not groups:
+        return
+    # A cancelled plan is not repaired; plan_selected_days re-raises cancellations of the repair itself
+    cancellation.check()
+    progress.emit("plan_repair", {
+        "days": sorted(groups), "problems": {str(number): check.problems[number] for number in sorted(groups)}
+    })
+    telemetry.record_retry("plan_repair", len(groups))
+    planned = plan_selected_days(
+        factory, city, check.days, groups, findings.cultural_notes or check.tips or "none",
+        max_retries=max_retries, stage="plan_repair"
+    )
+
+    for number in groups:
+        if number in planned:
+            REPAIRED_DAYS.inc(result="repaired")
+            check.daily_plans[number] = planned[number]
+        else:
+            # The planned attractions still make a usable day
+            REPAIRED_DAYS.inc(result="fallback")
+            check.fallbacks.append(number)
+            progress.emit("day_fallback", {"day_number": number})
+            check.daily_plans[number] = check.daily_plans[number].model_copy(
+                update={"attractions": fallbacks[number]}
+            )
+
+
+def check_and_repair(factory, result, city: str, days: int, attractions_per_day: int,
+                     findings: Optional[ResearchFindings] = None) -> Optional[TravelItinerary]:
+    """Validates the output of a planning crew and re-plans only the days that are invalid
+
+    Returns None when nothing in the output or the research can be salvaged.
+    """
+    start = time.perf_counter()
+    if result.pydantic is not None:
+        data = result.pydantic.model_dump()
+    else:
+        data = extract_json(result.raw)
+    if findings is None:
+        findings = research_from_output(result)
+
+    if data is None and not findings.attractions:
+        PLAN_CHECKS.inc(outcome="unusable")
+        return None
+    check = ItineraryCheck(days, attractions_per_day).check(data or {})
+    telemetry.record_span(
+        "validate_itinerary", start, time.perf_counter() - start, invalid_days=len(check.problems)
+    )
+    if not check.problems:
+        PLAN_CHECKS.inc(outcome="valid")
+        return check.itinerary(city)
+
+    PLAN_CHECKS.inc(outcome="repaired")
+    with telemetry.span("plan_repair"):
+        repair_days(factory, check, city, findings)
+    return check.itinerary(city)
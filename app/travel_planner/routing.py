@@ -0,0 +1,269 @@
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from . import progress, settings, telemetry
+from .geocoding import get_geocoder
+from .models import Attraction, TravelItinerary
+
+EARTH_RADIUS_KM = 6371.0088
+# Nearest neighbour routes are started from at most this many points before 2-opt improves the best
+MAX_ROUTE_STARTS = 16
+
+KM_SAVED = telemetry.REGISTRY.counter(
+    "travel_planner_route_km_saved_total", "Walking distance removed from itineraries by route optimization"
+)
+
+
+def distance_matrix(points: np.ndarray) -> np.ndarray:
+    """Great-circle distances in km between all pairs of (latitude, longitude) points"""
+    lat = np.radians(points[:, 0])
+    lon = np.radians(points[:, 1])
+    dlat = lat[:, None] - lat[None, :]
+    dlon = lon[:, None] - lon[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def unit_vectors(points: np.ndarray) -> np.ndarray:
+    """Maps (latitude, longitude) points onto the unit sphere, where means and distances behave"""
+    lat = np.radians(points[:, 0])
+    lon = np.radians(points[:, 1])
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+def path_length(order: Sequence[int], distances: np.ndarray) -> float:
+    """Length of an open path visiting the points in order"""
+    if len(order) < 2:
+        return 0.0
+    order = np.asarray(order)
+    return float(distances[order[:-1], order[1:]].sum())
+
+
+def nearest_neighbour(distances: np.ndarray, start: int) -> List[int]:
+    order = [start]
+    visited = np.zeros(len(distances), dtype=bool)
+    visited[start] = True
+    for _ in range(len(distances) - 1):
+        nearest = int(np.argmin(np.where(visited, np.inf, distances[order[-1]])))
+        visited[nearest] = True
+        order.append(nearest)
+    return order
+
+
+def two_opt(order: Sequence[int], distances: np.ndarray) -> List[int]:
+    """Reverses parts of an open path for as long as that makes it shorter"""
+    order = np.asarray(order)
+    n = len(order)
+    if n < 3:
+        return order.tolist()
+
+    for _ in range(n * n):
+        best_gain, best = 1e-9, None
+        for i in range(n - 1):
+            # Reversing order[i:j + 1] for every j > i at once
+            j = np.arange(i + 1, n)
+            b, c = order[i], order[j]
+            d = order[np.minimum(j + 1, n - 1)]
+            last = j == n - 1
+            before = np.where(last, 0.0, distances[c, d])
+            after = np.where(last, 0.0, distances[b, d])
+            if i > 0:
+                a = order[i - 1]
+                before = before + distances[a, b]
+                after = after + distances[a, c]
+            gains = before - after
+            index = int(np.argmax(gains))
+            if gains[index] > best_gain:
+                best_gain, best = gains[index], (i, int(j[index]))
+        if best is None:
+            break
+        i, j = best
+        order[i:j + 1] = order[i:j + 1][::-1].copy()
+    return order.tolist()
+
+
+def route(distances: np.ndarray, initial: Optional[Sequence[int]] = None) -> List[int]:
+    """Orders points into a short open path: nearest neighbour from several starts, then 2-opt"""
+    n = len(distances)
+    if n < 3:
+        return list(initial) if initial is not None else list(range(n))
+
+    # Paths tend to start at the edge of a group, so the starts are the points farthest out
+    starts = np.argsort(-distances.sum(axis=1), kind="stable")[:MAX_ROUTE_STARTS]
+    candidates = [nearest_neighbour(distances, int(start)) for start in starts]
+    if initial is not None:
+        candidates.append(list(initial))
+    best = min(candidates, key=lambda order: path_length(order, distances))
+    return two_opt(best, distances)
+
+
+def assign(cost: np.ndarray, capacities: Sequence[int]) -> np.ndarray:
+    """Gives every point a group, cheapest (point, group) pairs first, without overfilling a group"""
+    n, k = cost.shape
+    labels = np.full(n, -1)
+    left = np.asarray(capacities).copy()
+    remaining = n
+    for flat in np.argsort(cost, axis=None, kind="stable"):
+        point, group = divmod(int(flat), k)
+        if labels[point] < 0 and left[group] > 0:
+            labels[point] = group
+            left[group] -= 1
+            remaining -= 1
+            if not remaining:
+                break
+    return labels
+
+
+def cluster(points: np.ndarray, capacities: Sequence[int],
+            iterations: int = settings.ROUTE_CLUSTER_ITERATIONS) -> List[List[int]]:
+    """Splits points into geographically tight groups of exactly the given sizes (capacitated k-means)"""
+    vectors = unit_vectors(points)
+    k = len(capacities)
+
+    # Deterministic farthest-point seeding, from the point farthest from the centre
+    seeds = [int(np.argmax(np.linalg.norm(vectors - vectors.mean(axis=0), axis=1)))]
+    nearest_seed = np.linalg.norm(vectors - vectors[seeds[0]], axis=1)
+    for _ in range(1, k):
+        seeds.append(int(np.argmax(nearest_seed)))
+        nearest_seed = np.minimum(nearest_seed, np.linalg.norm(vectors - vectors[seeds[-1]], axis=1))
+    centers = vectors[seeds]
+
+    labels = None
+    for _ in range(max(1, iterations)):
+        cost = np.linalg.norm(vectors[:, None, :] - centers[None, :, :], axis=2)
+        new_labels = assign(cost, capacities)
+        if labels is not None and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        centers = np.array([
+            vectors[labels == group].mean(axis=0) if np.any(labels == group) else centers[group]
+            for group in range(k)
+        ])
+    return [np.flatnonzero(labels == group).tolist() for group in range(k)]
+
+
+def match_days(groups: List[List[int]], day_of: Sequence[int], sizes: Sequence[int]) -> List[int]:
+    """Numbers the new groups after the planned days they share the most attractions with
+
+    Meal suggestions stay with their day, so they still fit most of its attractions.
+    """
+    overlap = np.zeros((len(groups), len(sizes)))
+    for group, members in enumerate(groups):
+        for point in members:
+            overlap[group, day_of[point]] += 1
+
+    matched = [-1] * len(groups)
+    taken = set()
+    for flat in np.argsort(-overlap, axis=None, kind="stable"):
+        group, day = divmod(int(flat), len(sizes))
+        # A group can only become a day of its own size
+        if matched[group] < 0 and day not in taken and len(groups[group]) == sizes[day]:
+            matched[group] = day
+            taken.add(day)
+    return matched
+
+
+def resolve(itinerary: TravelItinerary, geocoder=None,
+            budget: float = settings.ROUTE_GEOCODE_BUDGET) -> Dict[int, Tuple[float, float]]:
+    """Looks up the coordinates of the attractions (by position), asking the API for budget seconds at most"""
+    geocoder = geocoder or get_geocoder()
+    deadline = time.monotonic() + budget
+    coordinates = {}
+    position = 0
+    for day in itinerary.daily_plans:
+        for attraction in day.attractions:
+            place = attraction.address or attraction.name
+            if time.monotonic() < deadline:
+                found = geocoder.lookup(place, itinerary.city)
+            else:
+                # Out of time: whatever is cached is still used
+                found = geocoder.cached(place, itinerary.city)
+            if found is not None:
+                coordinates[position] = found
+            position += 1
+    return coordinates
+
+
+def order_day(attractions: List[Attraction], positions: List[int], coordinates: Dict[int, Tuple[float, float]],
+              distances: np.ndarray, index: Dict[int, int]) -> Tuple[List[Attraction], float, float]:
+    """Orders the located attractions of a day into a short route; the others keep their place at the end
+
+    Returns the attractions and the route length before and after, in km.
+    """
+    located = [i for i, position in enumerate(positions) if position in coordinates]
+    rows = [index[positions[i]] for i in located]
+    day_distances = distances[np.ix_(rows, rows)]
+    before = path_length(range(len(rows)), day_distances)
+    order = route(day_distances, initial=range(len(rows)))
+    after = path_length(order, day_distances)
+    unlocated = [attractions[i] for i, position in enumerate(positions) if position not in coordinates]
+    return [attractions[located[i]] for i in order] + unlocated, before, after
+
+
+def optimize_itinerary(itinerary: TravelItinerary, geocoder=None,
+                       clustering: bool = settings.ROUTE_CLUSTERING) -> TravelItinerary:
+    """Regroups the attractions into compact days and orders every day as a short route
+
+    Runs after planning and changes no attraction: days keep their size and meal
+    suggestions, only which attractions they hold and their visiting order change.
+    Attractions that cannot be located stay on their day, after the located ones.
+    """
+    attractions = [attraction for day in itinerary.daily_plans for attraction in day.attractions]
+    day_of = [number for number, day in enumerate(itinerary.daily_plans) for _ in day.attractions]
+    if len(attractions) < 2:
+        return itinerary
+
+    coordinates = resolve(itinerary, geocoder)
+    if len(coordinates) < 2:
+        return itinerary
+    located = sorted(coordinates)
+    index = {position: row for row, position in enumerate(located)}
+    points = np.array([coordinates[position] for position in located], dtype=float)
+    distances = distance_matrix(points)
+
+    # The planner's grouping, only reordered within each day
+    groupings = [[[position for position, day in enumerate(day_of) if day == number]
+                  for number in range(len(itinerary.daily_plans))]]
+
+    sizes = [len(day.attractions) for day in itinerary.daily_plans]
+    if clustering and len(coordinates) == len(attractions) and sum(1 for size in sizes if size) > 1:
+        # Every attraction is located: the days can be regrouped by distance
+        busy_days = [number for number, size in enumerate(sizes) if size]
+        groups = cluster(points, [sizes[number] for number in busy_days])
+        matched = match_days(groups, [busy_days.index(day) for day in day_of], [sizes[n] for n in busy_days])
+        regrouped = [[] for _ in itinerary.daily_plans]
+        for group, members in enumerate(groups):
+            regrouped[busy_days[matched[group]]] = [located[row] for row in members]
+        groupings.append(regrouped)
+
+    best = None
+    before = None
+    for grouping in groupings:
+        days, day_lengths = [], []
+        for day, positions in zip(itinerary.daily_plans, grouping):
+            ordered, day_before, day_after = order_day(
+                [attractions[position] for position in positions], positions, coordinates, distances, index
+            )
+            days.append(day.model_copy(update={"attractions": ordered}))
+            day_lengths.append((day_before, day_after))
+        if before is None:
+            # The planner's own routes, for the comparison
+            before = sum(day_before for day_before, _ in day_lengths)
+        after = sum(day_after for _, day_after in day_lengths)
+        if best is None or after < best[1]:
+            best = (days, after)
+
+    days, after = best
+    saved = max(0.0, before - after)
+    KM_SAVED.inc(saved)
+    moved = sum(
+        1 for old, new in zip(itinerary.daily_plans, days)
+        for attraction in new.attractions if attraction not in old.attractions
+    )
+    progress.emit("route", {
+        "km_before": round(before, 2), "km_after": round(after, 2), "moved_attractions": moved,
+        "located": len(coordinates), "attractions": len(attractions),
+    })
+    return itinerary.model_copy(update={"daily_plans": days})
@@ -0,0 +1,124 @@
+import threading
+from typing import Any, Dict, Iterable, Iterator, Optional, Set
+
+from . import planning, rate_limits, settings
+from .batch import BatchJobs, run_batch, submit_batch
+from .crew_factory import crew_factory_loaded, get_crew_factory, llm_stats, model_stats, preload, tool_stats
+from .geocoding import get_geocoder
+from .jobs import Job
+from .models import TravelItinerary
+
+
+class Runtime:
+    """The state every plan of the process shares, whichever entry point started it
+
+    The web app, the CLIs and batch jobs plan through the same crew factory
+    (configs, tools, LLM cache and model routes), itinerary cache, request
+    coalescing, worker pool, provider limits and metrics, so they all get the
+    same performance features. Everything is created on first use; nothing
+    here loads the agent stack before the first plan.
+    """
+
+    @property
+    def crews(self):
+        """The crew factory (loads the agent stack)"""
+        return get_crew_factory()
+
+    @property
+    def itinerary_cache(self):
+        return planning.get_itinerary_cache()
+
+    @property
+    def jobs(self):
+        """The worker pool behind submit()"""
+        return planning.get_job_manager()
+
+    @property
+    def refresh(self):
+        return planning.get_refresh_scheduler()
+
+    @property
+    def knowledge_base(self):
+        return planning.get_knowledge_base()
+
+    @property
+    def agent_stack_loaded(self) -> bool:
+        return crew_factory_loaded()
+
+    def configure(self, search_tool=None, scrape_tool=None, llm=None):
+        """Plans with other tools or another LLM from now on, e.g. the stand-ins of the offline benchmarks"""
+        from .crew_factory import CrewFactory, set_crew_factory
+
+        factory = CrewFactory(search_tool=search_tool, scrape_tool=scrape_tool, llm=llm)
+        set_crew_factory(factory)
+        return factory
+
+    def start(self) -> None:
+        """Starts what the settings ask to run in the background: the preload and the refresh scheduler"""
+        if settings.PRELOAD_AGENT_STACK in ("background", "eager"):
+            # Otherwise the first plan pays for importing the agent stack
+            preload(background=settings.PRELOAD_AGENT_STACK == "background")
+
+        if settings.WARMUP_ENABLED and settings.ITINERARY_CACHE_ENABLED:
+            # Keep popular trips cached and fresh in the background
+            self.refresh.start()
+
+    def plan(self, city: str, days: int, attractions_per_day: int, use_cache: bool = True,
+             timeout: Optional[float] = None) -> TravelItinerary:
+        """Plans a trip in the calling thread, from the cache or a shared crew run when possible"""
+        return planning.plan_itinerary(city, days, attractions_per_day, use_cache=use_cache, timeout=timeout)
+
+    def submit(self, city: str, days: int, attractions_per_day: int, use_cache: bool = True) -> Job:
+        """Queues a plan on the worker pool and returns its job right away"""
+        return planning.submit_plan(city, days, attractions_per_day, use_cache=use_cache)
+
+    def batch(self, trips: Iterable[Dict[str, Any]], concurrency: int = settings.BATCH_CONCURRENCY,
+              rate: float = settings.BATCH_RATE, use_cache: bool = True,
+              skip: Optional[Set[str]] = None) -> Iterator[Dict[str, Any]]:
+        """Plans many trips on threads of their own and yields their results as they finish (see batch.run_batch)"""
+        return run_batch(trips, concurrency, rate, use_cache=use_cache, skip=skip)
+
+    def submit_batch(self, trips: Iterable[Dict[str, Any]], concurrency: int = settings.BATCH_CONCURRENCY,
+                     rate: float = settings.BATCH_RATE, use_cache: bool = True) -> BatchJobs:
+        """Plans many trips as jobs of the worker pool; iterate the batch for their results"""
+        return submit_batch(trips, concurrency, rate, use_cache=use_cache)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the counters of the caches, the coalescing, the worker pool, the tools and the providers"""
+        stats = self.itinerary_cache.stats()
+        stats["single_flight"] = planning.in_flight_plans.stats()
+        stats["jobs"] = self.jobs.stats()
+        stats["tools"] = tool_stats()
+        if settings.LLM_CACHE:
+            stats["llm"] = llm_stats()
+        if settings.PROVIDER_LIMITS:
+            stats["providers"] = rate_limits.stats()
+        if settings.MODEL_ROUTING:
+            stats["models"] = model_stats()
+        if settings.ROUTE_OPTIMIZATION:
+            stats["geocode"] = get_geocoder().stats()
+        if settings.WARMUP_ENABLED:
+            stats["refresh"] = self.refresh.stats()
+        return stats
+
+    def stop_accepting(self) -> None:
+        """Stops the background refreshes and rejects new plan jobs"""
+        planning.stop_accepting()
+
+    def shutdown(self, timeout: Optional[float] = None) -> bool:
+        """Drains the plan jobs; returns False when some had to be cancelled"""
+        return planning.shutdown(timeout)
+
+
+_runtime = None
+_runtime_lock = threading.Lock()
+
+
+def get_runtime() -> Runtime:
+    """Returns the process-wide runtime"""
+    global _runtime
+    if _runtime is None:
+        with _runtime_lock:
+            if _runtime is None:
+                _runtime = Runtime()
+    return _runtime
@@ -0,0 +1,172 @@
+import re
+import time
+from typing import Optional, Type
+
+import requests
+from bs4 import BeautifulSoup
+from crewai.tools import BaseTool
+from pydantic import BaseModel, Field, PrivateAttr
+from requests.adapters import HTTPAdapter
+
+from . import cancellation, settings
+from .cache import TTLCache
+from .rate_limits import provider_slot, site
+from .singleflight import SingleFlight
+from .tool_metrics import ToolMetrics
+
+# Elements that never carry content the researcher needs
+BOILERPLATE_TAGS = ["script", "style", "noscript", "template", "svg", "canvas", "iframe",
+                    "nav", "header", "footer", "aside", "form", "button"]
+# class/id fragments of cookie banners, menus, share bars, ads and the like
+BOILERPLATE_PATTERN = re.compile(
+    r"cookie|consent|banner|navbar|menu|sidebar|breadcrumb|footer|share|social|newsletter|subscribe|advert|promo|popup|modal",
+    re.IGNORECASE
+)
+
+
+class ScrapeInput(BaseModel):
+    """Input of the scraping tool"""
+    website_url: str = Field(description="Full URL of the website to read")
+
+
+def extract_text(html: str, max_chars: int) -> str:
+    """Strips the boilerplate from a page and returns its readable text"""
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(BOILERPLATE_TAGS):
+        tag.decompose()
+    for tag in soup.find_all(True):
+        if tag.decomposed:
+            continue
+        attrs = " ".join(tag.get("class") or []) + " " + (tag.get("id") or "")
+        if attrs.strip() and BOILERPLATE_PATTERN.search(attrs):
+            tag.decompose()
+
+    # Prefer the main content of the page when it is marked up
+    root = soup.find("main") or soup.find("article") or soup.body or soup
+    title = soup.title.get_text(strip=True) if soup.title else ""
+
+    lines = []
+    seen = set()
+    for line in root.get_text("\n").splitlines():
+        line = " ".join(line.split())
+        # Very short fragments are mostly leftover link labels; repeated lines add nothing
+        if len(line) < 3 or line in seen:
+            continue
+        seen.add(line)
+        lines.append(line)
+
+    text = "\n".join(([title] if title and title not in seen else []) + lines)
+    if len(text) > max_chars:
+        text = text[:max_chars].rsplit(" ", 1)[0] + " […]"
+    return text
+
+
+class CachedScrapeTool(BaseTool):
+    """Reads web pages over pooled connections, with a revalidated page cache and size limits"""
+
+    name: str = "Read website content"
+    description: str = "Read the main text content of a website, given its full URL."
+    args_schema: Type[BaseModel] = ScrapeInput
+
+    max_bytes: int = settings.SCRAPE_MAX_BYTES
+    max_chars: int = settings.SCRAPE_MAX_CHARS
+    timeout: float = settings.SCRAPE_TIMEOUT
+    # Pages younger than this are served from the cache without asking the site
+    fresh_seconds: float = settings.SCRAPE_FRESH_SECONDS
+
+    _session = PrivateAttr(default=None)
+    _pages = PrivateAttr(default=None)
+    _in_flight = PrivateAttr(default_factory=SingleFlight)
+    _metrics = PrivateAttr(default=None)
+
+    def model_post_init(self, __context) -> None:
+        super().model_post_init(__context)
+        # Keep-alive connections are pooled per host and shared by every crew
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=settings.SCRAPE_POOL_SIZE, pool_maxsize=settings.SCRAPE_POOL_SIZE)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update({
+            "User-Agent": "Mozilla/5.0 (compatible; TravelPlanner/1.0)",
+            "Accept": "text/html,application/xhtml+xml,text/plain;q=0.9",
+            "Accept-Encoding": "gzip, deflate",
+        })
+        self._session = session
+        # Keeps the extracted text together with the validators needed to revalidate it
+        self._pages = TTLCache(
+            namespace="pages",
+            max_entries=settings.SCRAPE_CACHE_MAX_ENTRIES,
+            ttl=settings.SCRAPE_CACHE_TTL,
+            db_path=settings.TRAVEL_PLANNER_CACHE_DB if settings.SCRAPE_CACHE_DISK else None,
+            max_disk_entries=settings.SCRAPE_CACHE_MAX_DISK_ENTRIES,
+        )
+        self._metrics = ToolMetrics(self.name)
+
+    def _download(self, url: str, cached: Optional[dict]) -> dict:
+        """Fetches a page, conditionally when a cached copy exists"""
+        headers = {}
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        deadline = time.monotonic() + self.timeout
+        with self._session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+            if response.status_code == 304 and cached:
+                return dict(cached, fetched_at=time.time())
+            response.raise_for_status()
+
+            content_type = response.headers.get("Content-Type", "")
+            if "html" not in content_type and "text" not in content_type:
+                raise ValueError(f"Unsupported content type {content_type!r} at {url}")
+
+            # Stop reading at the byte limit or the deadline, whichever comes first
+            body = bytearray()
+            for chunk in response.iter_content(chunk_size=16384):
+                body.extend(chunk)
+                if len(body) >= self.max_bytes or time.monotonic() > deadline:
+                    break
+
+            html = bytes(body[:self.max_bytes]).decode(response.encoding or "utf-8", errors="replace")
+            return {
+                "text": extract_text(html, self.max_chars),
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "fetched_at": time.time(),
+            }
+
+    def _run(self, website_url: str) -> str:
+        # A cancelled plan makes no more requests
+        cancellation.check()
+        url = website_url.strip()
+        cached = self._pages.get(url)
+        if cached and time.time() - cached["fetched_at"] < self.fresh_seconds:
+            self._metrics.hit()
+            return cached["text"]
+
+        def fetch() -> str:
+            # Every site has its own limits, shared by every crew
+            with provider_slot(site(url)), self._metrics.measure():
+                page = self._download(url, cached)
+            self._pages.set(url, page)
+            return page["text"]
+
+        # Joiners wait as long as the leader may: its turn at the site's limiter, then the download
+        queue_timeout = settings.PROVIDER_QUEUE_TIMEOUT if settings.PROVIDER_LIMITS else 0.0
+        try:
+            return self._in_flight.do(url, fetch, timeout=queue_timeout + self.timeout * 2)
+        except cancellation.PlanCancelled:
+            # The caller's plan was cancelled: stop the crew instead of handing the agent a message
+            raise
+        except Exception as e:
+            # A stale copy is better than nothing when the site is down
+            if cached:
+                return cached["text"]
+            return f"Could not read {url}: {e}"
+
+    def stats(self):
+        """Returns the hit rate and latency of the tool and the state of its page cache"""
+        stats = self._metrics.snapshot()
+        stats["cache"] = self._pages.stats()
+        return stats
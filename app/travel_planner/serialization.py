@@ -0,0 +1,189 @@
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+# Both encoders are optional: orjson only makes encoding faster, brotli adds the "br" encoding
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from . import settings, telemetry
+from .models import TravelItinerary
+
+# Fields clients can leave out with ?exclude=, e.g. exclude=description,address
+ATTRACTION_FIELDS = ("description", "category", "estimated_duration", "address")
+DAY_FIELDS = ("meal_suggestions",)
+ITINERARY_FIELDS = ("overall_tips",)
+EXCLUDABLE_FIELDS = ATTRACTION_FIELDS + DAY_FIELDS + ITINERARY_FIELDS
+
+SERIALIZATIONS = telemetry.REGISTRY.counter(
+    "travel_planner_serializations_total", "Itinerary responses, by whether the JSON was reused", ["result"]
+)
+
+_serialized: "OrderedDict[int, SerializedItinerary]" = OrderedDict()
+_serialized_lock = threading.Lock()
+
+
+def dumps(data: Any) -> bytes:
+    """Encodes data as compact UTF-8 JSON, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def parse_exclude(value: Optional[str]) -> Tuple[str, ...]:
+    """Reads the ?exclude= parameter; raises ValueError for fields that cannot be left out"""
+    fields = sorted({field.strip() for field in (value or "").split(",") if field.strip()})
+    unknown = [field for field in fields if field not in EXCLUDABLE_FIELDS]
+    if unknown:
+        raise ValueError(f"Cannot exclude {', '.join(unknown)}; choose from {', '.join(EXCLUDABLE_FIELDS)}")
+    return tuple(fields)
+
+
+def project(data: Dict[str, Any], exclude: Tuple[str, ...]) -> Dict[str, Any]:
+    """Drops the excluded fields from an itinerary dict"""
+    data = {key: value for key, value in data.items() if key not in exclude}
+    data["daily_plans"] = [
+        dict(
+            {key: value for key, value in day.items() if key not in exclude},
+            attractions=[
+                {key: value for key, value in attraction.items() if key not in exclude}
+                for attraction in day.get("attractions") or []
+            ]
+        )
+        for day in data.get("daily_plans") or []
+    ]
+    return data
+
+
+def extend(body: bytes, fields: Dict[str, Any]) -> bytes:
+    """Appends fields to an encoded JSON object without decoding it"""
+    head = body.rstrip()[:-1].rstrip()
+    extra = dumps(fields)[1:]
+    if extra == b"}":
+        return head + extra
+    return head + (b"," if head != b"{" else b"") + extra
+
+
+def available_encodings() -> List[str]:
+    """Content encodings this process can produce, preferred first"""
+    return (["br"] if brotli is not None else []) + ["gzip", "identity"]
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.RESPONSE_BROTLI_QUALITY)
+    if encoding == "gzip":
+        # mtime=0 keeps the bytes (and so the ETag) identical between processes
+        return gzip.compress(body, compresslevel=settings.RESPONSE_GZIP_LEVEL, mtime=0)
+    return body
+
+
+def etag_of(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()[:32]
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Compares an If-None-Match header with an identity ETag, whatever encoding it was sent in"""
+    for candidate in (if_none_match or "").split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        candidate = candidate.strip('"')
+        for suffix in ("-br", "-gzip"):
+            if candidate.endswith(suffix):
+                candidate = candidate[:-len(suffix)]
+        if candidate == etag:
+            return True
+    return False
+
+
+class SerializedItinerary:
+    """An itinerary with its JSON body, ETag and compressed variants, each built once"""
+
+    def __init__(self, itinerary: TravelItinerary, body: Optional[bytes] = None):
+        self.itinerary = itinerary
+        self.body = body if body is not None else itinerary.model_dump_json().encode("utf-8")
+        self.etag = etag_of(self.body)
+        # (exclude, encoding) -> (body, etag of the uncompressed body)
+        self._variants: Dict[Tuple[Tuple[str, ...], str], Tuple[bytes, str]] = {}
+        self._lock = threading.Lock()
+
+    def variant(self, exclude: Tuple[str, ...] = (), encoding: str = "identity") -> Tuple[bytes, str, str]:
+        """Returns (body, etag, encoding) of a projection, compressed when that is worth it
+
+        The etag is the one of the uncompressed body; small bodies are sent uncompressed.
+        """
+        if not exclude:
+            base, etag = self.body, self.etag
+        else:
+            with self._lock:
+                cached = self._variants.get((exclude, "identity"))
+            if cached is None:
+                base = dumps(project(json.loads(self.body), exclude))
+                cached = (base, etag_of(base))
+                with self._lock:
+                    self._variants[(exclude, "identity")] = cached
+            base, etag = cached
+
+        if encoding == "identity" or len(base) < settings.RESPONSE_COMPRESS_MIN_BYTES:
+            return base, etag, "identity"
+        with self._lock:
+            cached = self._variants.get((exclude, encoding))
+        if cached is None:
+            cached = (compress(base, encoding), etag)
+            with self._lock:
+                self._variants[(exclude, encoding)] = cached
+        return cached[0], etag, encoding
+
+
+def serialize(itinerary: TravelItinerary, body: Optional[bytes] = None) -> SerializedItinerary:
+    """Returns the serialized form of an itinerary, encoding it only the first time
+
+    Cached itineraries are the same objects on every hit, so their responses
+    are sent from bytes built once. body is JSON read from elsewhere (e.g.
+    the disk cache) that can be reused as is.
+    """
+    key = id(itinerary)
+    with _serialized_lock:
+        serialized = _serialized.get(key)
+        # The entry holds on to its itinerary, so a matching id is the same object
+        if serialized is not None and serialized.itinerary is itinerary:
+            _serialized.move_to_end(key)
+            SERIALIZATIONS.inc(result="reused")
+            return serialized
+
+    serialized = SerializedItinerary(itinerary, body)
+    SERIALIZATIONS.inc(result="encoded")
+    with _serialized_lock:
+        _serialized[key] = serialized
+        _serialized.move_to_end(key)
+        while len(_serialized) > settings.RESPONSE_CACHE_MAX_ENTRIES:
+            _serialized.popitem(last=False)
+    return serialized
+
+
+def load_itinerary(text: str) -> TravelItinerary:
+    """Reads an itinerary from the disk cache, keeping its JSON for the responses"""
+    itinerary = TravelItinerary.model_validate_json(text)
+    serialize(itinerary, text.encode("utf-8"))
+    return itinerary
+
+
+def encode_record(record: Dict[str, Any]) -> bytes:
+    """Encodes a batch result whose "itinerary" is a model, splicing in its precompiled JSON"""
+    itinerary = record.get("itinerary")
+    if not isinstance(itinerary, TravelItinerary):
+        return dumps(record)
+    head = dumps({key: value for key, value in record.items() if key != "itinerary"})[:-1]
+    return head + (b"," if head != b"{" else b"") + b'"itinerary":' + serialize(itinerary).body + b"}"
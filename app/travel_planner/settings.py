@@ -0,0 +1,207 @@
+import os
+
+# Every setting can be overridden with an environment variable of the same name
+base_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+def env_int(name: str, default: int) -> int:
+    """Reads an integer setting from the environment"""
+    value = os.environ.get(name)
+    return int(value) if value not in (None, "") else default
+
+
+def env_float(name: str, default: float) -> float:
+    """Reads a float setting from the environment"""
+    value = os.environ.get(name)
+    return float(value) if value not in (None, "") else default
+
+
+def env_bool(name: str, default: bool) -> bool:
+    """Reads a boolean setting from the environment"""
+    value = os.environ.get(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Directory and SQLite file used by the disk-backed caches
+TRAVEL_PLANNER_CACHE_DIR = os.environ.get("TRAVEL_PLANNER_CACHE_DIR", os.path.join(base_dir, ".cache"))
+TRAVEL_PLANNER_CACHE_DB = os.environ.get(
+    "TRAVEL_PLANNER_CACHE_DB", os.path.join(TRAVEL_PLANNER_CACHE_DIR, "cache.sqlite3")
+)
+
+# Itinerary result cache
+ITINERARY_CACHE_ENABLED = env_bool("ITINERARY_CACHE_ENABLED", True)
+ITINERARY_CACHE_TTL = env_int("ITINERARY_CACHE_TTL", 24 * 60 * 60)
+ITINERARY_CACHE_MAX_ENTRIES = env_int("ITINERARY_CACHE_MAX_ENTRIES", 512)
+ITINERARY_CACHE_MAX_DISK_ENTRIES = env_int("ITINERARY_CACHE_MAX_DISK_ENTRIES", 20000)
+# Expired itineraries are kept this much longer so the refresh scheduler can serve them while it replans
+ITINERARY_CACHE_STALE_TTL = env_int("ITINERARY_CACHE_STALE_TTL", 7 * 24 * 60 * 60)
+
+# Seconds a request waits for a (possibly shared) crew run before giving up
+PLAN_TIMEOUT = env_float("PLAN_TIMEOUT", 600.0)
+
+# Worker pool behind the job API
+JOB_WORKERS = env_int("JOB_WORKERS", 4)
+JOB_QUEUE_SIZE = env_int("JOB_QUEUE_SIZE", 16)
+JOB_RESULT_TTL = env_int("JOB_RESULT_TTL", 60 * 60)
+
+# Web search result cache of CustomSearchTool
+SEARCH_CACHE_TTL = env_int("SEARCH_CACHE_TTL", 6 * 60 * 60)
+SEARCH_CACHE_MAX_ENTRIES = env_int("SEARCH_CACHE_MAX_ENTRIES", 2048)
+SEARCH_CACHE_DISK = env_bool("SEARCH_CACHE_DISK", True)
+SEARCH_CACHE_MAX_DISK_ENTRIES = env_int("SEARCH_CACHE_MAX_DISK_ENTRIES", 50000)
+SEARCH_TIMEOUT = env_float("SEARCH_TIMEOUT", 30.0)
+
+# Web page scraping
+SCRAPE_MAX_BYTES = env_int("SCRAPE_MAX_BYTES", 1_000_000)
+SCRAPE_MAX_CHARS = env_int("SCRAPE_MAX_CHARS", 6000)
+SCRAPE_TIMEOUT = env_float("SCRAPE_TIMEOUT", 15.0)
+SCRAPE_POOL_SIZE = env_int("SCRAPE_POOL_SIZE", 16)
+SCRAPE_FRESH_SECONDS = env_int("SCRAPE_FRESH_SECONDS", 24 * 60 * 60)
+SCRAPE_CACHE_TTL = env_int("SCRAPE_CACHE_TTL", 7 * 24 * 60 * 60)
+SCRAPE_CACHE_MAX_ENTRIES = env_int("SCRAPE_CACHE_MAX_ENTRIES", 512)
+SCRAPE_CACHE_DISK = env_bool("SCRAPE_CACHE_DISK", True)
+SCRAPE_CACHE_MAX_DISK_ENTRIES = env_int("SCRAPE_CACHE_MAX_DISK_ENTRIES", 20000)
+
+# Parallel fan-out research (opt-in): the research is split into batches that run concurrently
+RESEARCH_FANOUT = env_bool("RESEARCH_FANOUT", False)
+# "day" gives every day its own batch, "category" gives every batch its own attraction categories
+RESEARCH_FANOUT_MODE = os.environ.get("RESEARCH_FANOUT_MODE", "category")
+RESEARCH_PARALLELISM = env_int("RESEARCH_PARALLELISM", 4)
+RESEARCH_MAX_BATCHES = env_int("RESEARCH_MAX_BATCHES", 8)
+RESEARCH_CATEGORIES = [
+    category.strip()
+    for category in os.environ.get(
+        "RESEARCH_CATEGORIES",
+        "Historical Sites,Museums,Religious Sites,Parks and Gardens,Markets and Bazaars,Architecture,Viewpoints,Neighbourhoods"
+    ).split(",")
+    if category.strip()
+]
+
+# Incremental planning (opt-in): every day is planned and validated on its own
+PER_DAY_PLANNING = env_bool("PER_DAY_PLANNING", False)
+# Shorter trips keep using a single planning step
+PER_DAY_PLANNING_MIN_DAYS = env_int("PER_DAY_PLANNING_MIN_DAYS", 4)
+PER_DAY_PARALLELISM = env_int("PER_DAY_PARALLELISM", 4)
+PER_DAY_MAX_RETRIES = env_int("PER_DAY_MAX_RETRIES", 2)
+
+# City knowledge base: researched attractions reused across trip shapes
+KNOWLEDGE_BASE = env_bool("KNOWLEDGE_BASE", False)
+KNOWLEDGE_BASE_DB = os.environ.get("KNOWLEDGE_BASE_DB", os.path.join(TRAVEL_PLANNER_CACHE_DIR, "knowledge.sqlite3"))
+# Attractions researched longer ago than this are researched again
+KNOWLEDGE_BASE_MAX_AGE = env_int("KNOWLEDGE_BASE_MAX_AGE", 30 * 24 * 60 * 60)
+
+# Research compaction: the research reaches the planner as short records within a token budget
+RESEARCH_COMPACTION = env_bool("RESEARCH_COMPACTION", True)
+RESEARCH_TOKEN_BUDGET = env_int("RESEARCH_TOKEN_BUDGET", 1500)
+
+# Batch planning (POST /api/plan/batch and batch.py)
+BATCH_CONCURRENCY = env_int("BATCH_CONCURRENCY", 4)
+BATCH_MAX_CONCURRENCY = env_int("BATCH_MAX_CONCURRENCY", 16)
+# Plans started per second; 0 means no limit
+BATCH_RATE = env_float("BATCH_RATE", 0.0)
+BATCH_MAX_TRIPS = env_int("BATCH_MAX_TRIPS", 1000)
+
+# Warm-up and refresh scheduler (opt-in): keeps the itineraries of popular trips cached and fresh
+WARMUP_ENABLED = env_bool("WARMUP_ENABLED", False)
+# Trips always kept warm, as "city:days:attractions_per_day" separated by semicolons
+WARMUP_TRIPS = [trip.strip() for trip in os.environ.get("WARMUP_TRIPS", "").split(";") if trip.strip()]
+# Trips requested at least WARMUP_MIN_REQUESTS times (decaying with WARMUP_HALF_LIFE) join the hot list
+WARMUP_LEARN = env_bool("WARMUP_LEARN", True)
+WARMUP_MIN_REQUESTS = env_float("WARMUP_MIN_REQUESTS", 3.0)
+WARMUP_HALF_LIFE = env_int("WARMUP_HALF_LIFE", 6 * 60 * 60)
+WARMUP_HOT_SIZE = env_int("WARMUP_HOT_SIZE", 50)
+# Hot itineraries are replanned once they are this fraction of ITINERARY_CACHE_TTL old
+WARMUP_REFRESH_AFTER = env_float("WARMUP_REFRESH_AFTER", 0.8)
+WARMUP_INTERVAL = env_int("WARMUP_INTERVAL", 60)
+# A trip whose refresh failed is retried after WARMUP_INTERVAL, doubled for every further failure in a row
+WARMUP_BACKOFF_MAX = env_int("WARMUP_BACKOFF_MAX", 6 * 60 * 60)
+
+# Startup: the agent stack (crewai, crewai_tools, langchain) is imported on the first plan unless
+# it is preloaded, "background" (right after startup, without delaying it) or "eager" (before serving)
+PRELOAD_AGENT_STACK = os.environ.get("PRELOAD_AGENT_STACK", "off").strip().lower()
+
+# LLM call cache (opt-in): identical agent LLM calls are answered from the cache
+LLM_CACHE = env_bool("LLM_CACHE", False)
+# "exact" keys on the rendered prompt as is, "normalized" also matches prompts that only
+# differ in case, whitespace, ids and timestamps
+LLM_CACHE_MODE = os.environ.get("LLM_CACHE_MODE", "exact").strip().lower()
+LLM_CACHE_TTL = env_int("LLM_CACHE_TTL", 7 * 24 * 60 * 60)
+LLM_CACHE_MAX_ENTRIES = env_int("LLM_CACHE_MAX_ENTRIES", 4096)
+LLM_CACHE_DISK = env_bool("LLM_CACHE_DISK", True)
+LLM_CACHE_MAX_DISK_ENTRIES = env_int("LLM_CACHE_MAX_DISK_ENTRIES", 100000)
+# Model of the agents when no LLM is handed in (same variables crewai reads)
+LLM_MODEL = os.environ.get("MODEL") or os.environ.get("OPENAI_MODEL_NAME") or "gpt-4o-mini"
+
+# Planner output checks: invalid or missing days of an itinerary are re-planned one by one
+# (with the day planner) instead of failing the whole plan
+PLAN_REPAIR = env_bool("PLAN_REPAIR", True)
+PLAN_REPAIR_MAX_RETRIES = env_int("PLAN_REPAIR_MAX_RETRIES", 1)
+
+# Itinerary responses: the JSON of served itineraries is kept (per itinerary object) together with
+# its compressed variants, so cache hits are sent without encoding them again
+RESPONSE_CACHE_MAX_ENTRIES = env_int("RESPONSE_CACHE_MAX_ENTRIES", 1024)
+# Smaller bodies are sent uncompressed
+RESPONSE_COMPRESS_MIN_BYTES = env_int("RESPONSE_COMPRESS_MIN_BYTES", 1024)
+RESPONSE_GZIP_LEVEL = env_int("RESPONSE_GZIP_LEVEL", 6)
+RESPONSE_BROTLI_QUALITY = env_int("RESPONSE_BROTLI_QUALITY", 5)
+
+# Route optimization (opt-in): after planning, attractions are regrouped into compact days and every
+# day is ordered as a short walk, using coordinates looked up once from their addresses
+ROUTE_OPTIMIZATION = env_bool("ROUTE_OPTIMIZATION", False)
+# Off: the planner's days are kept and only reordered
+ROUTE_CLUSTERING = env_bool("ROUTE_CLUSTERING", True)
+ROUTE_CLUSTER_ITERATIONS = env_int("ROUTE_CLUSTER_ITERATIONS", 20)
+# Seconds per itinerary spent on uncached address lookups; later attractions only use the cache
+ROUTE_GEOCODE_BUDGET = env_float("ROUTE_GEOCODE_BUDGET", 15.0)
+GEOCODER_URL = os.environ.get("GEOCODER_URL", "https://nominatim.openstreetmap.org/search")
+GEOCODER_USER_AGENT = os.environ.get("GEOCODER_USER_AGENT", "TravelPlanner/1.0")
+GEOCODER_TIMEOUT = env_float("GEOCODER_TIMEOUT", 10.0)
+# Seconds between two requests to the geocoder (the public Nominatim allows one per second)
+GEOCODER_MIN_INTERVAL = env_float("GEOCODER_MIN_INTERVAL", 1.0)
+GEOCODE_CACHE_TTL = env_int("GEOCODE_CACHE_TTL", 90 * 24 * 60 * 60)
+# Places the geocoder did not find are looked up again after this long
+GEOCODE_CACHE_NEGATIVE_TTL = env_int("GEOCODE_CACHE_NEGATIVE_TTL", 24 * 60 * 60)
+GEOCODE_CACHE_MAX_ENTRIES = env_int("GEOCODE_CACHE_MAX_ENTRIES", 4096)
+GEOCODE_CACHE_MAX_DISK_ENTRIES = env_int("GEOCODE_CACHE_MAX_DISK_ENTRIES", 200000)
+
+# Provider limits: calls to the LLM, DuckDuckGo, Nominatim and every scraped site go through one limiter per
+# provider (rate, burst and concurrency), which pauses and slows down after rate limit responses
+PROVIDER_LIMITS = env_bool("PROVIDER_LIMITS", True)
+# Shares the rates and backoffs (not the concurrency) with the other processes using the same file
+PROVIDER_LIMITS_SHARED = env_bool("PROVIDER_LIMITS_SHARED", False)
+PROVIDER_LIMITS_DB = os.environ.get("PROVIDER_LIMITS_DB", os.path.join(TRAVEL_PLANNER_CACHE_DIR, "limits.sqlite3"))
+# Seconds a call waits for its turn before it fails
+PROVIDER_QUEUE_TIMEOUT = env_float("PROVIDER_QUEUE_TIMEOUT", 120.0)
+# Pause after a 429 without Retry-After, doubled for every further 429 in a row
+PROVIDER_BACKOFF_MIN = env_float("PROVIDER_BACKOFF_MIN", 1.0)
+PROVIDER_BACKOFF_MAX = env_float("PROVIDER_BACKOFF_MAX", 60.0)
+# Every 429 halves the rate down to this share; every success gives back this much of it
+PROVIDER_MIN_RATE_FACTOR = env_float("PROVIDER_MIN_RATE_FACTOR", 0.1)
+PROVIDER_RATE_RECOVERY = env_float("PROVIDER_RATE_RECOVERY", 0.05)
+# Calls per second (0: no limit), burst and concurrent calls, per provider
+LLM_RATE = env_float("LLM_RATE", 0.0)
+LLM_BURST = env_int("LLM_BURST", 5)
+LLM_CONCURRENCY = env_int("LLM_CONCURRENCY", 8)
+SEARCH_RATE = env_float("SEARCH_RATE", 1.0)
+SEARCH_BURST = env_int("SEARCH_BURST", 3)
+SEARCH_CONCURRENCY = env_int("SEARCH_CONCURRENCY", 2)
+SCRAPE_HOST_RATE = env_float("SCRAPE_HOST_RATE", 2.0)
+SCRAPE_HOST_BURST = env_int("SCRAPE_HOST_BURST", 4)
+SCRAPE_HOST_CONCURRENCY = env_int("SCRAPE_HOST_CONCURRENCY", 4)
+# Scraped hosts whose limiters are kept; the least recently used idle ones are dropped beyond this
+PROVIDER_MAX_HOSTS = env_int("PROVIDER_MAX_HOSTS", 256)
+
+# Model routing (opt-in): agents and tasks with an llm entry in the YAML configs use their own model,
+# and fall back to a faster one when the primary model times out or the plan's latency SLO is at risk.
+# Off, every agent runs on LLM_MODEL and the llm entries are ignored
+MODEL_ROUTING = env_bool("MODEL_ROUTING", False)
+# Seconds within which a plan should be done (0: no SLO, only timeouts trigger the fallback)
+PLAN_LATENCY_SLO = env_float("PLAN_LATENCY_SLO", 240.0)
+# The fallback is used once less than this many typical calls of the primary model fit in the SLO
+MODEL_FALLBACK_MARGIN = env_float("MODEL_FALLBACK_MARGIN", 1.5)
+# Timeout of primary models that have a fallback, when their config sets none
+MODEL_TIMEOUT = env_float("MODEL_TIMEOUT", 60.0)
+# USD per million prompt:completion tokens, for the cost estimates of the routing decisions
+MODEL_PRICES = os.environ.get("MODEL_PRICES", "gpt-4o=2.5:10,gpt-4o-mini=0.15:0.6")
@@ -0,0 +1,122 @@
+import contextvars
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from . import cancellation
+
+
+class _Call:
+    """One in-flight execution that any number of callers can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+        # Callers still waiting; the execution is cancelled when the last one gives up
+        self.waiters = 0
+        self.token = cancellation.CancelToken()
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one execution"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    def _execute(self, key: str, call: _Call, fn: Callable[[], Any]) -> None:
+        try:
+            with call.token.attach():
+                call.result = fn()
+        except BaseException as e:
+            call.error = e
+        finally:
+            # Later callers start a new execution instead of reusing this result
+            with self._lock:
+                self._forget(key, call)
+            call.done.set()
+
+    def _forget(self, key: str, call: _Call) -> None:
+        """Removes call from the in-flight calls, unless a newer execution already took its key (lock held)"""
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def do(self, key: str, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """Runs fn once for all concurrent callers with the same key and returns its result
+
+        Every caller waits with its own timeout; a caller that times out (or whose
+        own plan is cancelled) gets a TimeoutError (PlanCancelled) while the shared
+        execution keeps running for the others. Once every caller gave up, the
+        execution is cancelled too. An exception raised by fn is re-raised in
+        every caller.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+            else:
+                self.coalesced += 1
+            call.waiters += 1
+
+        if leader:
+            # The execution runs on its own thread so the leader can time out like everyone else
+            context = contextvars.copy_context()
+            worker = threading.Thread(
+                target=context.run, args=(self._execute, key, call, fn), name=f"singleflight-{key}", daemon=True
+            )
+            worker.start()
+
+        try:
+            self._wait(call, key, timeout)
+        except BaseException:
+            with self._lock:
+                call.waiters -= 1
+                if call.waiters == 0:
+                    call.token.cancel("abandoned by every caller")
+                    # New callers must not join the cancelled execution: they start their own
+                    self._forget(key, call)
+            raise
+        with self._lock:
+            call.waiters -= 1
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    @staticmethod
+    def _wait(call: _Call, key: str, timeout: Optional[float]) -> None:
+        """Waits for the execution, giving up on timeout or when the caller's plan is cancelled"""
+        caller = cancellation.current()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                raise TimeoutError(f"Timed out after {timeout} seconds waiting for {key!r}")
+            # Cancellable callers look at their token a few times per second
+            if call.done.wait(remaining if caller is None else min(0.25, remaining or 0.25)):
+                return
+            if caller is not None and caller.cancelled:
+                caller.check()
+
+    def waiters(self, key: str) -> int:
+        """Returns how many callers wait for the execution of key in flight (0 without one)"""
+        with self._lock:
+            call = self._calls.get(key)
+            return call.waiters if call is not None else 0
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+            }
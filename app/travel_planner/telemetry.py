@@ -0,0 +1,288 @@
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Upper bounds (seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+# The trace of the plan running in the current context, if it is being traced
+_current_trace = contextvars.ContextVar("travel_planner_trace", default=None)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """A monotonically increasing value per label combination"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Gauge:
+    """A value that goes up and down, per label combination"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    """Counts observations per bucket, per label combination"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # key -> [bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), series[:-1]):
+                    cumulative += count
+                    labels = _format_labels(self.labelnames, key, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {series[-1]}")
+                lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """The metrics exposed on /metrics"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        metric = Gauge(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Returns every metric in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+PLANS = REGISTRY.counter("travel_planner_plans_total", "Plans served, by outcome", ["outcome"])
+PLAN_SECONDS = REGISTRY.histogram("travel_planner_plan_seconds", "Time to serve a plan", ["outcome"])
+STAGE_SECONDS = REGISTRY.histogram("travel_planner_stage_seconds", "Time spent per planning stage", ["stage"])
+TOOL_CALLS = REGISTRY.counter("travel_planner_tool_calls_total", "Tool calls, by cache result", ["tool", "cache"])
+TOOL_SECONDS = REGISTRY.histogram("travel_planner_tool_fetch_seconds", "Time of tool calls that missed the cache", ["tool"])
+AGENT_TURNS = REGISTRY.counter("travel_planner_agent_turns_total", "Agent reasoning steps", ["agent"])
+AGENT_TURN_SECONDS = REGISTRY.histogram("travel_planner_agent_turn_seconds", "Time per agent step", ["agent"])
+LLM_TOKENS = REGISTRY.counter("travel_planner_llm_tokens_total", "LLM tokens used, by kind", ["kind"])
+RETRIES = REGISTRY.counter("travel_planner_retries_total", "Retried planning steps, by stage", ["stage"])
+
+
+class Trace:
+    """The spans, token counts and retries of a single plan"""
+
+    max_spans = 500
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        self.spans: List[Dict[str, Any]] = []
+        self.tokens: Dict[str, int] = {}
+        self.retries: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, start: float, duration: float, attrs: Optional[Dict[str, Any]] = None) -> None:
+        with self._lock:
+            if len(self.spans) < self.max_spans:
+                span = {"name": name, "start": round(start - self.started, 4), "seconds": round(duration, 4)}
+                if attrs:
+                    span.update(attrs)
+                self.spans.append(span)
+
+    def add_tokens(self, kind: str, count: int) -> None:
+        with self._lock:
+            self.tokens[kind] = self.tokens.get(kind, 0) + count
+
+    def add_retry(self, stage: str, count: int) -> None:
+        with self._lock:
+            self.retries[stage] = self.retries.get(stage, 0) + count
+
+    def finish(self) -> None:
+        self.finished = time.perf_counter()
+
+    def summary(self) -> Dict[str, Any]:
+        """Returns the timing breakdown added to /api/plan responses"""
+        with self._lock:
+            stages: Dict[str, Dict[str, float]] = {}
+            for span in self.spans:
+                stage = stages.setdefault(span["name"], {"count": 0, "seconds": 0.0})
+                stage["count"] += 1
+                stage["seconds"] = round(stage["seconds"] + span["seconds"], 4)
+            return {
+                "total_seconds": round((self.finished or time.perf_counter()) - self.started, 4),
+                "stages": stages,
+                "spans": list(self.spans),
+                "tokens": dict(self.tokens),
+                "retries": dict(self.retries),
+            }
+
+    @contextmanager
+    def attach(self):
+        """Makes this trace the target of the spans recorded in the current context"""
+        token = _current_trace.set(self)
+        try:
+            yield self
+        finally:
+            _current_trace.reset(token)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def record_span(name: str, start: float, duration: float, **attrs) -> None:
+    """Records a span that was timed elsewhere (e.g. between two crew callbacks)"""
+    STAGE_SECONDS.observe(duration, stage=name)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.record(name, start, duration, attrs)
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Times the enclosed block as a stage of the current plan"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, start, time.perf_counter() - start, **attrs)
+
+
+def record_retry(stage: str, count: int = 1) -> None:
+    RETRIES.inc(count, stage=stage)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_retry(stage, count)
+
+
+def record_usage(usage) -> None:
+    """Counts the tokens reported by a crew run (CrewOutput.token_usage)"""
+    if usage is None:
+        return
+    trace = _current_trace.get()
+    for kind in ("prompt_tokens", "completion_tokens", "cached_prompt_tokens"):
+        count = getattr(usage, kind, 0) or 0
+        if count:
+            LLM_TOKENS.inc(count, kind=kind)
+            if trace is not None:
+                trace.add_tokens(kind, count)
+
+
+def kickoff(crew, inputs):
+    """Runs a crew with a span per task and agent step, counting its tokens"""
+    trace = _current_trace.get()
+    names = [getattr(task, "name", None) or f"task_{i}" for i, task in enumerate(crew.tasks)]
+    roles = [getattr(task.agent, "role", "agent") for task in crew.tasks]
+    state = {"task": 0, "task_start": time.perf_counter(), "step_start": time.perf_counter()}
+    step_callback = crew.step_callback
+    task_callback = crew.task_callback
+
+    def on_step(step):
+        now = time.perf_counter()
+        index = min(state["task"], len(names) - 1)
+        duration = now - state["step_start"]
+        AGENT_TURNS.inc(agent=roles[index])
+        AGENT_TURN_SECONDS.observe(duration, agent=roles[index])
+        if trace is not None:
+            trace.record("agent_turn", state["step_start"], duration, {"agent": roles[index]})
+        state["step_start"] = now
+        if step_callback is not None:
+            step_callback(step)
+
+    def on_task(output):
+        now = time.perf_counter()
+        index = state["task"]
+        name = names[index] if index < len(names) else f"task_{index}"
+        record_span(f"task:{name}", state["task_start"], now - state["task_start"])
+        state["task"] += 1
+        state["task_start"] = state["step_start"] = now
+        if task_callback is not None:
+            task_callback(output)
+
+    crew.step_callback = on_step
+    crew.task_callback = on_task
+    result = crew.kickoff(inputs=inputs)
+    record_usage(getattr(result, "token_usage", None))
+    return result
@@ -0,0 +1,60 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict
+
+from . import telemetry
+
+
+class ToolMetrics:
+    """Call, cache and latency counters of one tool"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.cache_hits = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def hit(self) -> None:
+        with self._lock:
+            self.calls += 1
+            self.cache_hits += 1
+        telemetry.TOOL_CALLS.inc(tool=self.name, cache="hit")
+
+    @contextmanager
+    def measure(self):
+        """Times a call that had to go to the network"""
+        start = time.perf_counter()
+        cache = "miss"
+        try:
+            yield
+        except Exception:
+            cache = "error"
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.calls += 1
+                self.total_seconds += elapsed
+                self.max_seconds = max(self.max_seconds, elapsed)
+            telemetry.TOOL_CALLS.inc(tool=self.name, cache=cache)
+            telemetry.TOOL_SECONDS.observe(elapsed, tool=self.name)
+            telemetry.record_span(f"tool:{self.name}", start, elapsed)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            fetched = self.calls - self.cache_hits
+            return {
+                "tool": self.name,
+                "calls": self.calls,
+                "cache_hits": self.cache_hits,
+                "hit_rate": round(self.cache_hits / self.calls, 4) if self.calls else 0.0,
+                "errors": self.errors,
+                "avg_fetch_seconds": round(self.total_seconds / fetched, 4) if fetched else 0.0,
+                "max_fetch_seconds": round(self.max_seconds, 4),
+            }
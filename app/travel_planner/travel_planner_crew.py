@@ -1,11 +1,15 @@
 import os
+from typing import Any, Optional
 import yaml
 from crewai import Agent, Task, Crew, Process
 from crewai.project import CrewBase, agent, crew, task    
-from crewai_tools import ScrapeWebsiteTool
 
-from models import TravelItinerary
-from custom_search_tool import CustomSearchTool
+from . import settings
+from .llm_cache import wrap_llm
+from .model_routing import routed_llm
+from .models import DailyPlan, ResearchFindings, TravelItinerary
+from .custom_search_tool import CustomSearchTool
+from .scrape_tool import CachedScrapeTool
 
 
 @CrewBase
@@ -13,55 +17,97 @@ class TravelPlannerCrew:
     """A crew for planning travel itineraries using real-time data"""
 
     base_dir = os.path.dirname(os.path.abspath(__file__))
-    # agents_config_path = os.path.join(base_dir, "config", "agents.yaml")
-    # tasks_config_path = os.path.join(base_dir, "config", "tasks.yaml")
+    # agents_config_path = os.path.join(base_dir, "configs", "agents.yaml")
+    # tasks_config_path = os.path.join(base_dir, "configs", "tasks.yaml")
 
-    agents_config_path = os.path.join(base_dir, "config", "agents-with-search-tools.yaml") # Updated to use agents config with search tool
-    # tasks_config_path = os.path.join(base_dir, "config", "tasks-with-search-tools.yaml") # Updated to use tasks config with search tool
-    tasks_config_path = os.path.join(base_dir, "config", "tasks-with-scrapping-tools.yaml") # Updated to use tasks config with scrapping tool
+    agents_config_path = os.path.join(base_dir, "configs", "agents-with-search-tools.yaml") # Updated to use agents config with search tool
+    # tasks_config_path = os.path.join(base_dir, "configs", "tasks-with-search-tools.yaml") # Updated to use tasks config with search tool
+    tasks_config_path = os.path.join(base_dir, "configs", "tasks-with-scrapping-tools.yaml") # Updated to use tasks config with scrapping tool
 
 
-    def __init__(self):
-        with open(self.agents_config_path, 'r') as file:
-            self.agents_data = yaml.safe_load(file)
-            
-        with open(self.tasks_config_path, 'r') as file:
-            self.tasks_data = yaml.safe_load(file)
+    def __init__(self, agents_data=None, tasks_data=None, search_tool=None, scrape_tool=None, llm=None,
+                 route_models=None):
+        # Reuse already parsed configurations when they are handed in (see CrewFactory)
+        if agents_data is None:
+            with open(self.agents_config_path, 'r') as file:
+                agents_data = yaml.safe_load(file)
+
+        if tasks_data is None:
+            with open(self.tasks_config_path, 'r') as file:
+                tasks_data = yaml.safe_load(file)
+
+        self.agents_data = agents_data
+        self.tasks_data = tasks_data
 
         # Initialize the custom search tool    
-        self.search_tool = CustomSearchTool()
+        self.search_tool = search_tool or CustomSearchTool()
         # Initialize the web scraping tool
-        self.scrape_tool = ScrapeWebsiteTool()
+        self.scrape_tool = scrape_tool or CachedScrapeTool()
+
+        # Optional LLM for both agents (the default model from the environment otherwise),
+        # behind the provider limiter and the LLM call cache when they are enabled
+        self.llm = wrap_llm(llm)
+        # The llm entries of the configs choose the models, unless an LLM was handed in (e.g. by the benchmarks)
+        self.route_models = (llm is None) if route_models is None else route_models
+
+    def routed(self, name: str, config) -> Optional[Any]:
+        """Returns the LLM the llm entry of an agent or task config routes to, or None without one"""
+        spec = config.get("llm")
+        if not spec or not self.route_models or not settings.MODEL_ROUTING:
+            return None
+        return routed_llm(name, spec)
+
+    def agent_options(self, name: str):
+        """Returns the config and LLM of an agent"""
+        config = self.agents_data[name]
+        llm = self.routed(name, config) or self.llm
+        # The llm entry is ours: crewai would create a model of its own from it
+        options = {"config": {key: value for key, value in config.items() if key != "llm"}}
+        if llm is not None:
+            options["llm"] = llm
+        return options
+
+    def task_config(self, name: str):
+        return {key: value for key, value in self.tasks_data[name].items() if key != "llm"}
+
+    def task_agent(self, agent: Agent, task_name: str) -> Agent:
+        """Returns the agent of a task: the shared one, or a copy using the task's own model"""
+        llm = self.routed(task_name, self.tasks_data[task_name])
+        if llm is None:
+            return agent
+        agent = agent.copy()
+        agent.llm = llm
+        return agent
 
     @agent
     def researcher(self) -> Agent:
         """Creates a researcher agent"""
         return Agent(
-            config=self.agents_data["researcher"],
-            tools=[self.search_tool, self.scrape_tool]  # Provide the scraping tool to the researcher agent
+            tools=[self.search_tool, self.scrape_tool],  # Provide the scraping tool to the researcher agent
+            **self.agent_options("researcher")
         )
 
     @agent
     def planner(self) -> Agent:
         """Creates a planner agent"""
         return Agent(
-            config=self.agents_data["planner"]
+            **self.agent_options("planner")
         )
 
     @task
     def research_task(self) -> Task:
         """Creates a research task"""
         return Task(
-            config=self.tasks_data["research_task"],
-            agent=self.researcher()
+            config=self.task_config("research_task"),
+            agent=self.task_agent(self.researcher(), "research_task")
         )
 
     @task
     def planning_task(self) -> Task:
         """Creates a planning task with full Pydantic validation"""
         return Task(
-            config=self.tasks_data["planning_task"],
-            agent=self.planner(),
+            config=self.task_config("planning_task"),
+            agent=self.task_agent(self.planner(), "planning_task"),
             context=[self.research_task()],
             output_pydantic=TravelItinerary  # Comprehensive Pydantic validation
             # output_json=TravelItinerary  # Structured output as JSON-compatible dictionary
@@ -70,9 +116,54 @@ class TravelPlannerCrew:
     @crew
     def travel_crew(self) -> Crew:
         """Creates the travel planning crew"""
+        # The agents are collected from the tasks, so tasks with a model of their own keep it
         return Crew(
             agents=self.agents,
             tasks=self.tasks,
             process=Process.sequential
-        )    
+        )
+
+    # The crews below are not part of travel_crew(); the planning service uses
+    # them to run research and planning as separate, independently scheduled steps
+
+    def research_batch_crew(self) -> Crew:
+        """Creates a crew that researches one batch of attractions"""
+        researcher = self.task_agent(self.researcher(), "research_batch_task")
+        return Crew(
+            agents=[researcher],
+            tasks=[Task(
+                name="research_batch_task",
+                config=self.task_config("research_batch_task"),
+                agent=researcher,
+                output_pydantic=ResearchFindings
+            )],
+            process=Process.sequential
+        )
+
+    def planning_crew(self) -> Crew:
+        """Creates a crew that plans the trip from research passed in as input"""
+        planner = self.task_agent(self.planner(), "planning_from_research_task")
+        return Crew(
+            agents=[planner],
+            tasks=[Task(
+                name="planning_task",
+                config=self.task_config("planning_from_research_task"),
+                agent=planner,
+                output_pydantic=TravelItinerary
+            )],
+            process=Process.sequential
+        )
 
+    def day_planning_crew(self) -> Crew:
+        """Creates a crew that plans a single day from attractions passed in as input"""
+        planner = self.task_agent(self.planner(), "day_planning_task")
+        return Crew(
+            agents=[planner],
+            tasks=[Task(
+                name="day_planning_task",
+                config=self.task_config("day_planning_task"),
+                agent=planner,
+                output_pydantic=DailyPlan
+            )],
+            process=Process.sequential
+        )
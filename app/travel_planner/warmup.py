@@ -0,0 +1,243 @@
+import contextvars
+import heapq
+import itertools
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from . import settings, telemetry
+from .itinerary_cache import ItineraryCache, itinerary_key
+
+Trip = Tuple[str, int, int]
+
+QUEUE_DEPTH = telemetry.REGISTRY.gauge("travel_planner_refresh_queue_depth", "Hot itineraries waiting for a refresh")
+REFRESH_LAG = telemetry.REGISTRY.gauge(
+    "travel_planner_refresh_lag_seconds", "How long the most overdue hot itinerary has been due for a refresh"
+)
+REFRESHES = telemetry.REGISTRY.counter("travel_planner_refreshes_total", "Background refreshes, by outcome", ["outcome"])
+
+
+# The scheduler whose background refresh runs in the current context, if any
+_background = contextvars.ContextVar("travel_planner_background_refresh", default=None)
+
+
+def yield_to_live_traffic(shared: Callable[[], bool] = lambda: False) -> None:
+    """Called between the stages of a plan: a background refresh pauses while live plans need the workers
+
+    shared() tells whether a live request waits on the refresh, which then
+    runs on at full priority.
+    """
+    scheduler = _background.get()
+    if scheduler is not None:
+        scheduler.wait_until_idle(shared)
+
+
+def parse_trip_spec(spec: str) -> Trip:
+    """Parses "city:days:attractions_per_day" """
+    city, days, attractions_per_day = spec.rsplit(":", 2)
+    return city.strip(), int(days), int(attractions_per_day)
+
+
+class RefreshScheduler:
+    """Keeps the itineraries of popular trips cached by replanning them in the background
+
+    Hot trips come from WARMUP_TRIPS and, when learning is on, from how often
+    trips are requested. A hot itinerary is replanned once it is
+    WARMUP_REFRESH_AFTER of its TTL old (or right away when it is missing);
+    stale itineraries keep being served meanwhile. Refreshes run one at a time
+    and only while the live plan workers have room to spare; a started refresh
+    pauses between its stages while they have none (see yield_to_live_traffic).
+    """
+
+    def __init__(self, cache: ItineraryCache, refresh: Callable[[str, int, int], Any], busy: Callable[[], bool],
+                 trips: List[str] = settings.WARMUP_TRIPS, learn: bool = settings.WARMUP_LEARN,
+                 min_requests: float = settings.WARMUP_MIN_REQUESTS, half_life: float = settings.WARMUP_HALF_LIFE,
+                 hot_size: int = settings.WARMUP_HOT_SIZE, refresh_after: float = settings.WARMUP_REFRESH_AFTER,
+                 interval: float = settings.WARMUP_INTERVAL, backoff_max: float = settings.WARMUP_BACKOFF_MAX):
+        self.cache = cache
+        # Replans a trip and stores it in the cache
+        self.refresh = refresh
+        # True while live traffic needs the capacity
+        self.busy = busy
+        self.pinned = [parse_trip_spec(spec) for spec in trips]
+        self.learn = learn
+        self.min_requests = min_requests
+        self.half_life = half_life
+        self.hot_size = hot_size
+        self.refresh_after = refresh_after
+        self.interval = interval
+        self.backoff_max = backoff_max
+
+        self._cond = threading.Condition()
+        # key -> (trip, decayed request count, time of the last update)
+        self._requests: Dict[str, Tuple[Trip, float, float]] = {}
+        # (due_at, sequence, key, trip), earliest first
+        self._queue: List[Tuple[float, int, str, Trip]] = []
+        self._queued = set()
+        # key -> (refreshes failed in a row, time before which it is not retried)
+        self._failures: Dict[str, Tuple[int, float]] = {}
+        self._sequence = itertools.count()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+
+        self.refreshed = 0
+        self.failed = 0
+        self.last_lag = 0.0
+
+    def _decayed(self, count: float, updated: float, now: float) -> float:
+        return count * 0.5 ** ((now - updated) / self.half_life)
+
+    def record(self, city: str, days: int, attractions_per_day: int) -> None:
+        """Counts a live request for a trip"""
+        if not self.learn:
+            return
+        key = itinerary_key(city, days, attractions_per_day)
+        now = time.time()
+        with self._cond:
+            _, count, updated = self._requests.get(key, (None, 0.0, now))
+            self._requests[key] = ((city, days, attractions_per_day), self._decayed(count, updated, now) + 1, now)
+            if len(self._requests) > 10 * self.hot_size + 1000:
+                # Forget the rarely requested trips
+                ranked = sorted(self._requests.items(), key=lambda item: self._decayed(item[1][1], item[1][2], now))
+                for key, _ in ranked[:len(ranked) // 2]:
+                    del self._requests[key]
+
+    def hot_trips(self) -> List[Trip]:
+        """Returns the pinned trips followed by the most requested ones"""
+        now = time.time()
+        hot = {itinerary_key(*trip): trip for trip in self.pinned}
+        with self._cond:
+            learned = sorted(
+                ((self._decayed(count, updated, now), key, trip)
+                 for key, (trip, count, updated) in self._requests.items()),
+                reverse=True
+            )
+        for count, key, trip in learned:
+            if len(hot) >= self.hot_size or count < self.min_requests:
+                break
+            hot.setdefault(key, trip)
+        return list(hot.values())
+
+    def schedule(self, city: str, days: int, attractions_per_day: int, due_at: Optional[float] = None) -> None:
+        """Queues a refresh of a trip unless one is queued already; failing trips wait for their backoff"""
+        key = itinerary_key(city, days, attractions_per_day)
+        with self._cond:
+            if key in self._queued:
+                return
+            self._queued.add(key)
+            due_at = time.time() if due_at is None else due_at
+            if key in self._failures:
+                due_at = max(due_at, self._failures[key][1])
+            heapq.heappush(self._queue, (due_at, next(self._sequence), key, (city, days, attractions_per_day)))
+            self._cond.notify_all()
+
+    def scan(self) -> None:
+        """Queues the hot trips that are missing or about to go stale"""
+        threshold = self.refresh_after * self.cache.ttl
+        now = time.time()
+        for trip in self.hot_trips():
+            entry = self.cache.lookup(*trip)
+            if entry is None:
+                self.schedule(*trip, due_at=now)
+            elif entry[1] >= threshold:
+                self.schedule(*trip, due_at=now - (entry[1] - threshold))
+
+    def _update_gauges(self) -> None:
+        with self._cond:
+            depth = len(self._queue)
+            oldest = min((item[0] for item in self._queue), default=None)
+        QUEUE_DEPTH.set(depth)
+        REFRESH_LAG.set(round(max(0.0, time.time() - oldest), 3) if oldest is not None else 0.0)
+
+    def _next_due(self, next_scan: float) -> Optional[Tuple[float, int, str, Trip]]:
+        """Waits until a refresh is due or the next scan; returns the due refresh, if any"""
+        with self._cond:
+            while not self._stopped:
+                now = time.time()
+                if self._queue and self._queue[0][0] <= now:
+                    return heapq.heappop(self._queue)
+                if now >= next_scan:
+                    return None
+                wake_at = min(next_scan, self._queue[0][0]) if self._queue else next_scan
+                self._cond.wait(wake_at - now)
+            return None
+
+    def wait_until_idle(self, until: Callable[[], bool] = lambda: False) -> None:
+        """Live traffic always wins: refreshes wait until the plan workers have room (or until() is true)"""
+        while not self._stopped and self.busy() and not until():
+            with self._cond:
+                self._cond.wait(1.0)
+
+    def _loop(self) -> None:
+        next_scan = 0.0
+        while not self._stopped:
+            if time.time() >= next_scan:
+                try:
+                    self.scan()
+                except Exception:
+                    # A broken cache lookup must not stop the scheduler
+                    pass
+                next_scan = time.time() + self.interval
+            self._update_gauges()
+
+            item = self._next_due(next_scan)
+            if item is None:
+                continue
+            self.wait_until_idle()
+            if self._stopped:
+                # Stopped while waiting for the workers: no new crew run during shutdown
+                break
+            due_at, _, key, trip = item
+            token = _background.set(self)
+            try:
+                self.refresh(*trip)
+                outcome = "refreshed"
+            except Exception:
+                # The next scan queues the trip again, once its backoff is over
+                outcome = "failed"
+            finally:
+                _background.reset(token)
+            with self._cond:
+                self._queued.discard(key)
+                self.last_lag = max(0.0, time.time() - due_at)
+                if outcome == "refreshed":
+                    self.refreshed += 1
+                    self._failures.pop(key, None)
+                else:
+                    self.failed += 1
+                    # Each failure in a row doubles the wait, so a broken trip does not burn LLM calls every scan
+                    failures = self._failures.get(key, (0, 0.0))[0] + 1
+                    backoff = min(self.backoff_max, self.interval * 2 ** (failures - 1))
+                    self._failures[key] = (failures, time.time() + backoff)
+            REFRESHES.inc(outcome=outcome)
+
+    def start(self) -> None:
+        """Starts the background thread (once)"""
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stopped = False
+            self._thread = threading.Thread(target=self._loop, name="itinerary-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        self._update_gauges()
+        hot_trips = len(self.hot_trips())
+        with self._cond:
+            oldest = min((item[0] for item in self._queue), default=None)
+            return {
+                "running": self._thread is not None and not self._stopped,
+                "hot_trips": hot_trips,
+                "tracked_trips": len(self._requests),
+                "queue_depth": len(self._queue),
+                "refresh_lag": round(max(0.0, time.time() - oldest), 3) if oldest is not None else 0.0,
+                "last_refresh_lag": round(self.last_lag, 3),
+                "refreshed": self.refreshed,
+                "failed": self.failed,
+                "backing_off": sum(1 for _, retry_at in self._failures.values() if retry_at > time.time()),
+            }